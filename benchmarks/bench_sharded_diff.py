@@ -0,0 +1,111 @@
+"""
+SyncSoftLink 全量比对基准：单进程 merge_diff vs 按顶层目录分片的多进程比对。
+
+在合成目录树上构造快照暂存表与本地软连接目录（本地目录按比例缺失与多出一部分项目，
+用空文件代替软连接），分别测量单进程与不同进程数下产出完整差异的耗时，并校验结果一致。
+
+用法：
+    python benchmarks/bench_sharded_diff.py --shows 5000 --seasons 10 --episodes 20 --processes 2,4,8
+    （默认规模约 100 万项，本地目录的构造需要数分钟）
+"""
+import argparse
+import importlib
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "plugins.v2", "syncsoftlink")
+
+
+def load_plugin_modules():
+    """
+    不执行插件 __init__（依赖 MoviePilot 运行环境），仅加载纯逻辑子模块。
+    """
+    package = types.ModuleType("syncsoftlink")
+    package.__path__ = [os.path.normpath(PLUGIN_DIR)]
+    sys.modules["syncsoftlink"] = package
+    return (importlib.import_module("syncsoftlink.snapshot"),
+            importlib.import_module("syncsoftlink.diff"),
+            importlib.import_module("syncsoftlink.shard"))
+
+
+def build(tmp: str, snapshot_mod, shows: int, seasons: int, episodes: int, drift: float, rng: random.Random):
+    """
+    写入暂存表并构造本地目录，返回 (数据库路径, 本地根目录, 云端项目数)。
+    """
+    db_path = os.path.join(tmp, "snapshot.db")
+    local_root = os.path.join(tmp, "softlink")
+    snapshot = snapshot_mod.TreeSnapshot(db_path, "1")
+    snapshot.begin_stage(snapshot_mod.SOURCE_EXPORT)
+    rows, next_id = [], 0
+
+    def add(path: str, is_dir: bool):
+        nonlocal next_id
+        next_id += 1
+        rows.append((next_id, 0, path.rsplit("/", 1)[-1], path, int(is_dir), 0, "", 0))
+        if len(rows) >= 10000:
+            snapshot.stage_rows(rows)
+            rows.clear()
+        # 本地缺失一部分云端项目
+        if rng.random() >= drift:
+            full_path = os.path.join(local_root, path)
+            if is_dir:
+                os.makedirs(full_path, exist_ok=True)
+            elif os.path.isdir(os.path.dirname(full_path)):
+                open(full_path, "w").close()
+
+    os.makedirs(local_root)
+    for s in range(shows):
+        show = f"Show {s:06d}"
+        add(show, True)
+        for n in range(seasons):
+            season = f"{show}/Season {n + 1:02d}"
+            add(season, True)
+            for e in range(episodes):
+                add(f"{season}/S{n + 1:02d}E{e + 1:02d}.mkv", False)
+            # 本地多出的失效软连接
+            if rng.random() < drift and os.path.isdir(os.path.join(local_root, season)):
+                open(os.path.join(local_root, season, "stale.mkv"), "w").close()
+    snapshot.stage_rows(rows)
+    snapshot.finish_stage()
+    snapshot.close()
+    return db_path, local_root, next_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shows", type=int, default=5000)
+    parser.add_argument("--seasons", type=int, default=10)
+    parser.add_argument("--episodes", type=int, default=19)
+    parser.add_argument("--drift", type=float, default=0.01, help="本地缺失与多出的项目比例")
+    parser.add_argument("--processes", default="2,4,8", help="逗号分隔的进程数")
+    args = parser.parse_args()
+
+    snapshot_mod, diff_mod, shard_mod = load_plugin_modules()
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        db_path, local_root, count = build(tmp, snapshot_mod, args.shows, args.seasons, args.episodes,
+                                           args.drift, rng)
+        print(f"合成目录树 {count} 项，构造耗时 {time.perf_counter() - start:.1f}s，CPU 核数 {os.cpu_count()}")
+
+        snapshot = snapshot_mod.TreeSnapshot(db_path, "1")
+        start = time.perf_counter()
+        serial = list(diff_mod.merge_diff(snapshot.staged_entries(), diff_mod.iter_local_tree(local_root)))
+        baseline = time.perf_counter() - start
+        snapshot.close()
+        print(f"[单进程] 差异 {len(serial):>8} 项  耗时 {baseline:7.2f}s")
+
+        for processes in (int(p) for p in args.processes.split(",") if p.strip()):
+            start = time.perf_counter()
+            sharded = list(shard_mod.sharded_full_diff(db_path, local_root, processes, work_dir=tmp))
+            elapsed = time.perf_counter() - start
+            print(f"[{processes} 进程] 差异 {len(sharded):>8} 项  耗时 {elapsed:7.2f}s  "
+                  f"加速 {baseline / elapsed:5.2f}x  结果{'一致' if sharded == serial else '不一致'}")
+
+
+if __name__ == "__main__":
+    main()
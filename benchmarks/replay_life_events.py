@@ -0,0 +1,321 @@
+"""
+SyncSoftLink 事件同步回放：用本地模拟的115目录树与生活事件流验证事件驱动的增量同步。
+
+先以导出目录树把模拟目录树完整同步到临时软连接目录，再随机执行上传、新建文件夹、移动、改名、删除，
+每轮按游标取回事件、映射为需要对账的目录并应用到软连接目录，
+最后与云端目录树逐项比对并统计事件同步的接口调用次数；
+再执行一次导出目录树与快照比对的定时增量同步，确认无法由事件定位的变化也被修正。
+
+用法：
+    python benchmarks/replay_life_events.py --shows 200 --rounds 20 --ops 10
+"""
+import argparse
+import importlib
+import os
+import random
+import shutil
+import sys
+import tempfile
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "plugins.v2", "syncsoftlink")
+
+
+def load_plugin_modules():
+    """
+    不执行插件 __init__（依赖 MoviePilot 运行环境），仅加载纯逻辑子模块。
+    """
+    package = types.ModuleType("syncsoftlink")
+    package.__path__ = [os.path.normpath(PLUGIN_DIR)]
+    sys.modules["syncsoftlink"] = package
+    return types.SimpleNamespace(**{
+        name: importlib.import_module(f"syncsoftlink.{name}")
+        for name in ("apply", "diff", "events", "refresh", "roots", "snapshot", "source", "tree")
+    })
+
+
+class FakeLifeCloud:
+    """
+    内存中的115目录树，提供带祖先链的 fs_files 与生活事件流。
+    """
+
+    def __init__(self, shows: int, seasons: int, episodes: int):
+        self.next_id = 1000
+        self.clock = 1_700_000_000
+        self.events = []
+        self.api_calls = 0
+        self.items = {0: {"n": "根目录", "dir": True, "children": [], "parent": None}}
+        self.root = self._add(0, "media_center", True, record=False)
+        for s in range(shows):
+            show = self._add(self.root, f"Show {s:05d}", True, record=False)
+            for n in range(seasons):
+                season = self._add(show, f"Season {n + 1}", True, record=False)
+                for e in range(episodes):
+                    self._add(season, f"S{n + 1:02d}E{e + 1:02d}.mkv", False, record=False)
+
+    def _event(self, event_type: str, file_id: int, parent_id=None):
+        self.clock += 1
+        self.events.append({"id": len(self.events) + 1, "type": event_type, "file_id": file_id,
+                            "parent_id": parent_id, "file_name": self.items[file_id]["n"],
+                            "update_time": self.clock})
+
+    def _add(self, parent: int, name: str, is_dir: bool, record: bool = True) -> int:
+        self.next_id += 1
+        self.items[self.next_id] = {"n": name, "dir": is_dir, "children": [], "parent": parent}
+        self.items[parent]["children"].append(self.next_id)
+        if record:
+            self._event("new_folder" if is_dir else "upload_file", self.next_id, parent)
+        return self.next_id
+
+    def _under_root(self, item_id: int) -> bool:
+        while item_id is not None:
+            if item_id == self.root:
+                return True
+            item_id = self.items[item_id]["parent"]
+        return False
+
+    def dirs(self):
+        return [i for i, item in self.items.items() if item["dir"] and i != 0 and self._under_root(i)]
+
+    def find(self, rel_path: str) -> int:
+        """
+        相对于同步根的路径对应的 id。
+        """
+        item_id = self.root
+        for name in rel_path.split("/"):
+            item_id = next(c for c in self.items[item_id]["children"] if self.items[c]["n"] == name)
+        return item_id
+
+    def upload(self, parent: int, name: str) -> int:
+        return self._add(parent, name, False)
+
+    def new_folder(self, parent: int, name: str) -> int:
+        folder = self._add(parent, name, True)
+        self._add(folder, "S01E01.mkv", False)
+        return folder
+
+    def move(self, file_id: int, target: int) -> None:
+        # 与115一样，目标目录中有同名文件时自动改名
+        if any(self.items[c]["n"] == self.items[file_id]["n"] for c in self.items[target]["children"]):
+            self.items[file_id]["n"] = f"{self.next_id}-{self.items[file_id]['n']}"
+            self.next_id += 1
+        self.items[self.items[file_id]["parent"]]["children"].remove(file_id)
+        self.items[target]["children"].append(file_id)
+        self.items[file_id]["parent"] = target
+        self._event("move_file", file_id, target)
+
+    def rename(self, folder: int, name: str) -> None:
+        self.items[folder]["n"] = name
+        self._event("folder_rename", folder, self.items[folder]["parent"])
+
+    def delete(self, file_id: int) -> None:
+        parent = self.items[file_id]["parent"]
+        self.items[parent]["children"].remove(file_id)
+        self.items[file_id]["parent"] = None
+        self._event("delete_file", file_id, parent)
+
+    def mutate(self, rng: random.Random) -> str:
+        dirs = self.dirs()
+        files = [i for i, item in self.items.items() if not item["dir"] and self._under_root(i)]
+        action = rng.choice(["upload", "new_folder", "move", "rename", "delete"])
+        if action == "upload":
+            self.upload(rng.choice(dirs), f"upload-{self.next_id}.mkv")
+        elif action == "new_folder":
+            self.new_folder(rng.choice(dirs), f"folder-{self.next_id}")
+        elif action == "move" and files:
+            self.move(rng.choice(files), rng.choice(dirs))
+        elif action == "rename":
+            folder = rng.choice([d for d in dirs if d != self.root])
+            self.rename(folder, self.items[folder]["n"] + "-renamed")
+        elif action == "delete" and files:
+            self.delete(rng.choice(files))
+        return action
+
+    def fs_files(self, payload: dict) -> dict:
+        self.api_calls += 1
+        cid = int(payload["cid"])
+        if cid not in self.items or not self.items[cid]["dir"] or (cid and not self._under_root(cid)):
+            cid = 0
+        chain, node = [], cid
+        while node is not None:
+            chain.append({"cid": node, "name": self.items[node]["n"]})
+            node = self.items[node]["parent"]
+        children = self.items[cid]["children"]
+        offset, limit = int(payload["offset"]), int(payload["limit"])
+        data = []
+        for child_id in children[offset:offset + limit]:
+            child = self.items[child_id]
+            if child["dir"]:
+                data.append({"cid": child_id, "pid": cid, "n": child["n"], "te": "1"})
+            else:
+                data.append({"fid": child_id, "cid": cid, "n": child["n"], "s": 1, "te": "1"})
+        return {"count": len(children), "data": data, "path": list(reversed(chain))}
+
+    def life_events(self, from_id: int, from_time: int):
+        # 与真实接口一样从新到旧返回
+        return [e for e in reversed(self.events) if e["id"] > from_id and e["update_time"] >= from_time]
+
+    def export_paths(self):
+        """
+        与 export_dir 的导出结果一样按深度优先输出完整路径，首项为根目录。
+        """
+        def walk(item_id: int, path: str):
+            for child_id in self.items[item_id]["children"]:
+                child_path = f"{path}/{self.items[child_id]['n']}"
+                yield child_path
+                yield from walk(child_id, child_path)
+
+        root_path = "/" + self.items[self.root]["n"]
+        yield root_path
+        yield from walk(self.root, root_path)
+
+    def paths(self):
+        """
+        云端目录树的 (相对路径, 是否目录)；与导出目录树一致，空目录是叶子节点，在本地以软链接表示。
+        """
+        stack = [(self.root, "")]
+        while stack:
+            item_id, path = stack.pop()
+            for child_id in self.items[item_id]["children"]:
+                child = self.items[child_id]
+                rel_path = f"{path}/{child['n']}" if path else child["n"]
+                yield rel_path, child["dir"] and bool(child["children"])
+                if child["dir"]:
+                    stack.append((child_id, rel_path))
+
+
+class ReplayHarness:
+    """
+    在临时目录中按插件的流程执行完整同步、事件同步与定时增量同步，挂载端不真实存在，刷新一律视为成功。
+    """
+
+    def __init__(self, mods, cloud: FakeLifeCloud, work_dir: str, executor):
+        self.mods = mods
+        self.cloud = cloud
+        self.executor = executor
+        self.mount_root = os.path.join(work_dir, "mount", "media_center")
+        self.softlink_root = os.path.join(work_dir, "softlink")
+        os.makedirs(self.mount_root)
+        self.root = mods.roots.SyncRoot(str(cloud.root), self.mount_root, self.softlink_root,
+                                        os.path.dirname(self.mount_root))
+        self.snapshot = mods.snapshot.TreeSnapshot(os.path.join(work_dir, "snapshot.db"), self.root.cid)
+        self.poller = mods.events.EventPoller(cloud.life_events, now=lambda: cloud.clock)
+        self.locations = mods.events.LocationIndex()
+        self.api_calls = 0
+
+    def _apply(self, additions):
+        planner = self.mods.refresh.RefreshPlanner(self.root.refresh_base, exists=lambda p: True,
+                                                   listdir=lambda p: [])
+        return self.mods.apply.ApplyStage(self.executor).run(self.softlink_root, self.mount_root, planner,
+                                                             list(additions))
+
+    def _remove(self, rel_path: str) -> None:
+        path = os.path.join(self.softlink_root, rel_path)
+        if os.path.islink(path) or os.path.isfile(path):
+            os.remove(path)
+        else:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _stage_export(self) -> None:
+        _, tree = self.mods.tree.parse_export_tree(self.cloud.export_paths())
+        self.snapshot.stage_tree(tree, self.mods.snapshot.SOURCE_EXPORT)
+
+    def full_sync(self) -> None:
+        self._stage_export()
+        self.snapshot.commit()
+        self._apply(self.cloud.paths())
+
+    def sync_events(self) -> int:
+        """
+        取回游标之后的事件，对账涉及的目录并写入快照，最后推进游标。
+
+        :return: 本轮事件数
+        """
+        events = self.poller.poll()
+        # 与插件一样每批事件使用新的目录列表，同一目录在批内只列出一次
+        source = self.mods.source.DirectoryLister(self.cloud.fs_files)
+        reconciler = self.mods.events.DirectoryReconciler(source, [self.root])
+
+        def previous_parent(event):
+            for rel_dir in self.snapshot.parent_dirs(event.name):
+                cid = source.resolve(int(self.root.cid), rel_dir)
+                if cid is not None:
+                    yield cid
+
+        additions, removed = [], []
+        for cid in sorted(self.mods.events.dirty_dirs(events, previous_parent, self.locations)):
+            for _, op, rel_path, is_dir in reconciler.reconcile(cid):
+                if op == self.mods.diff.OP_REMOVE:
+                    self._remove(rel_path)
+                    removed.append(rel_path)
+                else:
+                    additions.append((rel_path, is_dir))
+        result = self._apply(additions)
+        failed = set(result.skipped) | set(result.errors)
+        self.snapshot.record_events(removed, [(p, d) for p, d in additions if p not in failed])
+        self.poller.advance(events)
+        self.api_calls += source.api_calls
+        return len(events)
+
+    def scheduled_sync(self) -> None:
+        """
+        定时增量同步：导出目录树与快照比对，重复应用事件同步已完成的变化没有副作用。
+        """
+        self._stage_export()
+        added, removed = self.snapshot.delta()
+        for rel_path, _ in removed:
+            self._remove(rel_path)
+        self._apply(added)
+        self.snapshot.commit()
+
+    def mismatch(self):
+        """
+        :return: (云端有而本地缺失的项, 本地多余的项)
+        """
+        local = set(self.mods.diff.iter_local_tree(self.softlink_root))
+        expected = set(self.cloud.paths())
+        return sorted(expected - local), sorted(local - expected)
+
+    def close(self) -> None:
+        self.snapshot.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shows", type=int, default=200)
+    parser.add_argument("--seasons", type=int, default=2)
+    parser.add_argument("--episodes", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=20, help="轮询次数")
+    parser.add_argument("--ops", type=int, default=10, help="每轮之间的云端操作数")
+    args = parser.parse_args()
+
+    mods = load_plugin_modules()
+    rng = random.Random(0)
+    cloud = FakeLifeCloud(args.shows, args.seasons, args.episodes)
+
+    def report(stage):
+        missing, extra = harness.mismatch()
+        print(f"{stage}：软连接目录与云端{'不一致' if missing or extra else '一致'}")
+        if missing or extra:
+            print(f"  缺失 {len(missing)} 项：{missing[:5]}；多余 {len(extra)} 项：{extra[:5]}")
+
+    with tempfile.TemporaryDirectory() as tmp, ThreadPoolExecutor(8) as executor:
+        harness = ReplayHarness(mods, cloud, tmp, executor)
+        harness.full_sync()
+        print(f"合成目录树 {sum(1 for _ in cloud.paths())} 项")
+        total_events = 0
+        for _ in range(args.rounds):
+            for _ in range(args.ops):
+                cloud.mutate(rng)
+            total_events += harness.sync_events()
+        print(f"回放 {args.rounds} 轮共 {total_events} 个事件，事件同步接口调用 {harness.api_calls} 次"
+              f"（每轮平均 {harness.api_calls / max(1, args.rounds):.1f} 次）")
+        report("事件同步后")
+        harness.scheduled_sync()
+        report("定时增量同步后")
+        harness.close()
+
+
+if __name__ == "__main__":
+    main()
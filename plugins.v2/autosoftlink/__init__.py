@@ -1,14 +1,27 @@
 import os
+import re
+import threading
 import time
-from pathlib import Path
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional, Callable
 
-from app.core.context import MediaInfo
 from app.core.event import eventmanager, Event
 from app.log import logger
 from app.plugins import _PluginBase
-from app.schemas import TransferInfo, FileItem
-from app.schemas.types import EventType, MediaType
+from app.schemas import TransferInfo
+from app.schemas.types import EventType
+
+from .backfill import BackfillProgress, RateLimiter, backfill
+from .fuse import FuseLease, acquire_fuse_access
+from .jobs import DelayedJobQueue, LinkBatch, RecentlyListed
+from .latency import STAGES, LatencyStats
+from .mappings import MappingIndex, PathMapping, parse_mappings
+from .retry import RetryStore
+from .strm import OUTPUT_STRM, OUTPUT_SYMLINK, StrmWriter
+
+
+def _scandir(path: str) -> List[Tuple[str, bool]]:
+    with os.scandir(path) as it:
+        return [(entry.name, entry.is_dir()) for entry in it]
 
 
 class AutoSoftLink(_PluginBase):
@@ -19,7 +32,7 @@ class AutoSoftLink(_PluginBase):
     # 插件图标
     plugin_icon = "softlink.png"
     # 插件版本
-    plugin_version = "1.0"
+    plugin_version = "1.15"
     # 插件作者
     plugin_author = "wu-yanfei"
     # 作者主页
@@ -37,6 +50,43 @@ class AutoSoftLink(_PluginBase):
     _alist_path = None
     _cd2_path = None
     _softlink_path = None
+    # 多路径映射，每行一个：alist路径#cd2路径#软链接路径
+    _mappings = None
+    _fuse_timeout = 10
+    # 等待文件在挂载中出现的最长时间（秒）
+    _poll_timeout = 300
+    # 输出方式：软链接或 .strm 文件
+    _output_mode = OUTPUT_SYMLINK
+    _strm_template = None
+    _strm_exts = None
+    _strm: StrmWriter = None
+
+    # 挂载访问层，带截止时间与熔断
+    _fuse: FuseLease = None
+    # 延迟任务队列，事件处理函数只负责入队
+    _jobs: DelayedJobQueue = None
+    _job_workers = 2
+    # 检查文件是否出现的首次与最大间隔、找到文件后创建软链接前的等待（秒）
+    _poll_interval = 1
+    _poll_max_interval = 30
+    _link_delay = 10
+    # 最近列过的挂载目录
+    _listed: RecentlyListed = None
+    # 等待处理的批次，按挂载目录合并同一目录的入库事件
+    _batches: Dict[str, LinkBatch] = {}
+    _batch_lock = threading.Lock()
+    # 创建失败的软链接，持久化后由定时服务按退避重试
+    _retry: RetryStore = None
+    _retry_interval = 60
+    # 路径映射的最长前缀索引
+    _index: MappingIndex = None
+    # 存量回填：每秒列出的挂载目录数与并发数，同时只运行一个回填任务
+    _backfill_rate = 5
+    _backfill_workers = 4
+    _backfill: BackfillProgress = None
+    _backfill_stop = threading.Event()
+    # 入库到软链接生成的各阶段延迟
+    _latency: LatencyStats = None
 
     def init_plugin(self, config: dict = None):
         logger.info(f"插件初始化")
@@ -46,13 +96,149 @@ class AutoSoftLink(_PluginBase):
             self._alist_path = config.get("alist_path")
             self._cd2_path = config.get("cd2_path")
             self._softlink_path = config.get("softlink_path")
+            self._mappings = config.get("mappings")
+            self._fuse_timeout = config.get("fuse_timeout")
+            self._poll_timeout = config.get("poll_timeout") or 300
+            self._output_mode = config.get("output_mode") or OUTPUT_SYMLINK
+            self._strm_template = config.get("strm_template")
+            self._strm_exts = config.get("strm_exts")
+            self._backfill_rate = config.get("backfill_rate")
+        self._index = self.__mapping_index()
+        self._backfill_stop = threading.Event()
+        self._strm = None
+        if self._output_mode == OUTPUT_STRM:
+            if self._strm_template:
+                self._strm = StrmWriter(self._strm_template,
+                                        [ext for ext in re.split(r"[\s,，]+", self._strm_exts or "") if ext])
+            else:
+                logger.warning("输出方式为 .strm 但未填写 URL 模板，仍创建软链接")
+        try:
+            fuse_timeout = max(1.0, float(self._fuse_timeout))
+        except (TypeError, ValueError):
+            fuse_timeout = 10.0
+        if self._fuse is None or self._fuse.closed:
+            self._fuse = acquire_fuse_access(timeout=fuse_timeout)
+        else:
+            self._fuse.timeout = fuse_timeout
+        if self._jobs is None:
+            self._jobs = DelayedJobQueue(workers=self._job_workers, name="AutoSoftLink",
+                                         on_error=self.__batch_error, on_drop=self.__batch_dropped)
+            self._batches = {}
+        if self._listed is None:
+            self._listed = RecentlyListed()
+        self._retry = RetryStore(records=self.get_data("retry_jobs"),
+                                 save=lambda jobs: self.save_data("retry_jobs", jobs))
+        if len(self._retry):
+            logger.info(f"有 {len(self._retry)} 个软链接等待重试")
+        if self._latency is None:
+            self._latency = LatencyStats(records=self.get_data("latency"))
+        if self._enabled and len(self._retry):
+            # 上次停止时未处理完的批次已转入重试队列并立即到期，不必等到下一次重试服务
+            self.__drain_retry()
 
     @staticmethod
     def get_command() -> List[Dict[str, Any]]:
-        pass
+        """
+        返回插件支持的命令列表
+        """
+        return [{
+            "cmd": "/softlink_backfill",
+            "event": EventType.PluginAction,
+            "desc": "为媒体库已有文件批量生成软链接",
+            "category": "",
+            "data": {
+                "action": "softlink_backfill"
+            }
+        }]
 
     def get_api(self) -> List[Dict[str, Any]]:
-        pass
+        return [
+            {
+                "path": "/fuse",
+                "endpoint": self.api_fuse,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "挂载访问状态",
+                "description": "返回挂载访问层的熔断器状态、超时与错误次数以及各操作的延迟分布"
+            },
+            {
+                "path": "/retry",
+                "endpoint": self.api_retry,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "等待重试的软链接",
+                "description": "返回创建失败、等待重试的软链接及其失败原因、尝试次数与下次尝试时间"
+            },
+            {
+                "path": "/backfill",
+                "endpoint": self.api_backfill,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "存量回填",
+                "description": "为alist路径 path 下的已有文件按路径映射批量生成软链接，后台执行"
+            },
+            {
+                "path": "/backfill/status",
+                "endpoint": self.api_backfill_status,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "存量回填进度",
+                "description": "返回当前或最近一次回填的目录数、文件数、生成与失败数"
+            },
+            {
+                "path": "/latency",
+                "endpoint": self.api_latency,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "软链接生成延迟",
+                "description": "返回最近入库文件从收到事件到生成软链接各阶段耗时的分位数与最近任务明细"
+            }
+        ]
+
+    def api_fuse(self) -> Dict[str, Any]:
+        """
+        API：挂载访问层状态与延迟直方图。
+        """
+        return self._fuse.stats() if self._fuse else {}
+
+    def api_retry(self) -> List[Dict[str, Any]]:
+        """
+        API：等待重试的软链接。
+        """
+        return self._retry.list() if self._retry is not None else []
+
+    def api_backfill(self, path: str) -> Dict[str, Any]:
+        """
+        API：开始存量回填。
+        """
+        started, message = self.start_backfill(path)
+        return {"success": started, "message": message}
+
+    def api_backfill_status(self) -> Dict[str, Any]:
+        """
+        API：存量回填进度。
+        """
+        return self._backfill.to_dict() if self._backfill else {}
+
+    def api_latency(self) -> Dict[str, Any]:
+        """
+        API：入库到软链接生成的延迟统计。
+        """
+        return self._latency.to_dict() if self._latency is not None else {}
+
+    def get_service(self) -> List[Dict[str, Any]]:
+        """
+        注册插件公共服务
+        """
+        if not self._enabled:
+            return []
+        return [{
+            "id": "AutoSoftLinkRetry",
+            "name": "软链接失败重试服务",
+            "trigger": "interval",
+            "func": self.__drain_retry,
+            "kwargs": {"seconds": self._retry_interval}
+        }]
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         return [
@@ -66,7 +252,7 @@ class AutoSoftLink(_PluginBase):
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
-                                    'md': 4
+                                    'md': 3
                                 },
                                 'content': [
                                     {
@@ -82,7 +268,7 @@ class AutoSoftLink(_PluginBase):
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
-                                    'md': 8
+                                    'md': 3
                                 },
                                 'content': [
                                     {
@@ -93,6 +279,40 @@ class AutoSoftLink(_PluginBase):
                                         }
                                     }
                                 ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'fuse_timeout',
+                                            'label': '挂载访问超时（秒）',
+                                            'type': 'number'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'poll_timeout',
+                                            'label': '等待文件出现（秒）',
+                                            'type': 'number'
+                                        }
+                                    }
+                                ]
                             }
                         ]
                     },
@@ -149,6 +369,109 @@ class AutoSoftLink(_PluginBase):
                             }
                         ]
                     },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'output_mode',
+                                            'label': '输出方式',
+                                            'items': [
+                                                {'title': '软链接', 'value': OUTPUT_SYMLINK},
+                                                {'title': '.strm 文件', 'value': OUTPUT_STRM}
+                                            ]
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'strm_template',
+                                            'label': '.strm URL 模板',
+                                            'placeholder': 'http://alist:5244/d/115/media/{path}'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'strm_exts',
+                                            'label': '.strm 扩展名',
+                                            'placeholder': 'mkv,mp4,ts,iso（留空为常见视频格式）'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'mappings',
+                                            'label': '多路径映射',
+                                            'rows': 3,
+                                            'placeholder': '每行一个：alist路径#cd2路径#软链接路径'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'backfill_rate',
+                                            'label': '回填每秒列出目录数',
+                                            'type': 'number'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
                     {
                         'component': 'VRow',
                         'content': [
@@ -163,7 +486,7 @@ class AutoSoftLink(_PluginBase):
                                         'props': {
                                             'type': 'info',
                                             'variant': 'tonal',
-                                            'text': '延迟时间需大于cd2缓存时间。'
+                                            'text': '延迟时间后开始检查文件，未出现时刷新所在目录并逐步延长检查间隔，超过等待时间放弃。访问cd2挂载超过超时时间按失败处理，连续失败后暂停访问挂载并逐步延长重试间隔。'
                                         }
                                     }
                                 ]
@@ -184,7 +507,7 @@ class AutoSoftLink(_PluginBase):
                                         'props': {
                                             'type': 'info',
                                             'variant': 'tonal',
-                                            'text': 'alist路径、cd2路径以及软链接路径均写到媒体库层，比如/115/media/电影、/115/media/电视剧等，则填写/115/media。'
+                                            'text': 'alist路径、cd2路径以及软链接路径均写到媒体库层，比如/115/media/电影、/115/media/电视剧等，则填写/115/media。不同媒体库在不同挂载下时填写多路径映射，与上方路径一起按最长路径匹配。输出方式为 .strm 时，视频文件写为“原文件名.strm”，内容为按模板生成的直链，无需等待文件在cd2出现，模板可用 {path}（相对映射的路径）、{mount_path}、{name}、{size}。已有文件可通过命令 /softlink_backfill alist目录 批量回填，按回填每秒列出目录数限速，0 为不限速。'
                                         }
                                     }
                                 ]
@@ -198,53 +521,399 @@ class AutoSoftLink(_PluginBase):
             "delay": "",
             "alist_path": "",
             "cd2_path": "",
-            "softlink_path": ""
+            "softlink_path": "",
+            "mappings": "",
+            "output_mode": OUTPUT_SYMLINK,
+            "strm_template": "",
+            "strm_exts": "",
+            "backfill_rate": 5,
+            "fuse_timeout": 10,
+            "poll_timeout": 300
         }
 
     def get_state(self) -> bool:
         return self._enabled
 
     def get_page(self) -> List[dict]:
-        pass
+        """
+        拼装插件详情页面，展示最近入库文件各阶段耗时的分位数
+        """
+        stats = self._latency.percentiles() if self._latency is not None else {}
+        if not any(stat.get("count") for stat in stats.values()):
+            return [
+                {
+                    'component': 'div',
+                    'text': '暂无记录',
+                    'props': {
+                        'class': 'text-center',
+                    }
+                }
+            ]
 
-    def stop_service(self):
-        pass
-
-    def find_file(self, new_file_path):
-        # 将目标文件路径转为绝对路径
-        target_path = os.path.abspath(new_file_path)
-        current_path = os.path.abspath(self._cd2_path)
-             
-        # 获取目标文件路径的各个部分
-        path_parts = target_path[len(current_path):].lstrip(os.sep).split(os.sep)
-        
-        # 依次进入每一级目录
-        for part in path_parts[:-1]:  # 处理到倒数第二层
-            time.sleep(2)
-            current_path = os.path.join(current_path, part)
-            
-            # 刷新当前目录的内容
+        def seconds(value: Optional[float]) -> str:
+            return "-" if value is None else f"{value:.1f}s"
+
+        headers = ['阶段', '次数', 'P50', 'P90', 'P99', '最大']
+        rows = []
+        for name, label in STAGES:
+            stat = stats.get(name) or {}
+            cells = [label, stat.get("count", 0),
+                     *(seconds(stat.get(key)) for key in ("p50", "p90", "p99", "max"))]
+            rows.append({
+                'component': 'tr',
+                'content': [
+                    {
+                        'component': 'td',
+                        'props': {
+                            'class': 'whitespace-nowrap'
+                        },
+                        'text': str(cell)
+                    } for cell in cells
+                ]
+            })
+        return [
+            {
+                'component': 'VRow',
+                'content': [
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                        },
+                        'content': [
+                            {
+                                'component': 'VTable',
+                                'props': {
+                                    'hover': True
+                                },
+                                'content': [
+                                    {
+                                        'component': 'thead',
+                                        'content': [
+                                            {
+                                                'component': 'th',
+                                                'props': {
+                                                    'class': 'text-start ps-4'
+                                                },
+                                                'text': header
+                                            } for header in headers
+                                        ]
+                                    },
+                                    {
+                                        'component': 'tbody',
+                                        'content': rows
+                                    }
+                                ]
+                            }
+                        ]
+                    }
+                ]
+            }
+        ]
+
+    def process_batch(self, batch: LinkBatch):
+        """
+        执行一个目录批次的一步，返回下一步前的等待秒数，批次结束时返回 None。
+
+        先直接检查目标文件，缓存已是最新时无需刷新；有文件未出现时只刷新最深的已存在目录，
+        使缺失的下一级出现，再按指数退避重新检查，直到全部出现或超过最长等待时间。
+        各次检查之间的等待交给任务队列，不占用工作线程；找到文件后再等待一段时间一起创建软链接。
+        以 .strm 输出的文件不访问挂载，无需等待其出现。
+        """
+        strm = self._strm
+
+        def as_strm(item: Tuple[str, str, str]) -> bool:
+            return strm is not None and strm.applies(item[1])
+
+        now = time.monotonic()
+        if not batch.sealed:
+            # 开始处理后不再接收新文件
+            with self._batch_lock:
+                batch.sealed = True
+                if self._batches.get(batch.mount_dir) is batch:
+                    del self._batches[batch.mount_dir]
+            batch.deadline = now + self.__poll_timeout()
+            batch.started_at = now
+            batch.backoff = self._poll_interval
+            logger.info(f"开始处理：{batch.mount_dir}，共 {len(batch.files)} 个文件")
+        if not batch.found:
             try:
-                os.listdir(current_path)
-            except FileNotFoundError:
+                batch.attempts += 1
+                missing = [item for item in batch.files if not as_strm(item) and not self._fuse.isfile(item[1])]
+                if missing and now < batch.deadline:
+                    refresh_start = time.monotonic()
+                    self.__refresh_deepest(batch)
+                    batch.refresh_seconds += time.monotonic() - refresh_start
+                    return batch.next_backoff(self._poll_max_interval, now)
+            except OSError as e:
+                # 包括 FuseTimeoutError 与 CircuitOpenError，未到截止时间时稍后重试
+                logger.warning(f"访问cd2挂载失败: {e}")
+                if now < batch.deadline:
+                    return batch.next_backoff(self._poll_max_interval, now)
+                missing = [item for item in batch.files if not as_strm(item)]
+            for item in missing:
+                logger.info(f"入库文件在cd2路径刷新失败：{item[0]}")
+                self.__failed(item, "文件未在cd2路径出现", batch.sizes.get(item[2]))
+            batch.files = [item for item in batch.files if item not in missing]
+            if not batch.files:
+                return None
+            logger.info(f"{batch.mount_dir} 第 {batch.attempts} 次检查找到 {len(batch.files)} 个文件")
+            batch.found = True
+            batch.found_at = time.monotonic()
+            return self._link_delay if not all(as_strm(item) for item in batch.files) else 0
+
+        link_start = time.monotonic()
+        for item in batch.files:
+            create_start = time.monotonic()
+            linked = self.__link(item, batch.mount_root, batch.sizes.get(item[2]))
+            received_at = batch.received.get(item[2])
+            if linked and received_at is not None and self._latency is not None:
+                done = time.monotonic()
+                self._latency.record(item[0], {
+                    "delay": batch.started_at - received_at,
+                    "visibility": batch.found_at - batch.started_at,
+                    "refresh": batch.refresh_seconds,
+                    "link_wait": link_start - batch.found_at,
+                    "create": done - create_start,
+                    "total": done - received_at,
+                }, batch.attempts)
+        return None
+
+    def __link(self, item: Tuple[str, str, str], mount_root: str, size: Optional[int] = None,
+               quiet: bool = False, failures: Optional[list] = None) -> Optional[bool]:
+        """
+        为一个文件生成软链接或 .strm，失败时记入重试队列。
+
+        :param item: (媒体库文件路径, 挂载文件路径, 软链接路径)
+        :param mount_root: 所属映射的cd2路径。
+        :param quiet: 成功与跳过时不逐条记录日志，用于存量回填。
+        :param failures: 提供时失败以 (item, 原因, 大小) 追加到该列表，由调用方批量记入重试队列。
+        :return: 是否成功；软链接路径已被普通文件、目录或指向其他文件的软链接占用时重试也无法成功，
+                 不记入重试队列并返回 None
+        """
+        _, mount_file, symlink_target = item
+        strm = self._strm
+        try:
+            os.makedirs(os.path.dirname(symlink_target), exist_ok=True)
+            if strm is not None and strm.applies(mount_file):
+                strm_path = strm.local_path(symlink_target)
+                strm.write(strm_path, os.path.relpath(mount_file, mount_root), mount_file, size)
+                self._retry.done(symlink_target)
+                if not quiet:
+                    logger.info(f"生成strm成功: {strm_path}")
+            elif os.path.islink(symlink_target) and os.readlink(symlink_target) == mount_file:
+                # 之前已创建（如重试前手动处理过）
+                self._retry.done(symlink_target)
+            elif not os.path.lexists(symlink_target):
+                os.symlink(mount_file, symlink_target)
+                self._retry.done(symlink_target)
+                if not quiet:
+                    logger.info(f"生成软链接成功: {symlink_target} -> {mount_file}")
+            elif not os.path.islink(symlink_target):
+                if not quiet:
+                    logger.warning(f"软链接路径已被文件或目录占用，跳过: {symlink_target}")
+                self._retry.done(symlink_target)
                 return None
-            
-            if not os.path.isdir(current_path):
+            else:
+                if not quiet:
+                    logger.warning(f"软链接路径已被指向其他文件的软链接占用，跳过: "
+                                   f"{symlink_target} -> {os.readlink(symlink_target)}")
+                self._retry.done(symlink_target)
                 return None
-        
-        # 现在 current_path 是目标目录，检查目标文件
-        target_file = os.path.join(current_path, path_parts[-1])
-        if os.path.isfile(target_file):
-            return target_file
+        except OSError as e:
+            logger.error(f"生成软链接失败: {symlink_target}，{e}")
+            self.__failed(item, str(e), size, failures)
+            return False
+        return True
+
+    def start_backfill(self, path: str, on_finish: Optional[Callable[[BackfillProgress], None]] = None) -> Tuple[bool, str]:
+        """
+        在后台为alist目录下的已有文件批量生成软链接。
+
+        挂载目录并行遍历、每个目录只列出一次，列出后立即为其中的文件生成软链接；
+        目录列表经挂载访问层执行并按配置限速，白天运行也不会占满挂载。
+
+        :param path: 媒体库中的alist目录路径。
+        :param on_finish: 回填结束后的回调。
+        :return: (是否已开始, 说明)
+        """
+        if not self._enabled or self._jobs is None:
+            return False, "插件未启用"
+        if self._backfill and self._backfill.running:
+            return False, f"已有回填任务在进行：{self._backfill.root}"
+        path = (path or "").strip()
+        translated = self._index.translate_dir(path) if path else None
+        if not translated:
+            return False, f"目录不属于任何路径映射：{path}"
+        alist_dir = os.path.normpath(path)
+        mapping, mount_dir, softlink_dir = translated
+        progress = self._backfill = BackfillProgress(alist_dir)
+        limiter = RateLimiter(self.__backfill_rate())
+        stop_event = self._backfill_stop
+
+        def link_dir(rel_dir: str, names: List[str]) -> Tuple[int, int, int]:
+            linked = skipped = 0
+            failures = []
+            for name in names:
+                rel_path = os.path.join(rel_dir, name) if rel_dir else name
+                item = (os.path.join(alist_dir, rel_path), os.path.join(mount_dir, rel_path),
+                        os.path.join(softlink_dir, rel_path))
+                result = self.__link(item, mapping.cd2_path, quiet=True, failures=failures)
+                if result:
+                    linked += 1
+                elif result is None:
+                    skipped += 1
+            # 每个目录的失败一次写入重试队列，避免逐个持久化整个队列
+            if failures:
+                retrying, abandoned = self._retry.fail_many(failures)
+                logger.info(f"回填 {os.path.join(alist_dir, rel_dir)}：{len(failures)} 个文件生成失败，"
+                            f"{retrying} 个已加入重试队列" + (f"，{abandoned} 个多次重试仍失败已放弃" if abandoned else ""))
+            return linked, len(failures), skipped
+
+        def run():
+            logger.info(f"开始回填：{alist_dir} -> {softlink_dir}")
+            try:
+                backfill(mount_dir, lambda p: self._fuse.call("scandir", _scandir, p), link_dir, progress,
+                         workers=self._backfill_workers, limiter=limiter, stop_event=stop_event)
+            except Exception as e:
+                logger.error(f"回填 {alist_dir} 失败: {e}")
+            logger.info(f"回填{'已中止' if progress.cancelled else '完成'}：{alist_dir}，{progress.summary()}")
+            if on_finish:
+                on_finish(progress)
+
+        threading.Thread(target=run, name="AutoSoftLinkBackfill", daemon=True).start()
+        return True, f"开始回填：{alist_dir}，每秒最多列出 {limiter.rate:g} 个目录"
+
+    @eventmanager.register(EventType.PluginAction)
+    def backfill_command(self, event: Event):
+        """
+        处理 /softlink_backfill 命令：带alist目录参数时开始回填，不带参数时回复当前进度
+        """
+        event_data = event.event_data
+        if not event_data or event_data.get("action") != "softlink_backfill":
+            return
+
+        def reply(title: str, text: str):
+            self.post_message(
+                channel=event_data.get("channel"),
+                title=title,
+                text=text,
+                userid=event_data.get("user")
+            )
+
+        path = (event_data.get("arg_str") or "").strip()
+        if not path:
+            if self._backfill:
+                state = "进行中" if self._backfill.running else "已结束"
+                reply(f"回填{state}：{self._backfill.root}", self._backfill.summary())
+            else:
+                reply("未提供目录", "请在命令后提供媒体库中的alist目录，如 /softlink_backfill /115/media/电视剧")
+            return
+        started, message = self.start_backfill(
+            path, on_finish=lambda progress: reply(f"回填{'已中止' if progress.cancelled else '完成'}：{progress.root}",
+                                                   progress.summary()))
+        reply("开始回填" if started else "无法开始回填", message)
+
+    def __failed(self, item: Tuple[str, str, str], reason: str, size: Optional[int] = None,
+                 failures: Optional[list] = None):
+        """
+        记录创建失败的软链接，稍后由重试服务处理；提供 failures 时只追加到列表，由调用方批量记录。
+        """
+        if failures is not None:
+            failures.append((item, reason, size))
+            return
+        if self._retry.fail(*item, reason=reason, size=size):
+            logger.info(f"已加入重试队列：{item[0]}")
         else:
-            return None
+            logger.warning(f"多次重试仍失败，放弃：{item[0]}，{reason}，请手动处理")
+
+    def __batch_error(self, fn: Callable, args: tuple, error: BaseException):
+        """
+        批次处理抛出异常，记录堆栈并把批次中的文件转入重试队列。
+        """
+        batch: LinkBatch = args[0]
+        logger.error(f"处理批次出错：{batch.mount_dir}，{error}", exc_info=True)
+        for item in batch.files:
+            self.__failed(item, f"处理出错：{error}", batch.sizes.get(item[2]))
+
+    def __batch_dropped(self, fn: Callable, args: tuple):
+        """
+        插件停止时未处理完的批次，转入重试队列，下次启动后继续处理。
+        """
+        batch: LinkBatch = args[0]
+        if self._retry is not None:
+            self._retry.requeue(batch.files, "插件停止时未处理", batch.sizes)
+
+    def __drain_retry(self):
+        """
+        取出到期的重试任务，按挂载目录分批提交到任务队列。
+        """
+        if self._jobs is None or self._retry is None:
+            return
+        # 处理一批最长需要等待文件出现与创建前的等待，期间不再重复取出
+        jobs = self._retry.lease(hold=self.__poll_timeout() + self._link_delay + 600)
+        if not jobs:
+            return
+        batches: Dict[str, LinkBatch] = {}
+        for job in jobs:
+            mount_dir = os.path.abspath(os.path.dirname(job["mount_file"]))
+            batch = batches.get(mount_dir)
+            if batch is None:
+                # 映射已被删除时最多刷新到挂载目录本身
+                mount_root = self._index.mount_root(mount_dir) or mount_dir
+                batch = batches[mount_dir] = LinkBatch(mount_root, mount_dir)
+            batch.add(job["file_path"], job["mount_file"], job["symlink_target"], job.get("size"))
+        for batch in batches.values():
+            self._jobs.submit(self.process_batch, 0, batch)
+        logger.info(f"重试 {len(jobs)} 个软链接，共 {len(batches)} 个目录")
+
+    def __refresh_deepest(self, batch: LinkBatch):
+        """
+        列出批次所在目录或其最深的已存在祖先目录，触发挂载端刷新；最近列过的目录跳过。
+        """
+        path = batch.mount_dir
+        while len(path) > len(batch.mount_root) and not self._fuse.isdir(path):
+            path = os.path.dirname(path)
+        if self._listed.fresh(path):
+            return
+        try:
+            self._fuse.listdir(path)
+        except FileNotFoundError:
+            return
+        self._listed.mark(path)
+
+    def __mapping_index(self) -> MappingIndex:
+        """
+        多路径映射与单路径配置一起建立索引，按最长前缀匹配。
+        """
+        legacy = []
+        if self._alist_path and self._cd2_path and self._softlink_path:
+            legacy.append(PathMapping(os.path.normpath(self._alist_path), os.path.normpath(self._cd2_path),
+                                      os.path.normpath(self._softlink_path)))
+        try:
+            return MappingIndex(parse_mappings(self._mappings) + legacy)
+        except ValueError as e:
+            logger.error(f"{e}，多路径映射未生效")
+            return MappingIndex(legacy)
+
+    def __backfill_rate(self) -> float:
+        try:
+            return max(0.0, float(self._backfill_rate))
+        except (TypeError, ValueError):
+            return 5.0
+
+    def __poll_timeout(self) -> float:
+        try:
+            return max(0.0, float(self._poll_timeout))
+        except (TypeError, ValueError):
+            return 300.0
 
     @eventmanager.register(EventType.TransferComplete)
     def download(self, event: Event):
         """
         调用AutoSoftLink生成软链接
         """
-        if not self._enabled or not self._alist_path or not self._cd2_path or not self._softlink_path or not self._delay:
+        if not self._enabled or not self._index or not self._delay:
             return
         event_info: dict = event.event_data
         if not event_info:
@@ -255,30 +924,27 @@ class AutoSoftLink(_PluginBase):
 
         # 媒体库Alist文件路径
         file_path = transferinfo.target_item.path
-        logger.info(f"{self._delay}秒后处理：{file_path}")
-        time.sleep(int(self._delay))
-        logger.info(f"开始处理：{file_path}")
-
-        if file_path.startswith(self._alist_path):
-            new_file_path = file_path.replace(self._alist_path, self._cd2_path, 1)
-            
-            relative_path = os.path.relpath(file_path, self._alist_path)
-            
-            symlink_target = os.path.join(self._softlink_path, relative_path)
-
-            os.makedirs(os.path.dirname(symlink_target), exist_ok=True)
+        size = transferinfo.target_item.size
 
-            # 模拟刷新
-            if not self.find_file(new_file_path):
-                logger.info(f"入库文件在cd2路径刷新失败，请手动尝试")
-                return
-            time.sleep(10)
+        # 按路径分量的最长前缀选择映射
+        translated = self._index.translate(file_path)
+        if translated:
+            mapping, new_file_path, symlink_target = translated
 
-            if not os.path.exists(symlink_target):
-                os.symlink(new_file_path, symlink_target)
-                logger.info(f"生成软链接成功: {symlink_target} -> {new_file_path}")
+            # 入队后立即返回，延迟与逐级刷新由任务队列调度；同一目录等待中的批次直接并入
+            mount_dir = os.path.abspath(os.path.dirname(new_file_path))
+            with self._batch_lock:
+                batch = self._batches.get(mount_dir)
+                merged = batch is not None
+                if not merged:
+                    batch = LinkBatch(mapping.cd2_path, mount_dir)
+                    self._batches[mount_dir] = batch
+                batch.add(file_path, new_file_path, symlink_target, size, received_at=time.monotonic())
+            if merged:
+                logger.info(f"并入等待中的批次：{file_path}，该目录共 {len(batch.files)} 个文件")
             else:
-                logger.info(f"生成软链接失败: {symlink_target}")
+                self._jobs.submit(self.process_batch, int(self._delay), batch)
+                logger.info(f"{self._delay}秒后处理：{file_path}，当前队列中 {len(self._jobs)} 个批次")
         else:
             logger.info(f"文件匹配失败，请检查参数")
 
@@ -286,4 +952,16 @@ class AutoSoftLink(_PluginBase):
         """
         退出插件
         """
-        pass
+        if self._jobs is not None:
+            dropped = self._jobs.shutdown()
+            self._jobs = None
+            with self._batch_lock:
+                self._batches = {}
+            if dropped:
+                logger.warning(f"插件停止，{dropped} 个未处理的软链接批次已转入重试队列，启动后继续处理")
+        if self._backfill_stop:
+            self._backfill_stop.set()
+        if self._fuse is not None:
+            self._fuse.shutdown()
+        if self._latency is not None:
+            self.save_data("latency", self._latency.dump())
@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class RateLimiter:
+    """
+    令牌桶限速，acquire 在令牌不足时阻塞等待。
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        """
+        :param rate: 每秒发放的令牌数，不大于 0 时不限速。
+        :param burst: 桶容量，默认为 rate（至少为 1）。
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_seconds = (1 - self._tokens) / self.rate
+            self._sleep(wait_seconds)
+
+
+class BackfillProgress:
+    """
+    回填任务的进度，供命令回复与 API 查询。
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.dirs_listed = 0
+        self.dirs_pending = 0
+        self.dirs_failed = 0
+        self.files_seen = 0
+        self.files_linked = 0
+        self.files_failed = 0
+        # 目标路径已被普通文件、目录或指向其他文件的软链接占用，无法通过重试解决的文件
+        self.files_skipped = 0
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    @property
+    def running(self) -> bool:
+        return self.finished_at is None
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        return {
+            "root": self.root,
+            "running": self.running,
+            "cancelled": self.cancelled,
+            "started_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_at)),
+            "seconds": round(end - self.started_at, 1),
+            "dirs_listed": self.dirs_listed,
+            "dirs_pending": self.dirs_pending,
+            "dirs_failed": self.dirs_failed,
+            "files_seen": self.files_seen,
+            "files_linked": self.files_linked,
+            "files_failed": self.files_failed,
+            "files_skipped": self.files_skipped,
+        }
+
+    def summary(self) -> str:
+        return (f"列出目录 {self.dirs_listed} 个（失败 {self.dirs_failed} 个），"
+                f"文件 {self.files_seen} 个，生成 {self.files_linked} 个，失败 {self.files_failed} 个，"
+                f"跳过 {self.files_skipped} 个，"
+                f"耗时 {self.to_dict()['seconds']} 秒")
+
+
+def backfill(mount_dir: str, scandir: Callable[[str], List[Tuple[str, bool]]],
+             link_dir: Callable[[str, List[str]], Tuple[int, int, int]], progress: BackfillProgress,
+             workers: int = 4, limiter: Optional[RateLimiter] = None,
+             stop_event: Optional[threading.Event] = None) -> BackfillProgress:
+    """
+    并行遍历挂载目录，每个目录列出一次（即刷新一次），列出后立即为其中的文件批量生成软链接。
+
+    :param mount_dir: 挂载中的起始目录。
+    :param scandir: 列出目录的函数，返回 (名称, 是否目录)，经挂载访问层执行。
+    :param link_dir: 为一个目录中的文件生成软链接的函数，参数为 (相对起始目录的目录路径, 文件名列表)，
+                     返回 (成功数, 失败数, 跳过数)。
+    :param progress: 进度，遍历过程中实时更新。
+    :param workers: 同时列出的目录数。
+    :param limiter: 目录列表限速。
+    :param stop_event: 停止信号，收到后不再列出新的目录。
+    """
+
+    def visit(rel_dir: str) -> List[str]:
+        if limiter:
+            limiter.acquire()
+        try:
+            entries = scandir(os.path.join(mount_dir, rel_dir) if rel_dir else mount_dir)
+        except OSError:
+            progress.add(dirs_failed=1, dirs_pending=-1)
+            return []
+        files = sorted(name for name, is_dir in entries if not is_dir)
+        linked, failed, skipped = link_dir(rel_dir, files) if files else (0, 0, 0)
+        subdirs = sorted(os.path.join(rel_dir, name) if rel_dir else name for name, is_dir in entries if is_dir)
+        progress.add(dirs_listed=1, dirs_pending=len(subdirs) - 1, files_seen=len(files),
+                     files_linked=linked, files_failed=failed, files_skipped=skipped)
+        return subdirs
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="AutoSoftLinkBackfill") as pool:
+            progress.add(dirs_pending=1)
+            pending = {pool.submit(visit, "")}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    subdirs = future.result()
+                    if stop_event is not None and stop_event.is_set():
+                        progress.cancelled = True
+                        continue
+                    pending |= {pool.submit(visit, subdir) for subdir in subdirs}
+    finally:
+        progress.finished_at = time.time()
+    return progress
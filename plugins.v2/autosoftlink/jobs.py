@@ -0,0 +1,195 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class LinkBatch:
+    """
+    同一挂载目录下的一批软链接任务。
+
+    整理剧集包时每一集都会触发一次入库事件，同一目录的事件在等待期内合并到一个批次，
+    一起等待文件在挂载中出现，再一起创建软链接；批次开始处理后封存，之后的事件进入新批次。
+    """
+
+    def __init__(self, mount_root: str, mount_dir: str):
+        """
+        :param mount_root: 所属映射的cd2路径，刷新不会越过该目录。
+        :param mount_dir: 文件所在的挂载目录。
+        """
+        self.mount_root = os.path.abspath(mount_root)
+        self.mount_dir = os.path.abspath(mount_dir)
+        # (媒体库文件路径, 挂载文件路径, 软链接路径)
+        self.files: List[Tuple[str, str, str]] = []
+        # 软链接路径 -> 文件大小，写入 .strm 时使用
+        self.sizes: Dict[str, int] = {}
+        self.sealed = False
+        self.found = False
+        # 等待文件出现的截止时间、下次检查前的等待秒数与已检查次数
+        self.deadline = 0.0
+        self.backoff = 0.0
+        self.attempts = 0
+        # 延迟统计（单调时钟）：软链接路径 -> 收到入库事件的时间，开始处理、文件全部出现的时间与刷新目录累计耗时
+        self.received: Dict[str, float] = {}
+        self.started_at = 0.0
+        self.found_at = 0.0
+        self.refresh_seconds = 0.0
+
+    def add(self, file_path: str, mount_file: str, symlink_target: str, size: Optional[int] = None,
+            received_at: Optional[float] = None) -> None:
+        """
+        :param received_at: 收到入库事件的时间，只有提供时才计入延迟统计。
+        """
+        self.files.append((file_path, mount_file, symlink_target))
+        if size is not None:
+            self.sizes[symlink_target] = size
+        if received_at is not None:
+            self.received[symlink_target] = received_at
+
+    def next_backoff(self, maximum: float, now: float) -> float:
+        """
+        本次检查后的等待秒数，每次翻倍，不超过上限与截止时间。
+        """
+        delay = min(self.backoff, maximum, max(0.0, self.deadline - now))
+        self.backoff = min(self.backoff * 2, maximum)
+        return delay
+
+
+class RecentlyListed:
+    """
+    最近列过的挂载目录。
+
+    列目录即触发挂载端刷新，短时间内重复列同一目录没有意义，
+    多个批次共享祖先目录或重试间隔很短时据此跳过。
+    """
+
+    def __init__(self, ttl: float = 5, maxlen: int = 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param ttl: 列目录后视为新鲜的秒数。
+        :param maxlen: 最多记录的目录数。
+        """
+        self.ttl = ttl
+        self.maxlen = maxlen
+        self._clock = clock
+        self._listed: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def fresh(self, path: str) -> bool:
+        with self._lock:
+            listed_at = self._listed.get(path)
+            if listed_at is not None and self._clock() - listed_at < self.ttl:
+                self.hits += 1
+                return True
+            return False
+
+    def mark(self, path: str) -> None:
+        with self._lock:
+            self._listed[path] = self._clock()
+            self._listed.move_to_end(path)
+            while len(self._listed) > self.maxlen:
+                self._listed.popitem(last=False)
+
+
+class DelayedJobQueue:
+    """
+    延迟任务队列。
+
+    任务按到期时间排在最小堆中，由一个调度线程在到期时交给小线程池执行；
+    任务函数返回秒数时，按该延迟重新排队，用于把多步处理中的等待拆成多次调度，不占用工作线程。
+    任务抛出的异常交给 on_error，停止后未执行的任务交给 on_drop，由调用方记录或持久化。
+    """
+
+    def __init__(self, workers: int = 2, name: str = "DelayedJobQueue",
+                 clock: Callable[[], float] = time.monotonic,
+                 on_error: Optional[Callable[[Callable, tuple, BaseException], None]] = None,
+                 on_drop: Optional[Callable[[Callable, tuple], None]] = None):
+        """
+        :param workers: 工作线程数。
+        :param name: 线程名前缀。
+        :param clock: 单调时钟。
+        :param on_error: 任务抛出异常时调用 on_error(fn, args, 异常)，在异常处理块内调用，可记录完整堆栈。
+        :param on_drop: 任务因队列停止被丢弃时调用 on_drop(fn, args)，包括停止后才要求重新排队的执行中任务。
+        """
+        self._clock = clock
+        self._on_error = on_error
+        self._on_drop = on_drop
+        self._heap: List[Tuple[float, int, Callable, tuple]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._running = 0
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix=name)
+        self._scheduler = threading.Thread(target=self._schedule, name=f"{name}-scheduler", daemon=True)
+        self._scheduler.start()
+
+    def submit(self, fn: Callable[..., Optional[float]], delay: float = 0, *args: Any) -> None:
+        """
+        提交任务，delay 秒后执行 fn(*args)。
+
+        :param fn: 任务函数，返回秒数时按该延迟再次执行，返回 None 时结束。
+        """
+        with self._cond:
+            if not self._stopped:
+                heapq.heappush(self._heap, (self._clock() + max(0.0, delay), next(self._seq), fn, args))
+                self._cond.notify()
+                return
+        if self._on_drop is not None:
+            self._on_drop(fn, args)
+
+    def __len__(self) -> int:
+        """
+        排队中与执行中的任务数。
+        """
+        with self._cond:
+            return len(self._heap) + self._running
+
+    def _schedule(self) -> None:
+        with self._cond:
+            while not self._stopped:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                wait = self._heap[0][0] - self._clock()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                _, _, fn, args = heapq.heappop(self._heap)
+                self._running += 1
+                self._executor.submit(self._run, fn, args)
+
+    def _run(self, fn: Callable, args: tuple) -> None:
+        delay = None
+        try:
+            delay = fn(*args)
+        except Exception as e:
+            if self._on_error is None:
+                raise
+            self._on_error(fn, args, e)
+        finally:
+            with self._cond:
+                self._running -= 1
+            if delay is not None:
+                self.submit(fn, delay, *args)
+
+    def shutdown(self) -> int:
+        """
+        停止调度并丢弃未到期的任务（逐个交给 on_drop），不等待执行中的任务。
+
+        :return: 丢弃的任务数
+        """
+        with self._cond:
+            self._stopped = True
+            dropped = [(fn, args) for _, _, fn, args in self._heap]
+            self._heap.clear()
+            self._cond.notify_all()
+        self._executor.shutdown(wait=False)
+        if self._on_drop is not None:
+            for fn, args in dropped:
+                self._on_drop(fn, args)
+        return len(dropped)
@@ -0,0 +1,103 @@
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+# 从入库事件到软链接生成的各阶段与显示名称
+STAGES = [
+    ("delay", "固定延迟"),
+    ("visibility", "等待出现"),
+    ("refresh", "其中刷新目录"),
+    ("link_wait", "创建前等待"),
+    ("create", "创建"),
+    ("total", "总耗时"),
+]
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """
+    最近秩法计算分位数（第 ceil(q*n) 小的值），values 已排序。
+    """
+    index = min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))
+    return values[index]
+
+
+class LatencyStats:
+    """
+    入库到软链接生成的延迟统计。
+
+    每个阶段保留最近 window 个样本，查询时计算分位数；另保留最近若干个任务的明细。
+    只统计由入库事件触发且成功生成的文件，重试与存量回填不计入。
+    """
+
+    def __init__(self, records: Optional[Dict[str, Any]] = None, window: int = 500, recent: int = 20):
+        """
+        :param records: dump 的结果，用于重启后恢复。
+        :param window: 每个阶段保留的样本数。
+        :param recent: 保留的任务明细数。
+        """
+        records = records or {}
+        samples = records.get("samples") or {}
+        self.window = window
+        self._samples = {name: deque(samples.get(name) or [], maxlen=window) for name, _ in STAGES}
+        self._recent = deque(records.get("recent") or [], maxlen=recent)
+        self._lock = threading.Lock()
+
+    def record(self, file_path: str, stages: Dict[str, float], attempts: int) -> None:
+        """
+        :param file_path: 媒体库文件路径。
+        :param stages: 阶段 -> 秒数。
+        :param attempts: 检查文件是否出现的次数。
+        """
+        with self._lock:
+            for name, seconds in stages.items():
+                if name in self._samples:
+                    self._samples[name].append(round(seconds, 3))
+            self._recent.append({
+                "file": file_path,
+                "finished_at": time.time(),
+                "attempts": attempts,
+                **{name: round(seconds, 3) for name, seconds in stages.items()},
+            })
+
+    def percentiles(self) -> Dict[str, Dict[str, float]]:
+        """
+        各阶段的样本数与 p50/p90/p99/最大值（秒）。
+        """
+        with self._lock:
+            snapshot = {name: sorted(values) for name, values in self._samples.items()}
+        result = {}
+        for name, values in snapshot.items():
+            if not values:
+                result[name] = {"count": 0}
+                continue
+            result[name] = {
+                "count": len(values),
+                "p50": _percentile(values, 0.5),
+                "p90": _percentile(values, 0.9),
+                "p99": _percentile(values, 0.99),
+                "max": values[-1],
+            }
+        return result
+
+    def recent(self) -> List[Dict[str, Any]]:
+        """
+        最近的任务明细，从新到旧。
+        """
+        with self._lock:
+            return list(reversed(self._recent))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "window": self.window,
+            "stages": self.percentiles(),
+            "recent": self.recent(),
+        }
+
+    def dump(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "samples": {name: list(values) for name, values in self._samples.items()},
+                "recent": list(self._recent),
+            }
@@ -0,0 +1,135 @@
+import os
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+
+class PathMapping(NamedTuple):
+    """
+    一组路径映射：媒体库中的alist路径与对应的cd2挂载路径、软链接路径。
+    """
+    alist_path: str
+    cd2_path: str
+    softlink_path: str
+
+
+def parse_mappings(mappings: Optional[str]) -> List[PathMapping]:
+    """
+    解析多路径映射配置，每行一个：alist路径#cd2路径#软链接路径，# 开头的行为注释。
+
+    :param mappings: 多行配置文本。
+    """
+    result = []
+    for line in (mappings or "").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = [part.strip() for part in line.split("#")]
+        if len(parts) != 3 or not all(parts):
+            raise ValueError(f"路径映射配置格式错误: {line}")
+        result.append(PathMapping(*(os.path.normpath(part) for part in parts)))
+    return result
+
+
+def _components(path: str) -> List[str]:
+    path = os.path.normpath(path).strip(os.sep)
+    return path.split(os.sep) if path and path != "." else []
+
+
+class PrefixIndex:
+    """
+    按路径分量组织的前缀树，查找路径的最长前缀。
+
+    以完整的路径分量匹配，/115/media 不会匹配 /115/media2；
+    查找只与路径深度有关，与前缀数量无关。
+    """
+
+    def __init__(self):
+        # 节点：[子节点, 值]，值为 None 表示该节点不是前缀终点
+        self._root: List[Any] = [{}, None]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, prefix: str, value: Any) -> None:
+        """
+        登记前缀，已存在的前缀抛出 ValueError。
+        """
+        node = self._root
+        for part in _components(prefix):
+            node = node[0].setdefault(part, [{}, None])
+        if node[1] is not None:
+            raise ValueError(f"路径映射重复: {prefix}")
+        node[1] = value
+        self._size += 1
+
+    def resolve(self, path: str) -> Optional[Tuple[Any, str]]:
+        """
+        :return: (最长前缀的值, 去掉前缀后的相对路径)，没有匹配的前缀时返回 None
+        """
+        parts = _components(path)
+        node = self._root
+        best = (node[1], 0) if node[1] is not None else None
+        for depth, part in enumerate(parts, 1):
+            node = node[0].get(part)
+            if node is None:
+                break
+            if node[1] is not None:
+                best = (node[1], depth)
+        if best is None:
+            return None
+        return best[0], os.sep.join(parts[best[1]:])
+
+
+class MappingIndex:
+    """
+    多路径映射的查找索引：按alist路径把媒体库文件转换为挂载路径与软链接路径，
+    并可按cd2路径找回挂载文件所属的映射。
+    """
+
+    def __init__(self, mappings: List[PathMapping]):
+        self.mappings = mappings
+        self._by_alist = PrefixIndex()
+        self._by_cd2 = PrefixIndex()
+        cd2_paths = set()
+        for mapping in mappings:
+            self._by_alist.add(mapping.alist_path, mapping)
+            # 多个alist路径可以映射到同一个cd2路径
+            if mapping.cd2_path not in cd2_paths:
+                cd2_paths.add(mapping.cd2_path)
+                self._by_cd2.add(mapping.cd2_path, mapping)
+
+    def __len__(self) -> int:
+        return len(self.mappings)
+
+    def translate(self, file_path: str) -> Optional[Tuple[PathMapping, str, str]]:
+        """
+        :param file_path: 媒体库中的文件路径。
+        :return: (映射, 挂载文件路径, 软链接路径)，不属于任何映射时返回 None
+        """
+        resolved = self._by_alist.resolve(file_path)
+        if not resolved or not resolved[1]:
+            return None
+        mapping, relative_path = resolved
+        return (mapping, os.path.join(mapping.cd2_path, relative_path),
+                os.path.join(mapping.softlink_path, relative_path))
+
+    def translate_dir(self, dir_path: str) -> Optional[Tuple[PathMapping, str, str]]:
+        """
+        :param dir_path: 媒体库中的目录路径，可以是映射的alist路径本身。
+        :return: (映射, 挂载目录路径, 软链接目录路径)，不属于任何映射时返回 None
+        """
+        resolved = self._by_alist.resolve(dir_path)
+        if not resolved:
+            return None
+        mapping, relative_path = resolved
+        if not relative_path:
+            return mapping, mapping.cd2_path, mapping.softlink_path
+        return (mapping, os.path.join(mapping.cd2_path, relative_path),
+                os.path.join(mapping.softlink_path, relative_path))
+
+    def mount_root(self, mount_path: str) -> Optional[str]:
+        """
+        挂载路径所属映射的cd2路径。
+        """
+        resolved = self._by_cd2.resolve(mount_path)
+        return resolved[0].cd2_path if resolved else None
@@ -0,0 +1,159 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class RetryStore:
+    """
+    创建失败的软链接任务。
+
+    以软链接路径为键记录媒体库文件路径、挂载文件路径、失败原因、已尝试次数与下次尝试时间，
+    每次变更后通过 save 回调整体持久化，插件重启后继续重试；
+    重试间隔按尝试次数指数增长，超过最大次数后放弃。时间使用墙钟，跨重启有效。
+    """
+
+    def __init__(self, records: Optional[List[Dict[str, Any]]] = None,
+                 save: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+                 base_delay: float = 300, max_delay: float = 6 * 3600, max_attempts: int = 10,
+                 clock: Callable[[], float] = time.time):
+        """
+        :param records: 已持久化的任务列表。
+        :param save: 持久化回调，参数为全部任务。
+        :param base_delay: 首次重试前的等待秒数。
+        :param max_delay: 重试间隔上限（秒）。
+        :param max_attempts: 最大尝试次数。
+        :param clock: 墙钟。
+        """
+        self._save = save
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        for record in records or []:
+            try:
+                self._jobs[record["symlink_target"]] = dict(record)
+            except (KeyError, TypeError):
+                continue
+        self.abandoned = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+    def fail(self, file_path: str, mount_file: str, symlink_target: str, reason: str,
+             size: Optional[int] = None) -> bool:
+        """
+        记录一次失败并安排下次尝试。
+
+        :param size: 文件大小，重试写入 .strm 时使用。
+        :return: 是否还会重试，超过最大次数时移除并返回 False
+        """
+        with self._lock:
+            retry = self.__fail(file_path, mount_file, symlink_target, reason, size)
+            self.__save()
+        return retry
+
+    def fail_many(self, failures: Iterable[Tuple[Tuple[str, str, str], str, Optional[int]]]) -> Tuple[int, int]:
+        """
+        批量记录失败，全部记录后只持久化一次，用于回填等一次产生大量失败的场景。
+
+        :param failures: ((媒体库文件路径, 挂载文件路径, 软链接路径), 失败原因, 文件大小)
+        :return: (将重试数, 超过最大次数放弃数)
+        """
+        retrying = abandoned = 0
+        with self._lock:
+            for (file_path, mount_file, symlink_target), reason, size in failures:
+                if self.__fail(file_path, mount_file, symlink_target, reason, size):
+                    retrying += 1
+                else:
+                    abandoned += 1
+            if retrying or abandoned:
+                self.__save()
+        return retrying, abandoned
+
+    def __fail(self, file_path: str, mount_file: str, symlink_target: str, reason: str,
+               size: Optional[int]) -> bool:
+        """
+        记录一次失败，调用方持有锁并负责持久化。
+        """
+        job = self._jobs.get(symlink_target) or {"attempts": 0}
+        attempts = job["attempts"] + 1
+        if attempts >= self.max_attempts:
+            self._jobs.pop(symlink_target, None)
+            self.abandoned += 1
+            return False
+        delay = min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+        self._jobs[symlink_target] = {
+            "file_path": file_path,
+            "mount_file": mount_file,
+            "symlink_target": symlink_target,
+            "reason": reason,
+            "size": size,
+            "attempts": attempts,
+            "next_at": self._clock() + delay,
+        }
+        return True
+
+    def requeue(self, items: Iterable[Tuple[str, str, str]], reason: str,
+                sizes: Optional[Dict[str, int]] = None) -> int:
+        """
+        登记尚未处理完的任务（如插件停止时队列中的批次），立即到期且不计入尝试次数，只持久化一次。
+
+        :param items: (媒体库文件路径, 挂载文件路径, 软链接路径)
+        :param sizes: 软链接路径 -> 文件大小。
+        :return: 登记的任务数
+        """
+        now = self._clock()
+        count = 0
+        with self._lock:
+            for file_path, mount_file, symlink_target in items:
+                job = self._jobs.get(symlink_target) or {"attempts": 0}
+                self._jobs[symlink_target] = {
+                    "file_path": file_path,
+                    "mount_file": mount_file,
+                    "symlink_target": symlink_target,
+                    "reason": reason,
+                    "size": (sizes or {}).get(symlink_target, job.get("size")),
+                    "attempts": job["attempts"],
+                    "next_at": now,
+                }
+                count += 1
+            if count:
+                self.__save()
+        return count
+
+    def done(self, symlink_target: str) -> None:
+        """
+        任务成功，移除记录。
+        """
+        with self._lock:
+            if self._jobs.pop(symlink_target, None) is not None:
+                self.__save()
+
+    def lease(self, hold: float) -> List[Dict[str, Any]]:
+        """
+        取出到期的任务，并把它们的下次尝试时间推后 hold 秒，避免处理期间被重复取出。
+
+        处理成功后调用 done，失败后调用 fail；进程在处理中退出时，任务在 hold 秒后再次到期。
+        """
+        now = self._clock()
+        with self._lock:
+            due = [job for job in self._jobs.values() if job["next_at"] <= now]
+            for job in due:
+                job["next_at"] = now + hold
+            if due:
+                self.__save()
+            return [dict(job) for job in due]
+
+    def list(self) -> List[Dict[str, Any]]:
+        """
+        全部任务，按下次尝试时间排序。
+        """
+        with self._lock:
+            return sorted((dict(job) for job in self._jobs.values()), key=lambda job: job["next_at"])
+
+    def __save(self) -> None:
+        if self._save:
+            self._save(list(self._jobs.values()))
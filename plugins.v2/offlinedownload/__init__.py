@@ -1,12 +1,12 @@
 import json
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional
 
 from app.core.event import eventmanager, Event
 from app.log import logger
 from app.plugins import _PluginBase
 from app.schemas.types import EventType
 
-from p115client import P115Client
+from .clients import client_registry, is_auth_error
 
 class OfflineDownload(_PluginBase):
     # 插件名称
@@ -16,7 +16,7 @@ class OfflineDownload(_PluginBase):
     # 插件图标
     plugin_icon = "softlink.png"
     # 插件版本
-    plugin_version = "1.1"
+    plugin_version = "1.6"
     # 插件作者
     plugin_author = "wu-yanfei"
     # 作者主页
@@ -32,6 +32,8 @@ class OfflineDownload(_PluginBase):
     _enabled = False
     _115_cookie = None
     _115_path = None
+    # 每次请求批量提交的 URL 数
+    _batch_size = 50
 
     def init_plugin(self, config: dict = None):
         logger.info(f"插件初始化")
@@ -133,7 +135,7 @@ class OfflineDownload(_PluginBase):
                                         'props': {
                                             'type': 'info',
                                             'variant': 'tonal',
-                                            'text': '输入 /115 <URL> 触发离线下载任务'
+                                            'text': '输入 /115 <URL> 触发离线下载任务，可一次提交多个 URL，以空格或换行分隔'
                                         }
                                     }
                                 ]
@@ -181,7 +183,7 @@ class OfflineDownload(_PluginBase):
             )
             return
 
-        # 获取命令参数（URL）
+        # 获取命令参数（一个或多个URL）
         command_args = event_data.get("arg_str")
         if not command_args:
             self.post_message(
@@ -192,19 +194,19 @@ class OfflineDownload(_PluginBase):
             )
             return
 
-        url = command_args.strip()
-        if not url.startswith(("http://", "https://", "ftp://", "magnet:", "ed2k://")):
+        urls, invalid = self.__parse_urls(command_args)
+        if not urls:
             self.post_message(
                 channel=event.event_data.get("channel"),
                 title="无效的URL",
-                text=f"提供的 URL 不支持: {url}",
+                text=f"提供的 URL 不支持: {' '.join(invalid)}",
                 userid=event.event_data.get("user")
             )
             return
 
-        # 初始化115客户端
+        # 取得共享的115客户端，复用已校验的 cookie 与长连接
         try:
-            client = P115Client(self._115_cookie)
+            client = client_registry.get(self._115_cookie)
         except Exception as e:
             self.post_message(
                 channel=event.event_data.get("channel"),
@@ -214,28 +216,84 @@ class OfflineDownload(_PluginBase):
             )
             return
 
-        # 准备离线下载任务
-        payload = {
-            "url": url,
-            "wp_path_id": int(self._115_path),
-            "savepath": ""  # 默认保存到根目录
-        }
+        # 按批提交离线下载任务，每批一次请求
+        results: Dict[str, str] = {url: "不支持的 URL" for url in invalid}
+        succeeded = 0
+        for i in range(0, len(urls), self._batch_size):
+            chunk = urls[i:i + self._batch_size]
+            payload = {f"url[{j}]": url for j, url in enumerate(chunk)}
+            payload["wp_path_id"] = int(self._115_path)
+            payload["savepath"] = ""  # 默认保存到根目录
+            try:
+                result = client.offline_add_urls(payload, use_web_api=False)
+            except Exception as e:
+                # cookie 已失效时丢弃客户端，下次命令时重新建立并校验；网络等其他错误不影响已校验的客户端
+                if is_auth_error(e):
+                    client_registry.invalidate(self._115_cookie)
+                logger.error(f"添加离线下载任务失败: {e}")
+                results.update({url: f"失败：{e}" for url in chunk})
+                continue
+            if is_auth_error(result):
+                client_registry.invalidate(self._115_cookie)
+            for url, error in zip(chunk, self.__task_errors(result, chunk)):
+                if error is None:
+                    results[url] = "未确认：接口未返回该任务的结果，请在115离线下载列表中核对"
+                elif error:
+                    results[url] = f"失败：{error}"
+                else:
+                    results[url] = "成功"
+                    succeeded += 1
 
-        try:
-            result = client.offline_add_url(payload, use_web_api=False)
-            self.post_message(
-                channel=event.event_data.get("channel"),
-                title="离线下载任务添加成功",
-                text=f"URL: {url}\n结果: {json.dumps(result, ensure_ascii=False)}",
-                userid=event.event_data.get("user")
-            )
-        except Exception as e:
-            self.post_message(
-                channel=event.event_data.get("channel"),
-                title="添加离线下载任务失败",
-                text=f"URL: {url}\n错误详情: {str(e)}",
-                userid=event.event_data.get("user")
-            )
+        total = len(urls) + len(invalid)
+        lines = [f"{results[url]}  {url}" for url in urls + invalid]
+        self.post_message(
+            channel=event.event_data.get("channel"),
+            title=f"离线下载任务添加{'成功' if succeeded == total else '完成'}：{succeeded}/{total}",
+            text="\n".join(lines),
+            userid=event.event_data.get("user")
+        )
+
+    @staticmethod
+    def __parse_urls(text: str) -> Tuple[List[str], List[str]]:
+        """
+        从命令参数中解析 URL，以空白或换行分隔，重复的只保留一个
+
+        :return: (支持的 URL, 不支持的 URL)
+        """
+        urls, invalid = [], []
+        for url in dict.fromkeys(text.split()):
+            if url.startswith(("http://", "https://", "ftp://", "magnet:", "ed2k://")):
+                urls.append(url)
+            else:
+                invalid.append(url)
+        return urls, invalid
+
+    @staticmethod
+    def __task_errors(result: Any, urls: List[str]) -> List[Optional[str]]:
+        """
+        从批量添加的返回中取出每个 URL 的错误信息，成功的为空字符串，无法确认结果的为 None
+
+        :param result: offline_add_urls 的返回。
+        :param urls: 本批提交的 URL，与返回的任务列表顺序一致。
+        """
+        if not isinstance(result, dict):
+            return [f"未知返回: {result}"] * len(urls)
+        if not result.get("state", True):
+            error = result.get("error_msg") or result.get("error") or json.dumps(result, ensure_ascii=False)
+            return [error] * len(urls)
+        tasks = result.get("result") or result.get("data") or []
+        if not isinstance(tasks, list) or len(tasks) != len(urls):
+            # 没有逐条结果或数量对不上时无法判断各任务是否添加成功
+            logger.warning(f"离线下载接口未返回与提交对应的任务结果（提交 {len(urls)} 个），整批标记为未确认: "
+                           f"{json.dumps(result, ensure_ascii=False, default=str)}")
+            return [None] * len(urls)
+        errors = []
+        for task in tasks:
+            if isinstance(task, dict) and not task.get("state", True):
+                errors.append(task.get("error_msg") or task.get("error") or "未知错误")
+            else:
+                errors.append("")
+        return errors
 
     def stop_service(self):
         """
@@ -1,17 +1,41 @@
 import os
+import re
 import shutil
-from pathlib import Path
-from typing import List, Tuple, Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+from typing import List, Tuple, Dict, Any, Optional, Set
 
 from app.log import logger
 from app.plugins import _PluginBase
 from apscheduler.triggers.cron import CronTrigger
 
-from p115client import P115Client
+from p115client import P115Client, check_response
 from p115client.tool.export_dir import (
+    export_dir,
+    export_dir_result,
     export_dir_parse_iter,
     parse_export_dir_as_path_iter,
 )
+from p115client.tool.life import iter_life_behavior_once
+
+from .apply import ApplyResult, ApplyStage
+from .clients import client_registry, is_auth_error
+from .diff import OP_ADD, OP_REMOVE, DeletionPlanner, iter_local_tree, merge_diff
+from .events import DirectoryReconciler, EventPoller, LocationIndex, dirty_dirs
+from .exportcache import export_cache, remove_stale_exports
+from .filters import EntryFilter
+from .fuse import FuseLease, acquire_fuse_access
+from .lock import RunLock
+from .metrics import PHASES, MetricsHistory, RunMetrics
+from .refresh import RefreshPlanner
+from .roots import SyncRoot, legacy_sync_root, parse_sync_roots
+from .shard import sharded_full_diff
+from .snapshot import SOURCE_EXPORT, TreeSnapshot
+from .source import DirectoryLister
+from .strm import OUTPUT_STRM, OUTPUT_SYMLINK, StrmWriter
+from .tree import parse_export_tree
 
 class SyncSoftLink(_PluginBase):
     # 插件名称
@@ -21,7 +45,7 @@ class SyncSoftLink(_PluginBase):
     # 插件图标
     plugin_icon = "softlink.png"
     # 插件版本
-    plugin_version = "1.1"
+    plugin_version = "1.38"
     # 插件作者
     plugin_author = "wu-yanfei"
     # 作者主页
@@ -40,11 +64,42 @@ class SyncSoftLink(_PluginBase):
     _115_path = None
     _fuse_path_prefix = None
     _softlink_path_prefix = None
+    _mappings = None
+    _force_full = False
+    # 距上次全量同步超过该天数时自动全量同步，0 为不自动
+    _full_sync_days = 7
+    _workers = 8
+    _refresh_concurrency = 2
+    _export_cache_ttl = 10
+    _event_sync = False
+    _event_interval = 60
+    _include_exts = None
+    _exclude_globs = None
+    _diff_processes = 0
+    _fuse_timeout = 10
+    # 输出方式：软连接或 .strm 文件
+    _output_mode = OUTPUT_SYMLINK
+    _strm_template = None
+    _strm_exts = None
+
+    # 挂载访问层，带截止时间与熔断
+    _fuse: FuseLease = None
+
+    # 运行指标历史
+    _history: MetricsHistory = None
+
+    # 退出插件时通知正在进行的同步在下一个检查点停止
+    _event = threading.Event()
 
     _dry_run = False  # 设置为 False 来实际执行操作，True 只打印将要执行的操作
 
+    # 新增操作每批的条数，每批完成后记录一次进度
+    _apply_chunk = 5000
+
     def init_plugin(self, config: dict = None):
         logger.info(f"插件初始化")
+        self._event = threading.Event()
+        self._history = MetricsHistory(records=self.get_data("metrics_history"))
         if config:
             self._enabled = config.get("enabled")
             self._cron = config.get("cron")
@@ -52,29 +107,99 @@ class SyncSoftLink(_PluginBase):
             self._115_path = config.get("115_path")
             self._fuse_path_prefix = config.get("fuse_path_prefix")
             self._softlink_path_prefix = config.get("softlink_path_prefix")
+            self._mappings = config.get("mappings")
+            self._force_full = config.get("force_full")
+            self._full_sync_days = config.get("full_sync_days")
+            self._workers = config.get("workers")
+            self._refresh_concurrency = config.get("refresh_concurrency")
+            self._export_cache_ttl = config.get("export_cache_ttl")
+            self._event_sync = config.get("event_sync")
+            self._event_interval = config.get("event_interval")
+            self._include_exts = config.get("include_exts")
+            self._exclude_globs = config.get("exclude_globs")
+            self._diff_processes = config.get("diff_processes")
+            self._fuse_timeout = config.get("fuse_timeout")
+            self._output_mode = config.get("output_mode") or OUTPUT_SYMLINK
+            self._strm_template = config.get("strm_template")
+            self._strm_exts = config.get("strm_exts")
+        if self._fuse is None or self._fuse.closed:
+            self._fuse = acquire_fuse_access(timeout=self.__fuse_timeout())
+        else:
+            self._fuse.timeout = self.__fuse_timeout()
+        self.__remove_stale_exports()
+
+    def __remove_stale_exports(self) -> None:
+        """
+        清理上次运行遗留的导出文件；同步进行中时跳过，以免删除正在写入的文件。
+        """
+        run_lock = RunLock(self.get_data_path() / "sync.lock")
+        if not run_lock.acquire():
+            return
+        try:
+            removed = remove_stale_exports(self.get_data_path(), keep=export_cache.results())
+            if removed:
+                logger.info(f"清理遗留的导出文件 {removed} 个")
+        finally:
+            run_lock.release()
 
     @staticmethod
     def get_command() -> List[Dict[str, Any]]:
         pass
 
     def get_api(self) -> List[Dict[str, Any]]:
-        pass
+        return [
+            {
+                "path": "/metrics",
+                "endpoint": self.api_metrics,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "同步运行指标",
+                "description": "返回最近的同步运行中各阶段耗时、项目数、吞吐、FUSE 调用数与内存峰值"
+            },
+            {
+                "path": "/fuse",
+                "endpoint": self.api_fuse,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "挂载访问状态",
+                "description": "返回挂载访问层的熔断器状态、超时与错误次数以及各操作的延迟分布"
+            }
+        ]
+
+    def api_metrics(self) -> List[Dict[str, Any]]:
+        """
+        API：最近的同步运行指标，从新到旧。
+        """
+        return self._history.list() if self._history else []
+
+    def api_fuse(self) -> Dict[str, Any]:
+        """
+        API：挂载访问层状态与延迟直方图。
+        """
+        return self._fuse.stats() if self._fuse else {}
 
     def get_service(self) -> List[Dict[str, Any]]:
         """
         注册插件公共服务
         """
+        services = []
         if self._enabled and self._cron:
-            return [
-                {
-                    "id": "SyncSoftLink",
-                    "name": "软连接同步服务",
-                    "trigger": CronTrigger.from_crontab(self._cron),
-                    "func": self.__main,
-                    "kwargs": {}
-                }
-            ]
-        return []
+            services.append({
+                "id": "SyncSoftLink",
+                "name": "软连接同步服务",
+                "trigger": CronTrigger.from_crontab(self._cron),
+                "func": self.__main,
+                "kwargs": {}
+            })
+        if self._enabled and self._event_sync:
+            services.append({
+                "id": "SyncSoftLinkEvents",
+                "name": "软连接事件同步服务",
+                "trigger": "interval",
+                "func": self.__sync_events,
+                "kwargs": {"seconds": self.__event_interval()}
+            })
+        return services
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         return [
@@ -187,6 +312,302 @@ class SyncSoftLink(_PluginBase):
                             }
                         ]
                     },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'mappings',
+                                            'label': '多目录同步',
+                                            'rows': 3,
+                                            'placeholder': '每行一个：115文件夹CID#挂载路径#软连接路径'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'force_full',
+                                            'label': '下次强制全量同步',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'workers',
+                                            'label': '并发线程数',
+                                            'type': 'number'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'refresh_concurrency',
+                                            'label': '挂载刷新并发数',
+                                            'type': 'number'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'export_cache_ttl',
+                                            'label': '导出结果复用时间（分钟）',
+                                            'type': 'number'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'full_sync_days',
+                                            'label': '自动全量同步间隔（天）',
+                                            'type': 'number'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'event_sync',
+                                            'label': '按115生活事件实时同步',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'event_interval',
+                                            'label': '事件轮询间隔（秒）',
+                                            'type': 'number'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'diff_processes',
+                                            'label': '全量比对进程数',
+                                            'type': 'number'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'fuse_timeout',
+                                            'label': '挂载访问超时（秒）',
+                                            'type': 'number'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 12
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'include_exts',
+                                            'label': '包含的扩展名',
+                                            'placeholder': 'mkv,mp4,ts,iso（留空包含全部文件）'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'output_mode',
+                                            'label': '输出方式',
+                                            'items': [
+                                                {'title': '软连接', 'value': OUTPUT_SYMLINK},
+                                                {'title': '.strm 文件', 'value': OUTPUT_STRM}
+                                            ]
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'strm_template',
+                                            'label': '.strm URL 模板',
+                                            'placeholder': 'http://alist:5244/d/115/media_center/{path}'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'strm_exts',
+                                            'label': '.strm 扩展名',
+                                            'placeholder': 'mkv,mp4,ts,iso（留空为常见视频格式）'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'exclude_globs',
+                                            'label': '排除规则',
+                                            'rows': 3,
+                                            'placeholder': '每行一个通配符，匹配相对路径或名称，例如：\n*.nfo\nExtras\n*sample*'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
                     {
                         'component': 'VRow',
                         'content': [
@@ -202,7 +623,14 @@ class SyncSoftLink(_PluginBase):
                                             'type': 'info',
                                             'variant': 'tonal',
                                             'text': '例如：115网盘文件夹media_center，本地挂载/media_center/CloudNAS/WebDAV/115_share/media_center，软连接：/115_share/media_center。\
-                                                则_fuse_path_prefix = /media_center/CloudNAS/WebDAV/115_share，_softlink_path_prefix = /115_share'
+                                                则_fuse_path_prefix = /media_center/CloudNAS/WebDAV/115_share，_softlink_path_prefix = /115_share。\
+                                                填写多目录同步后以其为准，每行的挂载路径与软连接路径直接对应该CID目录，例如：123456#/media_center/CloudNAS/WebDAV/115_share/电影#/115_share/电影。\
+                                                开启事件同步后，上传、移动、改名、删除会在轮询间隔内同步到软连接目录，定时同步仅作为兜底对账。\
+                                                包含/排除规则在解析目录树时生效，被排除的目录不会创建软连接，已创建的会在同步时删除。\
+                                                全量比对进程数默认 0（单进程），大于1时全量同步按顶层目录分片在独立的子进程中比对，仅在数十万项以上、CPU 核数充足且本地扫描为瓶颈时才可能更快，规模较小时反而更慢。\
+                                                挂载访问超过超时时间按失败处理，连续失败后暂停访问挂载并逐步延长重试间隔。\
+                                                输出方式为 .strm 时，视频文件写为“原文件名.strm”，内容为按模板生成的直链，媒体服务器扫描时不再访问挂载，其余文件仍创建软连接；\
+                                                模板可用 {path}（相对同步根的路径）、{mount_path}（挂载中的完整路径）、{name}；导出的目录树不含文件大小，{size} 为空。切换输出方式后请清空软连接目录并强制全量同步。'
                                         }
                                     }
                                 ]
@@ -217,149 +645,695 @@ class SyncSoftLink(_PluginBase):
             "115_cookie": "",
             "115_path": "",
             "fuse_path_prefix": "",
-            "softlink_path_prefix": ""
+            "softlink_path_prefix": "",
+            "mappings": "",
+            "force_full": False,
+            "full_sync_days": 7,
+            "workers": 8,
+            "refresh_concurrency": 2,
+            "export_cache_ttl": 10,
+            "event_sync": False,
+            "event_interval": 60,
+            "include_exts": "",
+            "exclude_globs": "",
+            "diff_processes": 0,
+            "fuse_timeout": 10,
+            "output_mode": OUTPUT_SYMLINK,
+            "strm_template": "",
+            "strm_exts": ""
         }
 
     def get_state(self) -> bool:
         return self._enabled
 
     def get_page(self) -> List[dict]:
-        pass
+        """
+        运行指标面板：每次运行一行，列出各阶段耗时与吞吐。
+        """
+        records = self._history.list() if self._history else []
+        if not records:
+            return [
+                {
+                    'component': 'div',
+                    'text': '暂无同步记录',
+                    'props': {
+                        'class': 'text-center',
+                    }
+                }
+            ]
 
-    def local_dir_as_path_iter(self, root_path: str):
+        def phase_text(record: dict, name: str) -> str:
+            phase = record.get("phases", {}).get(name) or {}
+            if not phase.get("seconds") and not phase.get("items"):
+                return "-"
+            text = f"{phase.get('seconds', 0):.1f}s"
+            if phase.get("items"):
+                text += f" / {phase['items']}"
+            if phase.get("rate"):
+                text += f" ({phase['rate']:.0f}/s)"
+            return text
+
+        headers = ['时间', 'CID', '来源', '结果'] + [title for _, title in PHASES] + ['FUSE调用', '内存峰值']
+        rows = []
+        for record in records:
+            cells = [
+                time.strftime('%m-%d %H:%M:%S', time.localtime(record.get("started_at", 0))),
+                record.get("root"),
+                f"{record.get('source')}{'(缓存)' if record.get('export_cached') else ''}{'(续传)' if record.get('resumed') else ''}{'(全量)' if record.get('full_sync') else ''}",
+                '成功' if record.get("success") else '失败',
+            ] + [phase_text(record, name) for name, _ in PHASES] + [
+                record.get("fuse_calls", 0),
+                f"{record.get('peak_rss', 0) / 1024 / 1024:.0f} MB",
+            ]
+            rows.append({
+                'component': 'tr',
+                'content': [
+                    {
+                        'component': 'td',
+                        'props': {
+                            'class': 'whitespace-nowrap'
+                        },
+                        'text': str(cell)
+                    } for cell in cells
+                ]
+            })
+        return [
+            {
+                'component': 'VRow',
+                'content': [
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12,
+                        },
+                        'content': [
+                            {
+                                'component': 'VTable',
+                                'props': {
+                                    'hover': True
+                                },
+                                'content': [
+                                    {
+                                        'component': 'thead',
+                                        'content': [
+                                            {
+                                                'component': 'th',
+                                                'props': {
+                                                    'class': 'text-start ps-4'
+                                                },
+                                                'text': header
+                                            } for header in headers
+                                        ]
+                                    },
+                                    {
+                                        'component': 'tbody',
+                                        'content': rows
+                                    }
+                                ]
+                            }
+                        ]
+                    }
+                ]
+            }
+        ]
+
+    def __update_config(self):
+        """
+        保存当前配置
         """
-        遍历本地文件夹，生成每个文件和子文件夹的完整路径字符串。
-        
-        :param root_path: 本地文件夹的根路径。
+        self.update_config({
+            "enabled": self._enabled,
+            "cron": self._cron,
+            "115_cookie": self._115_cookie,
+            "115_path": self._115_path,
+            "fuse_path_prefix": self._fuse_path_prefix,
+            "softlink_path_prefix": self._softlink_path_prefix,
+            "mappings": self._mappings,
+            "force_full": self._force_full,
+            "full_sync_days": self._full_sync_days,
+            "workers": self._workers,
+            "refresh_concurrency": self._refresh_concurrency,
+            "export_cache_ttl": self._export_cache_ttl,
+            "event_sync": self._event_sync,
+            "event_interval": self._event_interval,
+            "include_exts": self._include_exts,
+            "exclude_globs": self._exclude_globs,
+            "diff_processes": self._diff_processes,
+            "fuse_timeout": self._fuse_timeout,
+            "output_mode": self._output_mode,
+            "strm_template": self._strm_template,
+            "strm_exts": self._strm_exts
+        })
+
+    def __sync_roots(self) -> List[SyncRoot]:
+        """
+        所有同步根：多目录配置优先，未配置时使用旧版单目录配置。
         """
-        root_path = os.path.normpath(root_path)
-        yield root_path
-        for dirpath, dirnames, filenames in os.walk(root_path):
-            for dirname in dirnames:
-                yield os.path.join(dirpath, dirname)
-            for filename in filenames:
-                yield os.path.join(dirpath, filename)
+        roots = parse_sync_roots(self._mappings)
+        if not roots:
+            legacy = legacy_sync_root(self._115_path, self._fuse_path_prefix, self._softlink_path_prefix)
+            if legacy:
+                roots.append(legacy)
+        return roots
 
-    def simulate_refresh(self, mount_path: str):
+    def __stage_export(self, client: P115Client, root: SyncRoot, snapshot: TreeSnapshot,
+                       metrics: RunMetrics) -> Optional[int]:
         """
-        逐层访问挂载路径以模拟刷新。
-        
-        :param mount_path: 需要刷新的挂载路径。
+        通过 export_dir 导出完整目录树并写入快照暂存表，导出文件经 export_cache 缓存与合并。
+
+        :return: 云端项目数，目录树为空时返回 None
         """
-        path_parts = Path(mount_path).parts
-        current_path = path_parts[0]
-        for part in path_parts[1:]:
-            current_path = os.path.join(current_path, part)
-            if os.path.exists(current_path):
+        entry_filter = self.__entry_filter()
+
+        def export() -> str:
+            # 分别记录导出任务排队生成、下载与之后解析的耗时
+            with metrics.phase("export_wait"):
+                export_id = export_dir(client, int(root.cid), target_pid=0)
+                export_dir_result(client, export_id)
+            # 导出的路径流原样落盘，缓存只保留文件路径，不在内存中持有目录树
+            export_path = os.path.join(self.get_data_path(), f"export_{root.cid}_{int(time.time() * 1000)}.txt")
+            with metrics.phase("export"):
+                path_iterator = export_dir_parse_iter(
+                    client=client,
+                    export_id=export_id,
+                    parse_iter=parse_export_dir_as_path_iter,
+                    show_clock=True
+                )
                 try:
-                    os.listdir(current_path)
-                    logger.info(f"刷新路径: {current_path}")
-                except Exception as e:
-                    logger.warning(f"刷新路径 {current_path} 失败: {e}")
-            else:
-                break
+                    lines = 0
+                    with open(export_path + ".tmp", "w", encoding="utf-8") as f:
+                        for full_path in path_iterator:
+                            f.write(full_path + "\n")
+                            lines += 1
+                    os.replace(export_path + ".tmp", export_path)
+                    metrics.items["export"] = lines
+                except BaseException:
+                    if os.path.exists(export_path + ".tmp"):
+                        os.remove(export_path + ".tmp")
+                    raise
+            return export_path
+
+        # 新鲜度窗口内复用最近的导出文件，同一 CID 的并发请求共享一个导出任务；过滤在读取导出文件时进行
+        ttl = self.__export_cache_ttl()
+        export_path, age = export_cache.get(root.cid, ttl, export)
+        if age:
+            metrics.export_cached = True
+            logger.info(f"[{root.cid}] 复用 {int(age)} 秒前的导出结果")
+        with metrics.phase("parse"):
+            # 被排除的项目不进入目录树；目录树只在写入暂存表期间存在
+            try:
+                with open(export_path, encoding="utf-8") as f:
+                    cloud_root, tree = parse_export_tree((line.rstrip("\n") for line in f),
+                                                         entry_filter if entry_filter.active else None)
+            finally:
+                if ttl <= 0:
+                    # 不缓存时导出文件只属于本次同步，读完即删
+                    os.remove(export_path)
+            if entry_filter.active:
+                logger.info(f"[{root.cid}] {entry_filter.summary()}")
+            if not cloud_root:
+                return None
+            cloud_count = snapshot.stage_tree(tree, SOURCE_EXPORT, entry_filter.key)
+            del tree
+        metrics.items["parse"] = cloud_count
+        return cloud_count
 
     def __main(self):
         """
         主逻辑：同步115网盘目录与本地软连接目录。
+
+        各同步根并发获取目录树，新增阶段共享同一个有界线程池与挂载刷新并发限制。
         """
-        if not all([self._115_cookie, self._115_path, self._fuse_path_prefix, self._softlink_path_prefix]):
+        try:
+            roots = self.__sync_roots()
+        except ValueError as e:
+            logger.error(f"{e}，无法执行同步")
+            return
+        if not self._115_cookie or not roots:
             logger.error("配置项缺失，无法执行同步")
             return
 
-        # 初始化115客户端
+        # 取得共享的115客户端，复用已校验的 cookie 与长连接
         try:
-            client = P115Client(self._115_cookie)
+            client = client_registry.get(self._115_cookie)
         except Exception as e:
             logger.error(f"初始化115客户端失败: {e}")
             return
 
-        # 获取115网盘目录树
-        logger.info("开始获取115网盘目录树...")
+        # 同一时间只允许一次同步，定时任务与手动触发重叠时直接跳过
+        run_lock = RunLock(self.get_data_path() / "sync.lock")
+        if not run_lock.acquire():
+            logger.warning("上一次同步仍在进行中，跳过本次同步")
+            return
         try:
-            path_iterator = export_dir_parse_iter(
-                client=client,
-                export_file_ids=int(self._115_path),
-                target_pid=0,
-                parse_iter=parse_export_dir_as_path_iter,
-                show_clock=True
-            )
-            cloud_paths = set(path_iterator)
-            logger.info(f"获取到 {len(cloud_paths)} 个云端项目")
+            stop_event = self._event
+            semaphore = threading.BoundedSemaphore(self.__refresh_concurrency())
+            with ThreadPoolExecutor(max_workers=self.__workers(), thread_name_prefix="SyncSoftLink") as executor, \
+                    ThreadPoolExecutor(max_workers=len(roots), thread_name_prefix="SyncSoftLink-root") as root_pool:
+                futures = [root_pool.submit(self.__sync_root, client, root, executor, semaphore, stop_event)
+                           for root in roots]
+                results = [future.result() for future in futures]
+            self.save_data("metrics_history", self._history.dump())
+        finally:
+            run_lock.release()
+
+        if not self._dry_run and self._force_full and all(results):
+            self._force_full = False
+            self.__update_config()
+        logger.info(f"软连接同步完成，成功 {sum(results)}/{len(roots)} 个同步根")
+
+    def __sync_root(self, client: P115Client, root: SyncRoot,
+                    executor: ThreadPoolExecutor, semaphore: threading.Semaphore,
+                    stop_event: threading.Event) -> bool:
+        """
+        同步单个同步根。
+
+        存在可用快照时只应用新目录树相对快照的增量；
+        快照缺失或强制全量时，与本地软连接目录完整比对。
+        全量与增量同步都导出目录树；旧版本以目录列表得到的快照不做增量比对，改为全量同步。
+        差异先写入快照中的操作日志再执行，上次运行中断留下的日志直接从断点继续，不再重新获取目录树。
+
+        :return: 是否同步成功
+        """
+        try:
+            snapshot = TreeSnapshot(self.get_data_path() / f"snapshot_{root.key}.db", root.cid)
         except Exception as e:
-            logger.error(f"获取115网盘目录树失败: {e}")
-            return
+            logger.error(f"[{root.cid}] 打开目录树快照失败: {e}")
+            return False
+        planned_at = None if self._dry_run else snapshot.journal_planned_at
+        if planned_at and self._force_full and not snapshot.journal_full_sync:
+            # 要求全量同步时不再继续增量同步的日志
+            logger.info(f"[{root.cid}] 已要求全量同步，放弃未完成的增量同步")
+            planned_at = None
+        if planned_at:
+            full_sync = snapshot.journal_full_sync
+            metrics = RunMetrics(root.cid, snapshot.staging_source, full_sync)
+            metrics.resumed = True
+        else:
+            full_sync = self._force_full or not snapshot.exists()
+            if not full_sync and self.__full_sync_due(snapshot):
+                logger.info(f"[{root.cid}] 距上次全量同步已超过 {self._full_sync_days} 天，本次全量同步")
+                full_sync = True
+            if not full_sync and snapshot.source != SOURCE_EXPORT:
+                # 目录列表对空目录的类型与文件大小的取值与导出结果不同，跨来源比对快照会反复删除再创建
+                logger.info(f"[{root.cid}] 快照来自旧版本的目录列表来源，本次全量同步")
+                full_sync = True
+            metrics = RunMetrics(root.cid, SOURCE_EXPORT, full_sync)
+        success = False
+        try:
+            if planned_at:
+                logger.info(f"[{root.cid}] 继续 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(planned_at))} "
+                            f"中断的同步：剩余删除 {snapshot.journal_remaining(OP_REMOVE)} 项，"
+                            f"新增 {snapshot.journal_remaining(OP_ADD)} 项")
+            elif not self.__plan(client, root, snapshot, full_sync, metrics):
+                return False
 
-        # 获取本地软连接目录树
-        softlink_root = os.path.join(self._softlink_path_prefix, "media_center")
-        logger.info("开始获取本地软连接目录树...")
-        local_paths = set(self.local_dir_as_path_iter(softlink_root))
-        logger.info(f"获取到 {len(local_paths)} 个本地项目")
-
-        # 规范化路径为相对路径
-        cloud_root = min(cloud_paths, key=len)  # 云端根路径，例如 /media_center
-        # 转换为相对路径集合
-        cloud_rel_paths = {os.path.relpath(p, cloud_root) if p != cloud_root else "." for p in cloud_paths}
-        local_rel_paths = {os.path.relpath(p, softlink_root) if p != softlink_root else "." for p in local_paths}
-
-        # 计算需要添加和删除的相对路径
-        to_add_rel = cloud_rel_paths - local_rel_paths
-        to_remove_rel = local_rel_paths - cloud_rel_paths
-
-        # 删除多余的软连接或目录
-        for rel_path in sorted(to_remove_rel, reverse=True):  # 从深到浅删除
-            path = softlink_root if rel_path == "." else os.path.join(softlink_root, rel_path)
-            if self._dry_run:
-                logger.info(f"[Dry Run] 将删除: {path}")
-            else:
-                try:
-                    if os.path.islink(path) or os.path.isfile(path):
-                        os.remove(path)
-                        logger.info(f"删除文件/软连接: {path}")
-                    elif os.path.isdir(path):
-                        shutil.rmtree(path)
-                        logger.info(f"删除目录: {path}")
-                except Exception as e:
-                    logger.error(f"删除 {path} 失败: {e}")
-
-        # 添加缺失的目录或软连接
-        for rel_path in sorted(to_add_rel):  # 从浅到深创建
-            cloud_path = cloud_root if rel_path == "." else os.path.join(cloud_root, rel_path)
-            softlink_path = softlink_root if rel_path == "." else os.path.join(softlink_root, rel_path)
-            mount_path = os.path.join(self._fuse_path_prefix, "media_center", rel_path if rel_path != "." else "")
+            os.makedirs(root.softlink_root, exist_ok=True)
+            added_count, removed_count = self.__apply(root, snapshot, executor, semaphore, metrics, stop_event)
+            logger.info(f"[{root.cid}] 新增 {added_count} 项，删除 {removed_count} 项")
+
+            if not self._dry_run:
+                # 操作日志中失败的新增不计入快照，下次同步重试
+                snapshot.commit()
+            success = True
+            return True
+        except Exception as e:
+            logger.error(f"[{root.cid}] 同步失败: {e}")
+            return False
+        finally:
+            snapshot.close()
+            metrics.finish(success)
+            self._history.append(metrics.to_dict())
+
+    def __plan(self, client: P115Client, root: SyncRoot, snapshot: TreeSnapshot, full_sync: bool,
+               metrics: RunMetrics) -> bool:
+        """
+        获取云端目录树并与快照或本地目录比对，差异写入操作日志。
+
+        :return: 是否成功
+        """
+        # 获取115网盘目录树，写入快照暂存表
+        logger.info(f"[{root.cid}] 开始获取115网盘目录树...")
+        try:
+            cloud_count = self.__stage_export(client, root, snapshot, metrics)
+        except Exception as e:
+            logger.error(f"[{root.cid}] 获取115网盘目录树失败: {e}")
+            self.__invalidate_on_auth_error(e)
+            return False
+        if cloud_count is None:
+            logger.error(f"[{root.cid}] 115网盘目录树为空，跳过同步")
+            return False
+        logger.info(f"[{root.cid}] 获取到 {cloud_count} 个云端项目")
+
+        processes = self.__diff_processes()
+        strm = self.__strm_writer()
+        # .strm 输出时本地文件名还原为云端文件名再比对
+        cloud_name = strm.cloud_name if strm else None
+        if full_sync and processes > 1:
+            # 按顶层目录分片，本地扫描与归并比对在子进程中完成，耗时全部计入比对阶段
+            logger.info(f"[{root.cid}] 快照缺失或强制全量同步，使用 {processes} 个进程与本地软连接目录分片比对...")
+            operations = sharded_full_diff(snapshot.db_path, root.softlink_root, processes,
+                                           work_dir=str(self.get_data_path()),
+                                           strm_exts=strm.exts if strm else None)
+        elif full_sync:
+            # 与本地软连接目录树做流式归并比对
+            logger.info(f"[{root.cid}] 快照缺失或强制全量同步，与本地软连接目录完整比对...")
+            operations = merge_diff(snapshot.staged_entries(),
+                                    metrics.timed("local_scan", iter_local_tree(root.softlink_root, cloud_name)))
+        else:
+            # 仅应用与上次快照的差异
+            logger.info(f"[{root.cid}] 使用 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshot.committed_at))} 的快照进行增量同步")
+            added, removed = snapshot.delta()
+            operations = chain(((OP_REMOVE, p, d) for p, d in removed), ((OP_ADD, p, d) for p, d in added))
+        removed_count, added_count = snapshot.plan(metrics.timed("diff", operations), full_sync)
+        logger.info(f"[{root.cid}] 已记录操作日志：删除 {removed_count} 项，新增 {added_count} 项")
+        # 比对阶段的计时包含了嵌套的本地扫描
+        metrics.seconds["diff"] = max(0.0, metrics.seconds["diff"] - metrics.seconds["local_scan"])
+        return True
+
+    def __apply(self, root: SyncRoot, snapshot: TreeSnapshot, executor: ThreadPoolExecutor,
+                semaphore: threading.Semaphore, metrics: RunMetrics,
+                stop_event: threading.Event) -> Tuple[int, int]:
+        """
+        执行操作日志中尚未完成的操作。
+
+        删除操作收敛为最小覆盖根后逐个执行；新增操作按批交给 ApplyStage，逐层创建目录、
+        刷新涉及的挂载目录（每个目录在整次运行中只刷新一次），并发创建软连接。
+        每个删除根与每批新增完成后记录进度，失败的新增同时记入日志；收到停止信号时在检查点退出，
+        下次运行从断点继续。
 
+        :param root: 同步根。
+        :param snapshot: 已写入操作日志的目录树快照。
+        :param executor: 共享的新增阶段线程池。
+        :param semaphore: 共享的挂载刷新并发限制。
+        :param metrics: 本次运行的指标。
+        :param stop_event: 停止信号。
+        :return: (新增数, 删除数)
+        """
+        softlink_root, mount_root = root.softlink_root, root.mount_root
+        strm = self.__strm_writer()
+
+        def local_path(rel_path: str, is_dir: bool) -> str:
+            return os.path.join(softlink_root, strm.local_path(rel_path) if strm and not is_dir else rel_path)
+
+        def check_stop():
+            if stop_event.is_set():
+                raise InterruptedError("插件已停止，同步中断，下次运行时继续")
+
+        # 删除覆盖根，其下的所有项目一并删除
+        removed_base = snapshot.journal_done(OP_REMOVE)
+        deletion = DeletionPlanner()
+        for _, rel_path, is_dir in deletion.collapse(
+                (OP_REMOVE, p, d) for p, d in snapshot.journal_operations(OP_REMOVE)):
+            check_stop()
             if self._dry_run:
-                if "." not in os.path.basename(cloud_path):
+                logger.info(f"[Dry Run] 将删除: {local_path(rel_path, is_dir)}")
+                continue
+            start = time.perf_counter()
+            removed = self.__remove(local_path(rel_path, is_dir))
+            metrics.add("delete", time.perf_counter() - start)
+            # 覆盖根下尚未读到的后代即使重放也只是空操作；删除失败的根记入日志，下次同步重试
+            snapshot.checkpoint(OP_REMOVE, removed_base + deletion.entries, interval=1,
+                                failed=() if removed else (rel_path,))
+        metrics.items["delete"] = deletion.entries
+        if deletion.entries:
+            logger.info(f"[{root.cid}] 删除 {deletion.roots} 个路径，共 {deletion.entries} 项")
+        if not self._dry_run:
+            snapshot.checkpoint(OP_REMOVE, removed_base + deletion.entries)
+
+        if self._dry_run:
+            added_count = 0
+            for rel_path, is_dir in snapshot.journal_operations(OP_ADD):
+                added_count += 1
+                softlink_path = local_path(rel_path, is_dir)
+                if is_dir:
                     logger.info(f"[Dry Run] 将创建目录: {softlink_path}")
+                elif strm and strm.applies(rel_path):
+                    logger.info(f"[Dry Run] 将写入 .strm: {softlink_path}")
                 else:
-                    logger.info(f"[Dry Run] 将创建软连接: {softlink_path} -> {mount_path}")
-                continue
+                    logger.info(f"[Dry Run] 将创建软连接: {softlink_path} -> {os.path.join(mount_root, rel_path)}")
+            return added_count, deletion.entries
+
+        # 按批新增，整次运行共用一个刷新计划
+        added_done = snapshot.journal_done(OP_ADD)
+        added_count = 0
+        planner = RefreshPlanner(root.refresh_base, exists=self._fuse.exists, listdir=self._fuse.listdir)
+        stage = ApplyStage(executor, semaphore, strm)
+        total = ApplyResult()
+        additions = snapshot.journal_operations(OP_ADD)
+        while True:
+            check_stop()
+            chunk = list(islice(additions, self._apply_chunk))
+            if not chunk:
+                break
+            result = stage.run(softlink_root, mount_root, planner, chunk)
+            added_count += len(chunk)
+            added_done += len(chunk)
+            snapshot.checkpoint(OP_ADD, added_done, failed=chain(result.errors, result.skipped))
+            total.dirs_created += result.dirs_created
+            total.links_created += result.links_created
+            total.strm_written += result.strm_written
+            total.strm_unchanged += result.strm_unchanged
+            total.skipped.extend(result.skipped)
+            total.errors.update(result.errors)
+            metrics.add("refresh", result.refresh_seconds)
+            metrics.add("create", result.create_seconds,
+                        result.dirs_created + result.links_created + result.strm_written)
+        metrics.items["refresh"] = planner.refreshed + planner.failed
+        metrics.fuse_calls += planner.fuse_calls
+
+        for path in planner.failed_paths:
+            logger.warning(f"刷新路径 {path} 失败，跳过其下的软连接")
+        logger.info(f"[{root.cid}] {planner.summary()}")
+        if self._fuse.state != "closed":
+            logger.warning(f"[{root.cid}] 挂载访问连续失败，已暂停访问挂载，未刷新的目录将在下次同步时重试")
+        for rel_path, error in total.errors.items():
+            logger.error(f"处理 {os.path.join(softlink_root, rel_path)} 失败: {error}")
+        logger.info(f"[{root.cid}] 确保目录 {total.dirs_created} 个，创建软连接 {total.links_created} 个，"
+                    f"写入 .strm {total.strm_written} 个，跳过 {len(total.skipped) + total.strm_unchanged} 个"
+                    f"（其中 .strm 内容未变 {total.strm_unchanged} 个），失败 {len(total.errors)} 个")
+        return added_count, deletion.entries
+
+    @staticmethod
+    def __remove(softlink_path: str) -> bool:
+        """
+        删除本地软连接、文件或整个目录，不存在时忽略。
+
+        :return: 是否成功（不存在也视为成功）
+        """
+        try:
+            if os.path.islink(softlink_path) or os.path.isfile(softlink_path):
+                os.remove(softlink_path)
+                logger.info(f"删除文件/软连接: {softlink_path}")
+            elif os.path.isdir(softlink_path):
+                shutil.rmtree(softlink_path)
+                logger.info(f"删除目录: {softlink_path}")
+        except Exception as e:
+            logger.error(f"删除 {softlink_path} 失败: {e}")
+            return False
+        return True
 
-            # 模拟刷新挂载路径
-            self.simulate_refresh(os.path.dirname(mount_path))
+    def __sync_events(self):
+        """
+        轮询115生活事件，只对事件涉及的目录做浅层对账并更新软连接。
 
+        与定时同步共用运行锁，同步进行中时跳过本次轮询；事件全部处理完成后才推进游标。
+        事件同步的结果写入快照，无法由事件定位的变化由下次定时同步的增量修正。
+        """
+        try:
+            roots = self.__sync_roots()
+        except ValueError as e:
+            logger.error(f"{e}，无法执行事件同步")
+            return
+        if not self._115_cookie or not roots:
+            return
+        run_lock = RunLock(self.get_data_path() / "sync.lock")
+        if not run_lock.acquire():
+            logger.debug("同步进行中，跳过本次事件轮询")
+            return
+        try:
+            client = client_registry.get(self._115_cookie)
+            poller = EventPoller(
+                fetch=lambda from_id, from_time: iter_life_behavior_once(
+                    client, from_id=from_id, from_time=from_time),
+                cursor=self.get_data("life_cursor")
+            )
+            events = poller.poll()
+            if events:
+                locations = LocationIndex(self.get_data("life_locations"))
+                self.__apply_events(client, roots, events, locations)
+                poller.advance(events)
+                self.save_data("life_locations", locations.dump())
+            self.save_data("life_cursor", poller.cursor)
+        except Exception as e:
+            logger.error(f"事件同步失败: {e}")
+            self.__invalidate_on_auth_error(e)
+        finally:
+            run_lock.release()
+
+    def __invalidate_on_auth_error(self, error: Exception) -> None:
+        """
+        cookie 失效时丢弃共享的客户端，下次同步重新建立并校验。
+        """
+        if is_auth_error(error):
+            logger.warning("115 cookie 已失效，下次同步时重新建立客户端并校验")
+            client_registry.invalidate(self._115_cookie)
+
+    def __apply_events(self, client: P115Client, roots: List[SyncRoot], events: list,
+                       locations: LocationIndex) -> None:
+        """
+        将一批生活事件涉及的目录与本地软连接目录对账。
+        """
+        source = DirectoryLister(fs_files=lambda payload: check_response(client.fs_files(payload)))
+        snapshots: Dict[SyncRoot, TreeSnapshot] = {}
+        for root in roots:
             try:
-                # 创建父目录
-                os.makedirs(os.path.dirname(softlink_path) if rel_path != "." else softlink_root, exist_ok=True)
-
-                # 判断是否为文件（基于是否有 . 后缀）
-                if "." not in os.path.basename(cloud_path):
-                    # 创建普通目录
-                    os.makedirs(softlink_path, exist_ok=True)
-                    logger.info(f"创建目录: {softlink_path}")
-                else:
-                    # 创建软连接
-                    if os.path.exists(softlink_path):
-                        os.remove(softlink_path)
-                    os.symlink(mount_path, softlink_path)
-                    logger.info(f"创建软连接: {softlink_path} -> {mount_path}")
+                snapshots[root] = TreeSnapshot(self.get_data_path() / f"snapshot_{root.key}.db", root.cid)
             except Exception as e:
-                logger.error(f"处理 {softlink_path} 失败: {e}")
+                logger.warning(f"[{root.cid}] 打开目录树快照失败，无法定位移动前的位置: {e}")
+
+        def previous_parent(event):
+            # 快照中的 id 只是导出行号，按名称找到原所在目录，再逐级列出目录得到其115 id；
+            # 原目录已不存在时得到仍存在的最深一级祖先，对账它即可删除消失的子树
+            for root, snapshot in snapshots.items():
+                for rel_dir in snapshot.parent_dirs(event.name):
+                    cid = source.resolve(int(root.cid), rel_dir)
+                    if cid is not None:
+                        yield cid
+
+        try:
+            self.__reconcile_events(source, roots, snapshots, dirty_dirs(events, previous_parent, locations),
+                                    len(events))
+        finally:
+            for snapshot in snapshots.values():
+                snapshot.close()
+
+    def __reconcile_events(self, source: DirectoryLister, roots: List[SyncRoot],
+                           snapshots: Dict[SyncRoot, TreeSnapshot], dirs: Set[int], event_count: int) -> None:
+        """
+        对账事件涉及的目录并应用到软连接目录，结果同时写入各同步根的快照。
+        """
+        if not dirs:
+            return
+        logger.info(f"收到 {event_count} 个115生活事件，对账 {len(dirs)} 个目录")
 
-        logger.info("软连接同步完成")
+        entry_filter = self.__entry_filter()
+        strm = self.__strm_writer()
+        reconciler = DirectoryReconciler(source, roots, entry_filter if entry_filter.active else None,
+                                         cloud_name=strm.cloud_name if strm else None)
+        # 删除与新增均为云端相对路径
+        removals: Dict[SyncRoot, List[Tuple[str, bool]]] = {root: [] for root in roots}
+        additions: Dict[SyncRoot, List[Tuple[str, bool]]] = {root: [] for root in roots}
+        for cid in sorted(dirs):
+            for root, op, rel_path, is_dir in reconciler.reconcile(cid):
+                (removals if op == OP_REMOVE else additions)[root].append((rel_path, is_dir))
+
+        def local_path(rel_path: str, is_dir: bool) -> str:
+            # 删除按本地文件名执行
+            return strm.local_path(rel_path) if strm and not is_dir else rel_path
+
+        if self._dry_run:
+            for root in roots:
+                for rel_path, is_dir in removals[root]:
+                    logger.info(f"[Dry Run] 将删除: {os.path.join(root.softlink_root, local_path(rel_path, is_dir))}")
+                for rel_path, _ in additions[root]:
+                    logger.info(f"[Dry Run] 将创建: {os.path.join(root.softlink_root, rel_path)}")
+            return
+
+        semaphore = threading.BoundedSemaphore(self.__refresh_concurrency())
+        with ThreadPoolExecutor(max_workers=self.__workers(), thread_name_prefix="SyncSoftLink") as executor:
+            for root in roots:
+                if not removals[root] and not additions[root]:
+                    continue
+                removed = [rel_path for rel_path, is_dir in removals[root]
+                           if self.__remove(os.path.join(root.softlink_root, local_path(rel_path, is_dir)))]
+                planner = RefreshPlanner(root.refresh_base, exists=self._fuse.exists, listdir=self._fuse.listdir)
+                result = ApplyStage(executor, semaphore, strm).run(
+                    root.softlink_root, root.mount_root, planner, additions[root])
+                for rel_path, error in result.errors.items():
+                    logger.error(f"处理 {os.path.join(root.softlink_root, rel_path)} 失败: {error}")
+                logger.info(f"[{root.cid}] 事件同步：删除 {len(removed)} 项，"
+                            f"创建软连接 {result.links_created} 个，写入 .strm {result.strm_written} 个，"
+                            f"跳过 {len(result.skipped) + result.strm_unchanged} 个，失败 {len(result.errors)} 个")
+                if root in snapshots:
+                    # 未能创建的路径不写入快照，下次定时同步的增量会再次新增
+                    failed = set(result.skipped) | set(result.errors)
+                    snapshots[root].record_events(
+                        removed, [(rel_path, is_dir) for rel_path, is_dir in additions[root] if rel_path not in failed])
+
+    def __entry_filter(self) -> EntryFilter:
+        return EntryFilter.from_config(self._include_exts, self._exclude_globs)
+
+    def __strm_writer(self) -> Optional[StrmWriter]:
+        """
+        输出方式为 .strm 时的写入器，未填写 URL 模板时仍创建软连接。
+        """
+        if self._output_mode != OUTPUT_STRM:
+            return None
+        if not self._strm_template:
+            logger.warning("输出方式为 .strm 但未填写 URL 模板，仍创建软连接")
+            return None
+        return StrmWriter(self._strm_template, [ext for ext in re.split(r"[\s,，]+", self._strm_exts or "") if ext])
+
+    def __fuse_timeout(self) -> float:
+        try:
+            return max(1.0, float(self._fuse_timeout))
+        except (TypeError, ValueError):
+            return 10.0
+
+    def __diff_processes(self) -> int:
+        try:
+            return max(0, min(int(self._diff_processes or 0), os.cpu_count() or 1))
+        except (TypeError, ValueError):
+            return 0
+
+    def __event_interval(self) -> int:
+        try:
+            return max(10, int(self._event_interval))
+        except (TypeError, ValueError):
+            return 60
+
+    def __workers(self) -> int:
+        try:
+            return max(1, int(self._workers))
+        except (TypeError, ValueError):
+            return 8
+
+    def __full_sync_due(self, snapshot: TreeSnapshot) -> bool:
+        """
+        距上次全量同步是否已超过配置的天数。
+
+        增量同步只能发现云端目录树相对快照的变化，本地被改动或增量漏掉的变化要靠全量比对修正。
+        """
+        try:
+            days = max(0.0, float(self._full_sync_days))
+        except (TypeError, ValueError):
+            days = 7.0
+        if not days:
+            return False
+        full_synced_at = snapshot.full_synced_at
+        return full_synced_at is None or time.time() - full_synced_at >= days * 86400
+
+    def __export_cache_ttl(self) -> float:
+        """
+        导出结果的新鲜度窗口（秒），配置单位为分钟。
+        """
+        try:
+            return max(0.0, float(self._export_cache_ttl) * 60)
+        except (TypeError, ValueError):
+            return 0.0
+
+    def __refresh_concurrency(self) -> int:
+        try:
+            return max(1, int(self._refresh_concurrency))
+        except (TypeError, ValueError):
+            return 2
 
     def stop_service(self):
         """
         退出插件
         """
-        pass
\ No newline at end of file
+        self._event.set()
+        export_cache.clear()
+        if self._fuse is not None:
+            self._fuse.shutdown()
\ No newline at end of file
@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Executor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .refresh import RefreshPlanner
+from .strm import StrmWriter
+
+
+class ApplyResult:
+    """
+    新增阶段的执行结果，错误按路径收集。
+    """
+
+    def __init__(self):
+        self.dirs_created = 0
+        self.links_created = 0
+        self.strm_written = 0
+        # 内容未变化、未重写的 .strm 文件数，计入跳过但无需重试
+        self.strm_unchanged = 0
+        # 未能处理、需在下次同步重试的路径
+        self.skipped: List[str] = []
+        self.errors: Dict[str, str] = {}
+        # 刷新与创建阶段耗时（秒）
+        self.refresh_seconds = 0.0
+        self.create_seconds = 0.0
+
+
+class ApplyStage:
+    """
+    并发执行新增操作。
+
+    目录按深度逐层创建，保证父目录先于子目录；
+    挂载目录刷新由 RefreshPlanner 逐层并发执行，并发数受信号量限制；
+    软连接按所在目录分组后提交到线程池并发创建。
+    以 .strm 输出的文件不经过挂载，所在目录无需刷新。
+    """
+
+    def __init__(self, executor: Executor, refresh_semaphore: Optional[threading.Semaphore] = None,
+                 strm: Optional[StrmWriter] = None):
+        """
+        :param executor: 执行目录和软连接创建的线程池，可由多个同步根共享。
+        :param refresh_semaphore: 限制同时进行的挂载目录刷新数。
+        :param strm: .strm 输出，为空时全部创建软连接。
+        """
+        self.executor = executor
+        self.refresh_semaphore = refresh_semaphore
+        self.strm = strm
+
+    def run(self, softlink_root: str, mount_root: str, planner: RefreshPlanner,
+            additions: Iterable[Tuple[str, bool]]) -> ApplyResult:
+        """
+        :param softlink_root: 本地软连接根目录。
+        :param mount_root: 与云端根目录对应的挂载路径。
+        :param planner: 挂载目录刷新计划。
+        :param additions: (相对路径, 是否目录) 列表；类型未知（None）的叶子节点按文件处理，
+                          软链接指向挂载路径，挂载中是空目录时即为指向该空目录的软链接。
+        """
+        result = ApplyResult()
+        # 需要存在的本地目录（按深度分层）与按目录分组的软连接、.strm 文件
+        dir_levels: Dict[int, set] = defaultdict(set)
+        links_by_dir: Dict[str, List[str]] = defaultdict(list)
+        strm_paths: List[str] = []
+        for rel_path, is_dir in additions:
+            if is_dir:
+                dir_levels[rel_path.count("/")].add(rel_path)
+            else:
+                parent = os.path.dirname(rel_path)
+                if parent:
+                    dir_levels[parent.count("/")].add(parent)
+                if self.strm and self.strm.applies(rel_path):
+                    strm_paths.append(rel_path)
+                    continue
+                links_by_dir[parent].append(rel_path)
+                planner.add(os.path.join(mount_root, parent) if parent else mount_root)
+
+        # 逐层创建目录
+        start = time.perf_counter()
+        for depth in sorted(dir_levels):
+            paths = sorted(dir_levels[depth])
+            for rel_path, error in zip(paths, self.executor.map(
+                    lambda p: self._makedir(os.path.join(softlink_root, p)), paths)):
+                if error:
+                    result.errors[rel_path] = error
+                else:
+                    result.dirs_created += 1
+
+        result.create_seconds += time.perf_counter() - start
+
+        # 逐层刷新挂载目录
+        start = time.perf_counter()
+        planner.run(self.executor, self.refresh_semaphore)
+        result.refresh_seconds = time.perf_counter() - start
+
+        # 按目录并发创建软连接
+        start = time.perf_counter()
+        futures = []
+        for parent, rel_paths in links_by_dir.items():
+            if parent in result.errors or not planner.is_ready(os.path.join(mount_root, parent) if parent else mount_root):
+                result.skipped.extend(rel_paths)
+                continue
+            for rel_path in rel_paths:
+                futures.append((rel_path, self.executor.submit(
+                    self._symlink, os.path.join(mount_root, rel_path), os.path.join(softlink_root, rel_path))))
+        strm_futures = []
+        for rel_path in strm_paths:
+            if os.path.dirname(rel_path) in result.errors:
+                result.skipped.append(rel_path)
+                continue
+            strm_futures.append((rel_path, self.executor.submit(
+                self._write_strm, rel_path, os.path.join(mount_root, rel_path),
+                os.path.join(softlink_root, self.strm.local_path(rel_path)))))
+        for rel_path, future in futures:
+            error = future.result()
+            if error:
+                result.errors[rel_path] = error
+            else:
+                result.links_created += 1
+        for rel_path, future in strm_futures:
+            written, error = future.result()
+            if error:
+                result.errors[rel_path] = error
+            elif written:
+                result.strm_written += 1
+            else:
+                result.strm_unchanged += 1
+        result.create_seconds += time.perf_counter() - start
+        return result
+
+    def _write_strm(self, rel_path: str, mount_path: str, strm_path: str) -> Tuple[bool, Optional[str]]:
+        """
+        导出的目录树不含文件大小，模板中的 {size} 为空；事件同步同样不写入大小，
+        同一文件由哪种方式同步 .strm 内容都相同，不会被来回重写。
+
+        :return: (是否写入, 错误信息)
+        """
+        try:
+            return self.strm.write(strm_path, rel_path, mount_path), None
+        except Exception as e:
+            return False, str(e)
+
+    @staticmethod
+    def _makedir(path: str) -> Optional[str]:
+        try:
+            os.makedirs(path, exist_ok=True)
+        except Exception as e:
+            return str(e)
+        return None
+
+    @staticmethod
+    def _symlink(mount_path: str, softlink_path: str) -> Optional[str]:
+        try:
+            if os.path.lexists(softlink_path):
+                os.remove(softlink_path)
+            os.symlink(mount_path, softlink_path)
+        except Exception as e:
+            return str(e)
+        return None
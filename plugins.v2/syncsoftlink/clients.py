@@ -0,0 +1,154 @@
+import hashlib
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Union
+
+from p115client import P115Client, check_response
+
+try:
+    from p115client.exception import AuthenticationError
+except ImportError:  # pragma: no cover
+    AuthenticationError = None
+
+# 115 接口表示登录失效（cookie 过期或被踢下线）的错误码
+_AUTH_ERRNOS = frozenset((99, 990001))
+# 各插件中的本模块副本通过该名称的共享模块取到同一个客户端缓存
+_SHARED_MODULE = "_moviepilot_plugins_115_clients"
+
+
+def _auth_response(response: Dict[str, Any]) -> bool:
+    return response.get("errno") in _AUTH_ERRNOS or response.get("code") in _AUTH_ERRNOS
+
+
+def is_auth_error(error: Union[BaseException, Dict[str, Any]]) -> bool:
+    """
+    错误或接口响应是否由 cookie 失效引起，此时应丢弃缓存的客户端。
+
+    :param error: 调用抛出的异常，或未经 check_response 检查、state 为假的接口响应。
+    """
+    if isinstance(error, dict):
+        return not error.get("state", True) and _auth_response(error)
+    if AuthenticationError is not None and isinstance(error, AuthenticationError):
+        return True
+    # check_response 抛出的错误携带接口响应
+    return any(isinstance(arg, dict) and _auth_response(arg) for arg in getattr(error, "args", ()))
+
+
+def _validate(client: P115Client) -> None:
+    """
+    以列出根目录的第一项校验 cookie，失败时抛出异常。
+    """
+    check_response(client.fs_files({"cid": 0, "limit": 1}))
+
+
+class _Entry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.client: Any = None
+        self.error: Optional[BaseException] = None
+        self.checked_at = 0.0
+
+
+class ClientRegistry:
+    """
+    按 cookie 复用的 115 客户端。
+
+    客户端内部的 HTTP 会话保持长连接，复用同一个客户端即复用连接池，
+    不必每次命令或同步都重新建立客户端与连接。
+    cookie 只在首次取用时校验一次，结果缓存：校验通过后一直复用，直到调用 invalidate；
+    校验失败时在 error_ttl 秒内直接抛出同一个错误，之后再重新校验。
+    cookie 变化后按新 cookie 建立新的客户端，长时间不用的旧客户端被淘汰。
+    """
+
+    def __init__(self, factory: Callable[[str], Any] = P115Client,
+                 validate: Optional[Callable[[Any], None]] = _validate,
+                 error_ttl: float = 60, maxsize: int = 4, clock: Callable[[], float] = time.monotonic):
+        """
+        :param factory: 由 cookie 建立客户端的函数。
+        :param validate: 校验客户端的函数，cookie 无效时抛出异常；为 None 时不校验。
+        :param error_ttl: 校验失败结果的缓存秒数。
+        :param maxsize: 最多保留的客户端数。
+        """
+        self._factory = factory
+        self._validate = validate
+        self.error_ttl = error_ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self.created = 0
+        self.reused = 0
+
+    @staticmethod
+    def _key(cookie: str) -> str:
+        # 不以明文 cookie 作为键保留在内存中
+        return hashlib.sha256(cookie.strip().encode("utf-8")).hexdigest()
+
+    def get(self, cookie: str) -> Any:
+        """
+        取得 cookie 对应的客户端，首次取用时建立并校验。
+
+        :return: 客户端
+        """
+        if not cookie or not cookie.strip():
+            raise ValueError("未配置115 cookie")
+        key = self._key(cookie)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+            self._entries.move_to_end(key)
+
+        # 同一 cookie 同时只建立一次，其余调用等待并共享结果
+        with entry.lock:
+            if entry.client is not None:
+                self.reused += 1
+                return entry.client
+            if entry.error is not None and self._clock() - entry.checked_at < self.error_ttl:
+                raise entry.error
+            try:
+                client = self._factory(cookie.strip())
+                if self._validate is not None:
+                    self._validate(client)
+            except Exception as e:
+                entry.error = e
+                entry.checked_at = self._clock()
+                raise
+            entry.client = client
+            entry.error = None
+            entry.checked_at = self._clock()
+            self.created += 1
+            return client
+
+    def invalidate(self, cookie: str) -> None:
+        """
+        丢弃 cookie 对应的客户端，下次取用时重新建立并校验，用于调用方发现 cookie 已失效时。
+        """
+        if not cookie:
+            return
+        with self._lock:
+            self._entries.pop(self._key(cookie), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _shared_registry() -> ClientRegistry:
+    """
+    进程内共享的客户端缓存。
+
+    各插件各自带有本模块的副本，首个加载的副本在 sys.modules 中登记一个插件自有的共享模块并在其上建立实例，
+    之后加载的副本取用同一个实例，不改动第三方库的模块。
+    """
+    shared = types.ModuleType(_SHARED_MODULE)
+    shared.client_registry = ClientRegistry()
+    return sys.modules.setdefault(_SHARED_MODULE, shared).client_registry
+
+
+client_registry: ClientRegistry = _shared_registry()
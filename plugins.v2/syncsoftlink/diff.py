@@ -0,0 +1,134 @@
+import os
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+# 差异操作类型
+OP_ADD = "add"
+OP_REMOVE = "remove"
+
+# 路径分隔符在排序键中替换为 \x01，使整串比较与按路径分量逐级比较一致，
+# 即 "a/b" 排在 "a b" 之前，与按名称排序的深度优先遍历顺序相同
+_KEY_SEP = "\x01"
+
+
+def path_key(rel_path: str) -> str:
+    """
+    相对路径的排序键。
+    """
+    return rel_path.replace("/", _KEY_SEP)
+
+
+def iter_local_tree(root_path: str,
+                    cloud_name: Optional[Callable[[str], str]] = None) -> Iterator[Tuple[str, bool]]:
+    """
+    按排序键顺序遍历本地目录，生成相对于根目录的 (路径, 是否目录)（不含根目录本身）。
+
+    基于 os.scandir 的深度优先遍历，同级按名称排序，不跟随软链接进入目录，
+    软链接一律视为文件；内存占用只与目录深度和单个目录的项目数有关。
+
+    :param root_path: 本地文件夹的根路径。
+    :param cloud_name: 将本地文件名还原为云端文件名的函数（如 .strm 输出时去掉后缀），
+                       在同级排序前应用，输出的路径与云端目录树可直接归并比对。
+    """
+    root_path = os.path.normpath(root_path)
+    # 栈中保存 (相对路径前缀, 逆序的子项列表)
+    stack = []
+
+    def children(rel_dir: str):
+        path = os.path.join(root_path, rel_dir) if rel_dir else root_path
+        try:
+            with os.scandir(path) as it:
+                entries = [(entry.name, entry.is_dir(follow_symlinks=False)) for entry in it]
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+        if cloud_name:
+            entries = [(name if is_dir else cloud_name(name), is_dir) for name, is_dir in entries]
+        entries.sort(reverse=True)
+        return entries
+
+    stack.append(("", children("")))
+    while stack:
+        prefix, entries = stack[-1]
+        if not entries:
+            stack.pop()
+            continue
+        name, is_dir = entries.pop()
+        rel_path = f"{prefix}/{name}" if prefix else name
+        yield rel_path, is_dir
+        if is_dir:
+            stack.append((rel_path, children(rel_path)))
+
+
+def entry_type(value) -> Optional[bool]:
+    """
+    数据库中的类型列还原为是否目录：NULL 表示类型未知的叶子节点。
+    """
+    return None if value is None else bool(value)
+
+
+def merge_diff(cloud_entries: Iterable[Tuple[str, bool]],
+               local_entries: Iterable[Tuple[str, bool]]) -> Iterator[Tuple[str, str, bool]]:
+    """
+    对两个按排序键有序的 (相对路径, 是否目录) 流做归并比对，边读边产出差异操作。
+
+    路径相同但类型不同时，先删除本地项再按云端类型新增。
+    云端类型未知（None）的叶子节点在本地以软链接表示，与本地的软链接或文件一致，与本地目录不一致。
+
+    :param cloud_entries: 云端节点流，按 path_key 升序，是否目录可以为 None。
+    :param local_entries: 本地节点流，按 path_key 升序。
+    :return: (操作类型, 相对路径, 是否目录) 迭代器，按 path_key 升序。
+    """
+    cloud_iter = iter(cloud_entries)
+    local_iter = iter(local_entries)
+    cloud = next(cloud_iter, None)
+    local = next(local_iter, None)
+    while cloud is not None and local is not None:
+        cloud_key = path_key(cloud[0])
+        local_key = path_key(local[0])
+        if cloud_key == local_key:
+            if bool(cloud[1]) != local[1]:
+                yield OP_REMOVE, local[0], local[1]
+                yield OP_ADD, cloud[0], cloud[1]
+            cloud = next(cloud_iter, None)
+            local = next(local_iter, None)
+        elif cloud_key < local_key:
+            yield OP_ADD, cloud[0], cloud[1]
+            cloud = next(cloud_iter, None)
+        else:
+            yield OP_REMOVE, local[0], local[1]
+            local = next(local_iter, None)
+    while cloud is not None:
+        yield OP_ADD, cloud[0], cloud[1]
+        cloud = next(cloud_iter, None)
+    while local is not None:
+        yield OP_REMOVE, local[0], local[1]
+        local = next(local_iter, None)
+
+
+class DeletionPlanner:
+    """
+    将删除操作收敛为最小覆盖根。
+
+    输入按 path_key 升序，被删除目录的所有后代紧随其后出现，
+    因此只需记住当前的删除根，即可流式丢弃其下的删除操作。
+    """
+
+    def __init__(self):
+        # 实际执行删除的根路径数
+        self.roots = 0
+        # 被删除的项目总数（含根下的所有后代）
+        self.entries = 0
+
+    def collapse(self, operations: Iterable[Tuple[str, str, bool]]) -> Iterator[Tuple[str, str, bool]]:
+        """
+        :param operations: (操作类型, 相对路径, 是否目录) 迭代器，按 path_key 升序。
+        :return: 新增操作原样输出，删除操作只输出覆盖根。
+        """
+        current_root = None
+        for op, rel_path, is_dir in operations:
+            if op == OP_REMOVE:
+                self.entries += 1
+                if current_root is not None and rel_path.startswith(current_root + "/"):
+                    continue
+                current_root = rel_path
+                self.roots += 1
+            yield op, rel_path, is_dir
@@ -0,0 +1,299 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from p115client.tool.life import BEHAVIOR_TYPE_TO_NAME
+
+from .diff import OP_ADD, OP_REMOVE, merge_diff, path_key
+from .filters import EntryFilter
+from .roots import SyncRoot
+from .source import DirectoryLister
+
+# 新建类事件：上传、接收、新建与复制文件夹，所在目录需要对账
+CREATE_EVENTS = {"upload_image_file", "upload_file", "receive_files", "new_folder", "copy_folder"}
+# 移动、改名与删除事件：新旧所在目录都需要对账
+MOVE_EVENTS = {"move_image_file", "move_file", "folder_rename", "delete_file"}
+
+
+class LifeEvent(NamedTuple):
+    """
+    整理后的115生活事件。
+    """
+    id: int
+    type: str
+    file_id: int
+    # 事件发生后文件所在目录，删除事件可能没有
+    parent_id: Optional[int]
+    name: str
+    time: int
+
+
+def normalize_event(item: Dict[str, Any]) -> Optional[LifeEvent]:
+    """
+    将 life_behavior_detail 返回的条目整理为 LifeEvent，缺少必要字段时返回 None。
+    """
+    event_type = item.get("type") or item.get("behavior_type")
+    try:
+        event_type = BEHAVIOR_TYPE_TO_NAME.get(int(event_type), str(event_type))
+    except (TypeError, ValueError):
+        event_type = str(event_type)
+    try:
+        parent_id = item.get("parent_id")
+        return LifeEvent(
+            id=int(item["id"]),
+            type=event_type,
+            file_id=int(item.get("file_id") or 0),
+            parent_id=int(parent_id) if parent_id not in (None, "") else None,
+            name=item.get("file_name") or "",
+            time=int(item.get("update_time") or item.get("create_time") or 0),
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class EventPoller:
+    """
+    按游标轮询115生活事件。
+
+    游标记录已处理的最大事件 id 与其时间；首次运行没有游标时从当前时间开始，不回放历史事件。
+    事件处理完成后再调用 advance 推进游标，处理失败时下次轮询会重新取到这些事件。
+    """
+
+    def __init__(self, fetch: Callable[[int, int], Iterable[Dict[str, Any]]],
+                 cursor: Optional[Dict[str, int]] = None, now: Callable[[], float] = None):
+        """
+        :param fetch: 事件获取函数，参数为 (起始事件 id, 起始时间戳)，返回更新的原始事件，顺序不限。
+        :param cursor: 持久化的游标 {"id": 事件 id, "time": 时间戳}。
+        :param now: 当前时间函数，用于初始化游标。
+        """
+        self._fetch = fetch
+        if not cursor:
+            cursor = {"id": 0, "time": int((now or time.time)())}
+        self.cursor = {"id": int(cursor.get("id") or 0), "time": int(cursor.get("time") or 0)}
+
+    def poll(self) -> List[LifeEvent]:
+        """
+        :return: 游标之后的事件，按 id 升序
+        """
+        events = {}
+        for item in self._fetch(self.cursor["id"], self.cursor["time"]):
+            event = normalize_event(item)
+            if event and event.id > self.cursor["id"]:
+                events[event.id] = event
+        return [events[i] for i in sorted(events)]
+
+    def advance(self, events: List[LifeEvent]) -> None:
+        if events:
+            last = max(events, key=lambda e: e.id)
+            self.cursor = {"id": last.id, "time": max(self.cursor["time"], last.time)}
+
+
+class LocationIndex:
+    """
+    从事件中得知的文件所在目录，有界，按最近出现的顺序淘汰。
+
+    快照只记录上次定时同步时的位置，之后新上传又被移动或删除的文件需要靠它找到原所在目录。
+    """
+
+    def __init__(self, records: Optional[Dict[str, int]] = None, maxlen: int = 10000):
+        self.maxlen = maxlen
+        self._parents: OrderedDict = OrderedDict((int(k), int(v)) for k, v in (records or {}).items())
+
+    def get(self, file_id: int) -> Optional[int]:
+        return self._parents.get(file_id)
+
+    def set(self, file_id: int, parent_id: Optional[int]) -> None:
+        self._parents.pop(file_id, None)
+        if parent_id is None:
+            return
+        self._parents[file_id] = parent_id
+        while len(self._parents) > self.maxlen:
+            self._parents.popitem(last=False)
+
+    def dump(self) -> Dict[str, int]:
+        return {str(k): v for k, v in self._parents.items()}
+
+
+def dirty_dirs(events: Iterable[LifeEvent],
+               previous_parent: Callable[[LifeEvent], Iterable[int]] = lambda event: (),
+               locations: Optional[LocationIndex] = None) -> Set[int]:
+    """
+    将事件映射为需要对账的云端目录 id。
+
+    :param events: 生活事件，按 id 升序。
+    :param previous_parent: 按事件查询文件在快照中原所在目录 id 的函数，用于找到移动、改名、删除前的位置。
+    :param locations: 事件中得知的文件位置，查询原所在目录时优先使用，查到时不再查询快照，并随事件更新。
+    """
+    dirs = set()
+    for event in events:
+        if event.type not in CREATE_EVENTS and event.type not in MOVE_EVENTS:
+            continue
+        if event.parent_id is not None:
+            dirs.add(event.parent_id)
+        if event.type in MOVE_EVENTS and event.file_id:
+            known = locations.get(event.file_id) if locations else None
+            if known is not None:
+                dirs.add(known)
+            else:
+                dirs.update(previous_parent(event))
+        if locations is not None and event.file_id:
+            locations.set(event.file_id, None if event.type == "delete_file" else event.parent_id)
+    return dirs
+
+
+def list_local_dir(path: str) -> List[Tuple[str, bool]]:
+    """
+    本地目录的直接子项 (名称, 是否目录)，不跟随软链接，目录不存在时为空。
+    """
+    try:
+        with os.scandir(path) as it:
+            return [(entry.name, entry.is_dir(follow_symlinks=False)) for entry in it]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def _linked(base: str, rel_dir: str) -> Optional[str]:
+    """
+    相对路径上（含自身）第一个是软链接的本地路径，没有时返回 None。
+    类型未知的叶子节点在本地是指向挂载的软链接，不能经由它列出或写入挂载中的内容。
+    """
+    path = base
+    for name in filter(None, rel_dir.split("/")):
+        path = os.path.join(path, name)
+        if os.path.islink(path):
+            return path
+    return None
+
+
+class DirectoryReconciler:
+    """
+    对单个云端目录做浅层对账：比对云端与本地的直接子项，
+    新增的目录再向下完整遍历，删除与类型变化按 merge_diff 的规则产生。
+
+    类型与导出目录树一致：文件与空目录都是类型未知（None）的叶子节点，在本地以软链接表示；
+    有子项的目录才是目录，子项全部被排除也算。
+    """
+
+    def __init__(self, source: DirectoryLister, roots: List[SyncRoot],
+                 entry_filter: Optional[EntryFilter] = None,
+                 cloud_name: Optional[Callable[[str], str]] = None):
+        """
+        :param source: 目录列表，提供 list_dir。
+        :param roots: 所有同步根，目录按其祖先链归属到同步根。
+        :param entry_filter: 包含/排除规则，被排除的云端项目视为不存在。
+        :param cloud_name: 本地文件名还原为云端文件名的函数，同 diff.iter_local_tree。
+        """
+        self.source = source
+        self.roots = roots
+        self.entry_filter = entry_filter
+        self.cloud_name = cloud_name
+
+    def _included(self, rel_path: str, item: Dict[str, Any]) -> bool:
+        if not self.entry_filter:
+            return True
+        if item["is_dir"]:
+            return not self.entry_filter.exclude_path(rel_path)
+        return not self.entry_filter.exclude_file(rel_path)
+
+    def _leaf_excluded(self, rel_path: str) -> bool:
+        """
+        空目录与导出目录树中的叶子节点一样按文件规则判断。
+        """
+        return bool(self.entry_filter) and self.entry_filter.exclude_file(rel_path)
+
+    def reconcile(self, cid: int) -> Iterator[Tuple[SyncRoot, str, str, Optional[bool]]]:
+        """
+        :param cid: 需要对账的云端目录 id。
+        :return: (同步根, 操作类型, 相对路径, 是否目录)；目录不在任何同步根下或已不存在时为空
+        """
+        ancestors, items = self.source.list_dir(cid)
+        if not ancestors:
+            return
+        ancestor_ids = [dir_id for dir_id, _ in ancestors]
+        for root in self.roots:
+            if int(root.cid) not in ancestor_ids:
+                continue
+            names = [name for _, name in ancestors[ancestor_ids.index(int(root.cid)) + 1:]]
+            # 目录本身位于被排除的子树中
+            if self.entry_filter and any(self.entry_filter.exclude_path("/".join(names[:i + 1]))
+                                         for i in range(len(names))):
+                continue
+            rel_dir = "/".join(names)
+            yield from ((root, op, rel_path, is_dir)
+                        for op, rel_path, is_dir in self._diff(root, rel_dir, items, int(cid)))
+
+    def _type(self, item: Dict[str, Any], local_is_dir: Optional[bool]) -> Optional[bool]:
+        """
+        云端子项的类型：文件为 None；目录在本地是软链接时列出确认，空目录同样为 None。
+        """
+        if not item["is_dir"]:
+            return None
+        if local_is_dir is False and not self.source.list_dir(item["id"])[1]:
+            return None
+        return True
+
+    def _diff(self, root: SyncRoot, rel_dir: str,
+              items: List[Dict[str, Any]], cid: int) -> Iterator[Tuple[str, str, Optional[bool]]]:
+        def join(name: str) -> str:
+            return f"{rel_dir}/{name}" if rel_dir else name
+
+        if rel_dir:
+            local_dir = os.path.join(root.softlink_root, rel_dir)
+            linked = _linked(root.softlink_root, rel_dir)
+            if not items:
+                # 目录已空，与导出目录树一致变为叶子节点
+                if not linked and os.path.isdir(local_dir):
+                    yield OP_REMOVE, rel_dir, True
+                    if not self._leaf_excluded(rel_dir):
+                        yield OP_ADD, rel_dir, None
+                return
+            if linked == local_dir:
+                # 原为空目录的叶子节点有了子项，替换为目录
+                yield OP_REMOVE, rel_dir, None
+                yield from self._added(root, rel_dir, {"id": cid, "is_dir": True})
+                return
+            if linked:
+                # 祖先是软链接，由祖先目录的对账或下次定时同步处理
+                return
+
+        local = sorted(((join(name if is_dir or not self.cloud_name else self.cloud_name(name)), is_dir)
+                        for name, is_dir in list_local_dir(os.path.join(root.softlink_root, rel_dir))),
+                       key=lambda e: path_key(e[0]))
+        local_types = dict(local)
+        by_path = {}
+        cloud = []
+        for item in items:
+            rel_path = join(item["name"])
+            if not self._included(rel_path, item):
+                continue
+            is_dir = self._type(item, local_types.get(rel_path))
+            if is_dir is None and item["is_dir"] and self._leaf_excluded(rel_path):
+                continue
+            by_path[rel_path] = item
+            cloud.append((rel_path, is_dir))
+        cloud.sort(key=lambda e: path_key(e[0]))
+        for op, rel_path, is_dir in merge_diff(cloud, local):
+            if op == OP_REMOVE:
+                yield op, rel_path, is_dir
+            else:
+                yield from self._added(root, rel_path, by_path[rel_path])
+
+    def _added(self, root: SyncRoot, rel_path: str,
+               item: Dict[str, Any]) -> Iterator[Tuple[str, str, Optional[bool]]]:
+        """
+        新增的项目，目录连同其下的所有项目。
+        """
+        if not item["is_dir"]:
+            yield OP_ADD, rel_path, None
+            return
+        _, items = self.source.list_dir(item["id"])
+        if not items:
+            if not self._leaf_excluded(rel_path):
+                yield OP_ADD, rel_path, None
+            return
+        yield OP_ADD, rel_path, True
+        for child in sorted(items, key=lambda i: i["name"]):
+            child_path = f"{rel_path}/{child['name']}"
+            if self._included(child_path, child):
+                yield from self._added(root, child_path, child)
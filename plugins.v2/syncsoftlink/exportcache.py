@@ -0,0 +1,126 @@
+import glob
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class ExportCache:
+    """
+    导出结果缓存与同 CID 导出任务合并。
+
+    - 新鲜度窗口内的请求直接复用上次的结果；
+    - 同一 CID 同时只有一个导出任务，其余请求等待并共享该任务的结果。
+
+    缓存的结果应当是轻量的引用（如导出文件的本地路径），而不是解析后的目录树：
+    过期的结果在下次 get 或 clear 时交给 dispose 释放。
+    """
+
+    def __init__(self, dispose: Optional[Callable[[Any], None]] = None):
+        """
+        :param dispose: 释放过期结果的函数，如删除导出文件。
+        """
+        self._dispose = dispose
+        self._lock = threading.Lock()
+        # key -> (完成时间, 结果)
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        # key -> 进行中的导出任务
+        self._inflight: Dict[str, Future] = {}
+
+    def get(self, key: str, ttl: float, loader: Callable[[], Any]) -> Tuple[Any, float]:
+        """
+        获取导出结果。
+
+        :param key: 缓存键，通常为 CID。
+        :param ttl: 新鲜度窗口（秒），不大于 0 时既不缓存也不合并，直接调用 loader，结果由调用方负责释放。
+        :param loader: 实际执行导出的函数。
+        :return: (结果, 结果的年龄秒数，新导出时为 0)
+        """
+        if ttl <= 0:
+            # 不缓存时结果只属于本次调用，与其他请求共享会被先用完的一方释放
+            return loader(), 0
+        with self._lock:
+            now = time.time()
+            # 清理过期结果
+            for k in [k for k, (at, _) in self._entries.items() if now - at >= ttl]:
+                self.__dispose(self._entries.pop(k)[1])
+            entry = self._entries.get(key)
+            if entry:
+                return entry[1], now - entry[0]
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            result, finished_at = future.result()
+            return result, time.time() - finished_at
+
+        try:
+            result = loader()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        finished_at = time.time()
+        with self._lock:
+            self._inflight.pop(key, None)
+            previous = self._entries.get(key)
+            if previous:
+                self.__dispose(previous[1])
+            self._entries[key] = (finished_at, result)
+        future.set_result((result, finished_at))
+        return result, 0
+
+    def results(self) -> List[Any]:
+        """
+        当前缓存中的结果。
+        """
+        with self._lock:
+            return [result for _, result in self._entries.values()]
+
+    def clear(self) -> None:
+        with self._lock:
+            for _, result in self._entries.values():
+                self.__dispose(result)
+            self._entries.clear()
+
+    def __dispose(self, result: Any) -> None:
+        if self._dispose:
+            try:
+                self._dispose(result)
+            except OSError:
+                pass
+
+
+def _remove_export_file(path: str) -> None:
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def remove_stale_exports(directory: str, keep: Iterable[str] = ()) -> int:
+    """
+    删除目录中遗留的导出文件 export_*.txt 与未写完的 .tmp，keep 中的路径除外。
+
+    进程崩溃或被强制结束时导出文件不会经过 dispose 释放；调用方需确保此时没有同步正在写入导出文件。
+
+    :return: 删除的文件数
+    """
+    keep = {os.path.abspath(path) for path in keep}
+    removed = 0
+    for path in glob.glob(os.path.join(glob.escape(str(directory)), "export_*.txt*")):
+        if os.path.abspath(path) in keep:
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+# 进程内共享的导出缓存，缓存导出文件的本地路径
+export_cache = ExportCache(dispose=_remove_export_file)
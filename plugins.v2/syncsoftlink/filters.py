@@ -0,0 +1,88 @@
+import fnmatch
+import hashlib
+import os
+import re
+from typing import Iterable, Optional
+
+
+def _split(text: Optional[str]) -> list:
+    """
+    按换行、逗号或空白拆分配置文本，忽略空项。
+    """
+    return [part for part in re.split(r"[\s,，]+", text or "") if part]
+
+
+class EntryFilter:
+    """
+    云端项目的包含/排除规则，在解析目录树时逐项判断，被排除的目录连同整棵子树不进入后续阶段。
+
+    - 排除通配符：同时匹配相对路径与名称（例如 *.nfo、Extras、*/Sample/*），对目录和文件都生效；
+    - 包含扩展名：非空时只保留这些扩展名的文件，不影响目录。
+
+    导出目录树不含文件大小，因此不提供按大小过滤：只在事件同步中生效的规则会与定时同步互相抵消。
+    导出结果中没有子项的节点可能是空目录，与文件一样按文件规则判断。
+    """
+
+    def __init__(self, include_exts: Iterable[str] = (), exclude_globs: Iterable[str] = ()):
+        """
+        :param include_exts: 包含的扩展名，大小写不敏感，可带或不带前导点。
+        :param exclude_globs: 排除的通配符。
+        """
+        self.include_exts = frozenset("." + ext.lower().lstrip(".") for ext in include_exts if ext.strip("."))
+        self.exclude_globs = tuple(dict.fromkeys(exclude_globs))
+        self._exclude_re = re.compile("|".join(fnmatch.translate(g) for g in self.exclude_globs)) \
+            if self.exclude_globs else None
+        self.excluded_paths = 0
+        self.excluded_files = 0
+
+    @classmethod
+    def from_config(cls, include_exts: Optional[str], exclude_globs: Optional[str]) -> "EntryFilter":
+        """
+        :param include_exts: 逗号或空白分隔的扩展名。
+        :param exclude_globs: 每行一个通配符。
+        """
+        globs = [line.strip() for line in (exclude_globs or "").splitlines() if line.strip()]
+        return cls(_split(include_exts), globs)
+
+    @property
+    def active(self) -> bool:
+        return bool(self.include_exts or self._exclude_re)
+
+    @property
+    def key(self) -> str:
+        """
+        规则的签名，随快照记录，用于确认快照是在哪套规则下生成的。
+        """
+        if not self.active:
+            return ""
+        text = "|".join([",".join(sorted(self.include_exts)), "\n".join(self.exclude_globs)])
+        return hashlib.md5(text.encode("utf-8")).hexdigest()[:12]
+
+    def _matches_glob(self, rel_path: str) -> bool:
+        if not self._exclude_re:
+            return False
+        return bool(self._exclude_re.match(rel_path) or self._exclude_re.match(rel_path.rsplit("/", 1)[-1]))
+
+    def exclude_path(self, rel_path: str) -> bool:
+        """
+        路径是否命中排除通配符；目录命中时连同整棵子树排除。
+        """
+        if self._matches_glob(rel_path):
+            self.excluded_paths += 1
+            return True
+        return False
+
+    def exclude_file(self, rel_path: str) -> bool:
+        """
+        文件（或没有子项的节点）是否被排除。
+        """
+        excluded = (
+            (self.include_exts and os.path.splitext(rel_path)[1].lower() not in self.include_exts)
+            or self._matches_glob(rel_path)
+        )
+        if excluded:
+            self.excluded_files += 1
+        return bool(excluded)
+
+    def summary(self) -> str:
+        return f"按通配符排除 {self.excluded_paths} 项（目录含子树），按文件规则排除 {self.excluded_files} 个"
@@ -0,0 +1,347 @@
+import os
+import queue
+import sys
+import threading
+import time
+import types
+from bisect import bisect_left
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional
+
+# 延迟直方图的桶上界（毫秒），最后一个桶收纳更慢的调用
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# 这些异常是挂载端的正常应答，不计为故障
+_NORMAL_ERRORS = (FileNotFoundError, NotADirectoryError, FileExistsError, PermissionError)
+# 各插件中的本模块副本通过该名称的共享模块取到同一个访问层
+_SHARED_MODULE = "_moviepilot_plugins_fuse_access"
+
+
+class FuseTimeoutError(TimeoutError):
+    """
+    FUSE 调用超过截止时间。
+    """
+
+
+class CircuitOpenError(OSError):
+    """
+    挂载端被判定为不健康，调用被熔断器直接拒绝。
+    """
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.total += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        按桶上界估算的分位数（毫秒）。
+        """
+        if not self.total:
+            return None
+        rank = q * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return float(LATENCY_BUCKETS_MS[index]) if index < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.total,
+            "avg_ms": round(self.sum_ms / self.total, 1) if self.total else None,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max_ms, 1),
+            "buckets": {(f"<={b}ms" if i < len(LATENCY_BUCKETS_MS) else f">{LATENCY_BUCKETS_MS[-1]}ms"): c
+                        for i, (b, c) in enumerate(zip(LATENCY_BUCKETS_MS + (None,), self.counts))},
+        }
+
+
+class FuseAccess:
+    """
+    有截止时间与熔断保护的 FUSE 挂载访问层。
+
+    调用在独立的守护线程上执行，调用方最多等待 timeout 秒；挂载端卡死时，卡住的只是工作线程，
+    并会补充新的工作线程（总数不超过 workers 的 4 倍），卡住的线程恢复后多余的线程自行退出。
+    连续 failure_threshold 次超时或 I/O 错误后熔断器打开，冷却期内的调用直接抛出 CircuitOpenError；
+    冷却结束后放行一次探测调用，成功则恢复，失败则冷却时间加倍（不超过 max_cooldown）。
+    文件不存在等正常应答不计为故障。不再使用时须调用 shutdown 让工作线程退出。
+    """
+
+    def __init__(self, timeout: float = 10.0, workers: int = 4, failure_threshold: int = 3,
+                 cooldown: float = 30.0, max_cooldown: float = 600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param timeout: 单次调用的截止时间（秒）。
+        :param workers: 常驻工作线程数。
+        :param failure_threshold: 打开熔断器所需的连续故障次数。
+        :param cooldown: 熔断后的初始冷却时间（秒）。
+        :param max_cooldown: 冷却时间上限（秒）。
+        :param clock: 单调时钟。
+        """
+        self.timeout = timeout
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._failures = 0
+        self._cooldown = cooldown
+        self._open_until: Optional[float] = None
+        self._probing = False
+        self._histograms: Dict[str, _Histogram] = {}
+        self.timeouts = 0
+        self.errors = 0
+        self.rejected = 0
+        self.trips = 0
+        self.workers = max(1, workers)
+        self._threads = 0
+        self._stuck = 0
+        self._closed = False
+        for _ in range(self.workers):
+            self._spawn()
+
+    def _spawn(self) -> None:
+        self._threads += 1
+        threading.Thread(target=self._work, name=f"FuseAccess-{self._threads}", daemon=True).start()
+
+    def _work(self) -> None:
+        while True:
+            task = self._queue.get()
+            if task is None:
+                # 关闭信号，每个线程消费一个
+                with self._lock:
+                    self._threads -= 1
+                return
+            future, fn, args = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            with self._lock:
+                if getattr(future, "stuck", False):
+                    self._stuck -= 1
+                # 卡住的调用恢复后，替补线程多余则退出
+                if self._threads - self._stuck > self.workers:
+                    self._threads -= 1
+                    return
+
+    def shutdown(self) -> None:
+        """
+        停止访问层：后续调用直接被拒绝，每个工作线程处理完已排队的调用后退出，
+        卡住的线程在挂载端恢复后退出。
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            threads = self._threads
+        for _ in range(threads):
+            self._queue.put(None)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def state(self) -> str:
+        """
+        熔断器状态：closed、open 或 half_open。
+        """
+        with self._lock:
+            if self._open_until is None:
+                return "closed"
+            return "open" if self._clock() < self._open_until else "half_open"
+
+    def _admit(self, op: str, path: str) -> None:
+        with self._lock:
+            if self._closed:
+                self.rejected += 1
+                raise CircuitOpenError(f"挂载访问已停止，{op} 被拒绝：{path}")
+            if self._open_until is None:
+                return
+            if self._clock() < self._open_until or self._probing:
+                self.rejected += 1
+                raise CircuitOpenError(f"挂载端不可用，{op} 被熔断：{path}")
+            # 冷却结束，放行一次探测
+            self._probing = True
+
+    def _record(self, op: str, ms: float, failed: bool) -> None:
+        with self._lock:
+            self._histograms.setdefault(op, _Histogram()).add(ms)
+            self._probing = False
+            if not failed:
+                self._failures = 0
+                self._open_until = None
+                self._cooldown = self.base_cooldown
+                return
+            self._failures += 1
+            if self._open_until is not None:
+                # 探测失败，延长冷却
+                self._cooldown = min(self._cooldown * 2, self.max_cooldown)
+                self._open_until = self._clock() + self._cooldown
+            elif self._failures >= self.failure_threshold:
+                self.trips += 1
+                self._open_until = self._clock() + self._cooldown
+
+    def call(self, op: str, fn: Callable, path: str, *args, timeout: Optional[float] = None) -> Any:
+        """
+        在工作线程上执行 fn(path, *args)，超过截止时间抛出 FuseTimeoutError。
+
+        :param op: 操作名称，用于统计。
+        :param timeout: 本次调用的截止时间（秒），默认为 self.timeout。
+        """
+        timeout = self.timeout if timeout is None else timeout
+        self._admit(op, path)
+        future: Future = Future()
+        start = time.perf_counter()
+        self._queue.put((future, fn, (path,) + args))
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # 仍在排队的调用直接取消，仍在执行的留在工作线程上，并补充一个工作线程；
+            # 恰好在超时后完成的调用不占用线程，不计为卡住
+            if not future.cancel():
+                with self._lock:
+                    if not future.done():
+                        future.stuck = True
+                        self._stuck += 1
+                        if not self._closed and self._threads < self.workers * 4:
+                            self._spawn()
+            self.timeouts += 1
+            self._record(op, (time.perf_counter() - start) * 1000, True)
+            raise FuseTimeoutError(f"{op} 超过 {timeout} 秒未返回：{path}")
+        except _NORMAL_ERRORS:
+            self._record(op, (time.perf_counter() - start) * 1000, False)
+            raise
+        except OSError:
+            self.errors += 1
+            self._record(op, (time.perf_counter() - start) * 1000, True)
+            raise
+        self._record(op, (time.perf_counter() - start) * 1000, False)
+        return result
+
+    def listdir(self, path: str) -> List[str]:
+        return self.call("listdir", os.listdir, path)
+
+    def exists(self, path: str) -> bool:
+        return self.call("exists", os.path.exists, path)
+
+    def isdir(self, path: str) -> bool:
+        return self.call("isdir", os.path.isdir, path)
+
+    def isfile(self, path: str) -> bool:
+        return self.call("isfile", os.path.isfile, path)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        熔断器状态与各操作的延迟分布。
+        """
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "cooldown": self._cooldown,
+                "timeouts": self.timeouts,
+                "errors": self.errors,
+                "rejected": self.rejected,
+                "trips": self.trips,
+                "stuck_calls": self._stuck,
+                "latency": {op: h.to_dict() for op, h in self._histograms.items()},
+            }
+
+
+class FuseLease:
+    """
+    插件持有的共享访问层。
+
+    同一进程中的插件访问的是同一个挂载，熔断状态、工作线程与延迟统计共用一份，
+    一个插件发现挂载卡死后另一个插件的调用同样被熔断；截止时间按各插件自己的配置。
+    shutdown 只归还本插件的持有，最后一个持有归还后访问层才停止。
+    """
+
+    def __init__(self, shared: types.ModuleType, access: FuseAccess, timeout: float):
+        self._shared = shared
+        self._access = access
+        self.timeout = timeout
+        self._closed = False
+
+    def call(self, op: str, fn: Callable, path: str, *args) -> Any:
+        if self._closed:
+            raise CircuitOpenError(f"挂载访问已停止，{op} 被拒绝：{path}")
+        return self._access.call(op, fn, path, *args, timeout=self.timeout)
+
+    def listdir(self, path: str) -> List[str]:
+        return self.call("listdir", os.listdir, path)
+
+    def exists(self, path: str) -> bool:
+        return self.call("exists", os.path.exists, path)
+
+    def isdir(self, path: str) -> bool:
+        return self.call("isdir", os.path.isdir, path)
+
+    def isfile(self, path: str) -> bool:
+        return self.call("isfile", os.path.isfile, path)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed or self._access.closed
+
+    @property
+    def state(self) -> str:
+        return self._access.state
+
+    def stats(self) -> Dict[str, Any]:
+        return self._access.stats()
+
+    def shutdown(self) -> None:
+        shared = self._shared
+        with shared.lock:
+            if self._closed:
+                return
+            self._closed = True
+            if shared.access is not self._access:
+                return
+            shared.leases -= 1
+            if shared.leases > 0:
+                return
+            shared.access = None
+        self._access.shutdown()
+
+
+def acquire_fuse_access(timeout: float) -> FuseLease:
+    """
+    取得进程内共享的访问层。
+
+    各插件各自带有本模块的副本，首个加载的副本在 sys.modules 中登记一个插件自有的共享模块，
+    之后加载的副本取用同一个访问层，用法与 clients.py 的客户端缓存相同。
+
+    :param timeout: 本插件调用的截止时间（秒）。
+    """
+    shared = types.ModuleType(_SHARED_MODULE)
+    shared.lock = threading.Lock()
+    shared.access = None
+    shared.leases = 0
+    shared = sys.modules.setdefault(_SHARED_MODULE, shared)
+    with shared.lock:
+        if shared.access is None or shared.access.closed:
+            shared.access = FuseAccess(timeout=timeout)
+            shared.leases = 0
+        shared.leases += 1
+        return FuseLease(shared, shared.access, timeout)
@@ -0,0 +1,56 @@
+import os
+import threading
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+# 无 fcntl 的平台退化为进程内的锁，按锁文件路径区分
+_thread_locks: Dict[str, threading.Lock] = {}
+_thread_locks_guard = threading.Lock()
+
+
+class RunLock:
+    """
+    基于锁文件的非阻塞运行锁。
+
+    使用 flock 加锁：锁属于打开的文件描述，同一进程内重复打开同一锁文件也会互斥，
+    因此插件重载后的新实例同样会被仍在运行的旧任务挡住；进程退出时锁自动释放，不会残留。
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._fd: Optional[int] = None
+        self._thread_lock: Optional[threading.Lock] = None
+
+    def acquire(self) -> bool:
+        """
+        尝试加锁，已被占用时立即返回 False。
+        """
+        if fcntl is None:
+            with _thread_locks_guard:
+                lock = _thread_locks.setdefault(self.path, threading.Lock())
+            if not lock.acquire(blocking=False):
+                return False
+            self._thread_lock = lock
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._thread_lock is not None:
+            self._thread_lock.release()
+            self._thread_lock = None
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+# (阶段标识, 显示名称)
+PHASES = [
+    ("export_wait", "导出等待"),
+    ("export", "导出下载"),
+    ("parse", "解析"),
+    ("local_scan", "本地扫描"),
+    ("diff", "比对"),
+    ("delete", "删除"),
+    ("refresh", "刷新"),
+    ("create", "创建"),
+]
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss() -> int:
+    """
+    当前进程的常驻内存（字节），无法读取时返回 0。
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def process_peak_rss() -> int:
+    """
+    进程生命周期内的常驻内存峰值（字节），无 resource 模块的平台（Windows）返回 0。
+    """
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RunMetrics:
+    """
+    单个同步根一次运行的各阶段耗时、处理项目数与资源占用。
+    """
+
+    def __init__(self, root: str, source: str, full_sync: bool):
+        self.root = root
+        self.source = source
+        self.full_sync = full_sync
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.success = False
+        self.export_cached = False
+        # 是否从上次中断的操作日志继续
+        self.resumed = False
+        self.fuse_calls = 0
+        self.seconds: Dict[str, float] = {name: 0.0 for name, _ in PHASES}
+        self.items: Dict[str, int] = {name: 0 for name, _ in PHASES}
+        self.peak_rss = current_rss()
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, seconds: float, items: int = 0) -> None:
+        with self._lock:
+            self.seconds[phase] += seconds
+            self.items[phase] += items
+
+    @contextmanager
+    def phase(self, phase: str):
+        """
+        记录代码块耗时，结束时采样一次内存。
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+            self.sample_rss()
+
+    def timed(self, phase: str, iterable: Iterable, sample_every: int = 10000) -> Iterator:
+        """
+        包装迭代器，累计在其内部花费的时间与产出的项目数。
+        """
+        iterator = iter(iterable)
+        count = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(phase, time.perf_counter() - start)
+                self.sample_rss()
+                return
+            self.add(phase, time.perf_counter() - start, 1)
+            count += 1
+            if count % sample_every == 0:
+                self.sample_rss()
+            yield item
+
+    def sample_rss(self) -> None:
+        rss = current_rss()
+        with self._lock:
+            self.peak_rss = max(self.peak_rss, rss)
+
+    def finish(self, success: bool) -> None:
+        self.success = success
+        self.finished_at = time.time()
+        self.sample_rss()
+
+    def to_dict(self) -> Dict[str, Any]:
+        phases = {}
+        for name, _ in PHASES:
+            seconds = round(self.seconds[name], 3)
+            items = self.items[name]
+            phases[name] = {
+                "seconds": seconds,
+                "items": items,
+                "rate": round(items / seconds, 1) if seconds > 0 else None,
+            }
+        return {
+            "root": self.root,
+            "source": self.source,
+            "full_sync": self.full_sync,
+            "export_cached": self.export_cached,
+            "resumed": self.resumed,
+            "success": self.success,
+            "started_at": self.started_at,
+            "duration": round((self.finished_at or time.time()) - self.started_at, 3),
+            "phases": phases,
+            "fuse_calls": self.fuse_calls,
+            "peak_rss": self.peak_rss,
+            "process_peak_rss": process_peak_rss(),
+        }
+
+
+class MetricsHistory:
+    """
+    有界的运行指标历史环。
+    """
+
+    def __init__(self, maxlen: int = 50, records: Optional[List[Dict[str, Any]]] = None):
+        self._lock = threading.Lock()
+        self._records = deque(records or [], maxlen=maxlen)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._records.append(record)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """
+        按时间从新到旧返回。
+        """
+        with self._lock:
+            return list(reversed(self._records))
+
+    def dump(self) -> List[Dict[str, Any]]:
+        """
+        按时间从旧到新返回，用于持久化。
+        """
+        with self._lock:
+            return list(self._records)
@@ -0,0 +1,110 @@
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import Executor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+
+class RefreshPlanner:
+    """
+    挂载目录刷新计划。
+
+    收集本次同步需要刷新的挂载目录（含其位于挂载前缀之下的所有祖先目录），
+    每个目录在一次运行中只访问一次，由浅到深执行；
+    刷新失败的目录，其下级目录直接跳过，不再产生 FUSE 调用。
+    """
+
+    def __init__(self, base_path: str,
+                 exists: Callable[[str], bool] = os.path.exists,
+                 listdir: Callable[[str], list] = os.listdir):
+        """
+        :param base_path: 挂载路径前缀，从该目录开始逐级刷新。
+        :param exists: 判断路径是否存在的函数。
+        :param listdir: 列出目录的函数，列目录即触发挂载端刷新。
+                        两者抛出的异常（如 FUSE 调用超时或被熔断）都按刷新失败处理。
+        """
+        self.base_path = os.path.normpath(base_path)
+        self._exists = exists
+        self._listdir = listdir
+        self._pending: Set[str] = set()
+        # 目录 -> 是否刷新成功
+        self._results: Dict[str, bool] = {}
+        self.fuse_calls = 0
+        self.refreshed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.failed_paths = []
+
+    def add(self, mount_dir: str) -> None:
+        """
+        登记一个需要刷新的挂载目录，其祖先目录一并登记。
+        """
+        path = os.path.normpath(mount_dir)
+        while path not in self._pending and path not in self._results:
+            self._pending.add(path)
+            if path == self.base_path or len(path) <= len(self.base_path):
+                break
+            path = os.path.dirname(path)
+
+    def run(self, executor: Optional[Executor] = None,
+            semaphore: Optional[threading.Semaphore] = None) -> None:
+        """
+        由浅到深逐层刷新所有已登记的目录，同一层的目录可并发刷新。
+
+        :param executor: 用于并发刷新的线程池，为空时顺序执行。
+        :param semaphore: 限制同时进行的刷新数。
+        """
+        levels: Dict[int, List[str]] = defaultdict(list)
+        for path in self._pending:
+            levels[path.count(os.sep)].append(path)
+        self._pending.clear()
+
+        def refresh(path: str) -> Tuple[bool, int]:
+            if semaphore is None:
+                return self._refresh(path)
+            with semaphore:
+                return self._refresh(path)
+
+        for depth in sorted(levels):
+            paths = []
+            for path in sorted(levels[depth]):
+                if self._results.get(os.path.dirname(path)) is False:
+                    # 上级目录刷新失败，跳过
+                    self._results[path] = False
+                    self.skipped += 1
+                else:
+                    paths.append(path)
+            results = executor.map(refresh, paths) if executor else map(refresh, paths)
+            for path, (ok, calls) in zip(paths, results):
+                self._results[path] = ok
+                self.fuse_calls += calls
+                if ok:
+                    self.refreshed += 1
+                else:
+                    self.failed += 1
+                    self.failed_paths.append(path)
+
+    def _refresh(self, path: str) -> Tuple[bool, int]:
+        """
+        :return: (是否成功, FUSE 调用次数)
+        """
+        try:
+            if not self._exists(path):
+                return False, 1
+        except Exception:
+            return False, 1
+        try:
+            self._listdir(path)
+        except Exception:
+            return False, 2
+        return True, 2
+
+    def is_ready(self, mount_dir: str) -> bool:
+        """
+        目录是否已刷新成功；未登记的目录视为无需刷新。
+        """
+        return self._results.get(os.path.normpath(mount_dir), True)
+
+    def summary(self) -> str:
+        return (f"刷新目录 {self.refreshed} 个，失败 {self.failed} 个，"
+                f"跳过 {self.skipped} 个，FUSE 调用 {self.fuse_calls} 次")
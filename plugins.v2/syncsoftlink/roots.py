@@ -0,0 +1,57 @@
+import hashlib
+import os
+from typing import List, NamedTuple, Optional
+
+
+class SyncRoot(NamedTuple):
+    """
+    一个同步根：115目录 CID 与其挂载路径、软连接路径。
+    """
+    cid: str
+    mount_root: str
+    softlink_root: str
+    # 挂载刷新从此目录开始逐级进行
+    refresh_base: str
+
+    @property
+    def key(self) -> str:
+        """
+        同步根的唯一标识，用于区分快照等本地状态文件。
+        """
+        digest = hashlib.md5(self.softlink_root.encode("utf-8")).hexdigest()[:8]
+        return f"{self.cid}_{digest}"
+
+
+def parse_sync_roots(mappings: Optional[str]) -> List[SyncRoot]:
+    """
+    解析同步根配置，每行一个：CID#挂载路径#软连接路径，# 开头的行为注释。
+
+    :param mappings: 多行配置文本。
+    """
+    roots = []
+    for line in (mappings or "").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = [part.strip() for part in line.split("#")]
+        if len(parts) != 3 or not all(parts) or not parts[0].isdigit():
+            raise ValueError(f"同步根配置格式错误: {line}")
+        cid, mount_root, softlink_root = parts
+        mount_root = os.path.normpath(mount_root)
+        roots.append(SyncRoot(cid, mount_root, os.path.normpath(softlink_root), mount_root))
+    return roots
+
+
+def legacy_sync_root(cid: Optional[str], fuse_path_prefix: Optional[str],
+                     softlink_path_prefix: Optional[str]) -> Optional[SyncRoot]:
+    """
+    兼容旧版单目录配置：挂载路径与软连接路径为前缀加 media_center。
+    """
+    if not all([cid, fuse_path_prefix, softlink_path_prefix]):
+        return None
+    return SyncRoot(
+        cid=str(cid).strip(),
+        mount_root=os.path.join(fuse_path_prefix, "media_center"),
+        softlink_root=os.path.join(softlink_path_prefix, "media_center"),
+        refresh_base=os.path.normpath(fuse_path_prefix),
+    )
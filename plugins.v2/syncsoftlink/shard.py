@@ -0,0 +1,229 @@
+import importlib
+import json
+import os
+import pickle
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .diff import entry_type, iter_local_tree, merge_diff, path_key
+
+# 子进程以全新的解释器启动，只把插件目录注册为一个独立的包并加载本模块，
+# 不导入插件 __init__（依赖 MoviePilot 运行环境），也不继承父进程的线程与锁
+_WORKER_PACKAGE = "_syncsoftlink_shard"
+_WORKER_BOOTSTRAP = (
+    "import importlib, sys, types\n"
+    f"package = types.ModuleType({_WORKER_PACKAGE!r})\n"
+    "package.__path__ = [sys.argv[1]]\n"
+    f"sys.modules[{_WORKER_PACKAGE!r}] = package\n"
+    f"importlib.import_module({_WORKER_PACKAGE!r} + '.shard').run_shard_spec(sys.argv[2])\n"
+)
+
+# 每个进程分到的分片数，分片越多负载越均衡
+_SHARDS_PER_PROCESS = 4
+# 差异文件中每个 pickle 记录包含的操作数
+_BATCH = 10000
+
+
+def _top_level_weights(db_path: str) -> List[Tuple[str, int]]:
+    """
+    暂存目录树中每个顶层项目的子树项目数。
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT substr(path, 1, instr(path || '/', '/') - 1) AS top, count(*) FROM staging GROUP BY top"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def partition(weights: List[Tuple[str, int]], shards: int) -> List[List[str]]:
+    """
+    按 path_key 顺序把顶层项目切成权重相近的连续分片，各分片的差异依次拼接即为全局有序的差异。
+
+    :param weights: (顶层名称, 权重)。
+    :param shards: 期望的分片数。
+    """
+    weights = sorted(weights, key=lambda w: path_key(w[0]))
+    total = sum(w for _, w in weights)
+    target = max(1, total // max(1, shards))
+    result, current, current_weight = [], [], 0
+    for name, weight in weights:
+        current.append(name)
+        current_weight += weight
+        if current_weight >= target:
+            result.append(current)
+            current, current_weight = [], 0
+    if current:
+        result.append(current)
+    return result
+
+
+def diff_shard(db_path: str, softlink_root: str, tops: List[str], out_path: str,
+               cloud_name: Optional[Callable[[str], str]] = None) -> int:
+    """
+    比对一组顶层项目下的云端与本地目录树，差异分批 pickle 写入文件。
+
+    只使用 sqlite3 与 os，自行以只读方式打开数据库连接。
+
+    :param db_path: 快照数据库路径，暂存表已写入完成。
+    :param softlink_root: 本地软连接根目录。
+    :param tops: 按 path_key 有序的顶层名称。
+    :param out_path: 差异文件路径。
+    :param cloud_name: 本地文件名还原为云端文件名的函数，同 iter_local_tree。
+    :return: 差异条数
+    """
+    local_names = _local_top_names(softlink_root, cloud_name) if cloud_name else {}
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    count = 0
+    batch = []
+    try:
+        with open(out_path, "wb") as out:
+            for top in tops:
+                # 路径上界 top + "0"（"/" 的下一个字符）让查询可以走 path 索引
+                cloud = ((p, entry_type(d)) for p, d in conn.execute(
+                    "SELECT path, is_dir FROM staging WHERE path = ? OR (path > ? AND path < ?) "
+                    "ORDER BY replace(path, '/', char(1))",
+                    (top, top + "/", top + "0")
+                ))
+                for operation in merge_diff(cloud, _local_entries(softlink_root, top, local_names.get(top, [top]), cloud_name)):
+                    batch.append(operation)
+                    if len(batch) >= _BATCH:
+                        pickle.dump(batch, out, protocol=pickle.HIGHEST_PROTOCOL)
+                        count += len(batch)
+                        batch = []
+            if batch:
+                pickle.dump(batch, out, protocol=pickle.HIGHEST_PROTOCOL)
+                count += len(batch)
+    finally:
+        conn.close()
+    return count
+
+
+def run_shard_spec(spec_path: str) -> None:
+    """
+    子进程入口：按描述文件执行一个分片。
+
+    描述文件为 JSON：db_path、softlink_root、tops、out_path 与 strm_exts（.strm 输出时的扩展名，否则为 null）。
+    """
+    with open(spec_path, encoding="utf-8") as f:
+        spec = json.load(f)
+    cloud_name = None
+    if spec.get("strm_exts") is not None:
+        strm = importlib.import_module(__package__ + ".strm")
+        cloud_name = strm.StrmWriter("", spec["strm_exts"]).cloud_name
+    diff_shard(spec["db_path"], spec["softlink_root"], spec["tops"], spec["out_path"], cloud_name)
+
+
+def _local_top_names(softlink_root: str, cloud_name: Callable[[str], str]) -> Dict[str, List[str]]:
+    """
+    还原后的顶层名称 -> 本地顶层名称，目录名不做还原。
+    """
+    names: Dict[str, List[str]] = {}
+    try:
+        with os.scandir(softlink_root) as it:
+            for entry in it:
+                top = entry.name if entry.is_dir(follow_symlinks=False) else cloud_name(entry.name)
+                names.setdefault(top, []).append(entry.name)
+    except FileNotFoundError:
+        pass
+    return names
+
+
+def _local_entries(softlink_root: str, top: str, names: List[str],
+                   cloud_name: Optional[Callable[[str], str]] = None) -> Iterator[Tuple[str, bool]]:
+    """
+    :param top: 还原后的顶层名称。
+    :param names: 还原为 top 的本地顶层名称。
+    """
+    for name in sorted(names):
+        path = os.path.join(softlink_root, name)
+        if not os.path.lexists(path):
+            continue
+        is_dir = os.path.isdir(path) and not os.path.islink(path)
+        yield top, is_dir
+        if is_dir:
+            for rel_path, child_is_dir in iter_local_tree(path, cloud_name):
+                yield f"{top}/{rel_path}", child_is_dir
+
+
+def _read_shard(path: str) -> Iterator[Tuple[str, str, bool]]:
+    try:
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    yield from pickle.load(f)
+                except EOFError:
+                    break
+    finally:
+        os.remove(path)
+
+
+def _run_worker(spec_path: str) -> None:
+    """
+    在新的解释器进程中执行一个分片，失败时抛出带有子进程错误输出的 RuntimeError。
+    """
+    plugin_dir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, "-c", _WORKER_BOOTSTRAP, plugin_dir, spec_path],
+                            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        error = result.stderr.decode("utf-8", "replace").strip().splitlines()
+        raise RuntimeError(f"分片比对子进程失败（退出码 {result.returncode}）: {error[-1] if error else ''}")
+
+
+def sharded_full_diff(db_path: str, softlink_root: str, processes: int, work_dir: Optional[str] = None,
+                      strm_exts: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, str, bool]]:
+    """
+    按顶层目录分片，在多个子进程中并行比对暂存目录树与本地软连接目录。
+
+    各分片的顶层项目在 path_key 顺序上连续，结果按分片顺序拼接后与 merge_diff 的单进程输出完全一致；
+    分片的输入与差异都经文件传递，主进程逐个读取，内存占用与单个分片无关。
+    子进程以全新的解释器启动（而非 fork），插件所在的多线程进程中其他线程持有的锁不会带入子进程。
+
+    分片只在本地扫描与归并比对明显慢于启动子进程、回传差异的开销时才有收益，
+    即数十万项以上、CPU 核数充足且本地软连接目录在较快的磁盘上；规模较小时比单进程更慢。
+
+    :param db_path: 快照数据库路径，暂存表须已提交。
+    :param softlink_root: 本地软连接根目录。
+    :param processes: 进程数。
+    :param work_dir: 分片描述与差异文件所在目录。
+    :param strm_exts: .strm 输出时生成 .strm 的扩展名，本地文件名按 StrmWriter.cloud_name 还原后比对。
+    :return: (操作类型, 相对路径, 是否目录) 迭代器，按 path_key 升序
+    """
+    cloud_name = None
+    if strm_exts is not None:
+        from .strm import StrmWriter
+        strm_exts = sorted(strm_exts)
+        cloud_name = StrmWriter("", strm_exts).cloud_name
+    weights = dict(_top_level_weights(db_path))
+    try:
+        with os.scandir(softlink_root) as it:
+            for entry in it:
+                name = entry.name
+                if cloud_name and not entry.is_dir(follow_symlinks=False):
+                    name = cloud_name(name)
+                weights.setdefault(name, 1)
+    except FileNotFoundError:
+        pass
+    shards = partition(list(weights.items()), processes * _SHARDS_PER_PROCESS)
+    if not shards:
+        return
+    with tempfile.TemporaryDirectory(dir=work_dir) as out_dir, \
+            ThreadPoolExecutor(max_workers=processes, thread_name_prefix="SyncSoftLink-shard") as pool:
+        out_paths = []
+        futures = []
+        for index, tops in enumerate(shards):
+            spec_path = os.path.join(out_dir, f"shard_{index}.json")
+            out_path = os.path.join(out_dir, f"shard_{index}.pickle")
+            with open(spec_path, "w", encoding="utf-8") as f:
+                json.dump({"db_path": os.path.abspath(db_path), "softlink_root": softlink_root, "tops": tops,
+                           "out_path": out_path, "strm_exts": strm_exts}, f, ensure_ascii=False)
+            out_paths.append(out_path)
+            futures.append(pool.submit(_run_worker, spec_path))
+        for future, out_path in zip(futures, out_paths):
+            future.result()
+            yield from _read_shard(out_path)
@@ -0,0 +1,368 @@
+import os
+import sqlite3
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .diff import OP_ADD, OP_REMOVE, entry_type
+from .tree import CloudTree
+
+# 快照表结构版本，结构变化时旧快照视为缺失，触发全量同步
+SCHEMA_VERSION = 5
+
+# 目录树来源：export_dir 导出；旧版本的目录列表来源记为 listing，这类快照不再做增量比对
+SOURCE_EXPORT = "export"
+
+_COLUMNS = "id, parent_id, name, path, is_dir, size, sha1, mtime"
+
+
+class TreeSnapshot:
+    """
+    115网盘目录树快照，以 SQLite 持久化在插件数据目录中。
+
+    节点以 (id, parent_id, name) 记录，带有类型、大小与 sha1，
+    另存相对于云端根目录的路径 path 以便比对。
+    类型为 NULL 的节点是导出结果中没有子节点的项，可能是文件也可能是空目录；大小未知时为 NULL。
+    每次同步先把新目录树写入暂存表 staging，与上次提交的 nodes 表比对得到增量，
+    应用成功后再用 staging 覆盖 nodes。
+
+    增量先完整写入操作日志 journal 再执行，执行进度按操作类型记录为已完成的条数，
+    失败的新增在日志中标记，提交时从暂存表剔除；失败的删除记入 retry_removals，下次增量同步时再次删除；
+    运行中断后暂存表与日志都保留在数据库中，下次运行可直接从断点继续。
+
+    导出目录树得到的 id 只是行号，按115 id 无法查到节点；
+    生活事件中移动、删除前的位置按名称在 name 索引上查找。
+    """
+
+    def __init__(self, db_path: str, cid: str):
+        self.db_path = str(db_path)
+        self.cid = str(cid)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        if self._get_meta_safe("schema_version") not in (None, str(SCHEMA_VERSION)):
+            # 旧结构的快照直接丢弃
+            self._conn.executescript(
+                "DROP TABLE IF EXISTS nodes; DROP TABLE IF EXISTS staging; DROP TABLE IF EXISTS journal; "
+                "DROP TABLE IF EXISTS retry_removals; DELETE FROM meta;"
+            )
+        self._conn.executescript(
+            f"""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS nodes ({self._table_columns()});
+            CREATE INDEX IF NOT EXISTS idx_nodes_path ON nodes (path);
+            CREATE INDEX IF NOT EXISTS idx_nodes_parent ON nodes (parent_id);
+            CREATE INDEX IF NOT EXISTS idx_nodes_name ON nodes (name);
+            CREATE TABLE IF NOT EXISTS journal (
+                seq INTEGER PRIMARY KEY,
+                op TEXT NOT NULL,
+                path TEXT NOT NULL,
+                is_dir INTEGER,
+                failed INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS retry_removals (
+                path TEXT PRIMARY KEY,
+                is_dir INTEGER
+            );
+            """
+        )
+        self._checkpoint_at = 0.0
+
+    @staticmethod
+    def _table_columns() -> str:
+        return """
+            id INTEGER PRIMARY KEY,
+            parent_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            path TEXT NOT NULL,
+            is_dir INTEGER,
+            size INTEGER,
+            sha1 TEXT NOT NULL DEFAULT '',
+            mtime INTEGER
+        """
+
+    def _get_meta_safe(self, key: str) -> Optional[str]:
+        try:
+            return self._get_meta(key)
+        except sqlite3.OperationalError:
+            return None
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value))
+        )
+
+    def exists(self) -> bool:
+        """
+        快照是否可用：属于同一 CID、结构版本一致且至少提交过一次。
+        """
+        return (
+            self._get_meta("cid") == self.cid
+            and self._get_meta("schema_version") == str(SCHEMA_VERSION)
+            and self._get_meta("committed_at") is not None
+        )
+
+    @property
+    def committed_at(self) -> Optional[float]:
+        value = self._get_meta("committed_at")
+        return float(value) if value else None
+
+    @property
+    def full_synced_at(self) -> Optional[float]:
+        """
+        最近一次全量同步的提交时间，从未记录时返回 None。
+        """
+        value = self._get_meta("full_synced_at")
+        return float(value) if value else None
+
+    @property
+    def source(self) -> Optional[str]:
+        """
+        已提交快照的目录树来源。
+        """
+        return self._get_meta("source")
+
+    @property
+    def staging_source(self) -> Optional[str]:
+        """
+        暂存目录树的来源。
+        """
+        return self._get_meta("staging_source")
+
+    @property
+    def filter_key(self) -> str:
+        """
+        已提交快照所用包含/排除规则的签名，没有规则时为空串。
+        """
+        return self._get_meta("filter") or ""
+
+    def begin_stage(self, source: str, filter_key: str = "") -> None:
+        """
+        清空并重建暂存表，未完成的操作日志随之作废。
+
+        :param source: 本次目录树来源。
+        :param filter_key: 本次包含/排除规则的签名。
+        """
+        with self._conn:
+            self._clear_journal()
+            self._set_meta("staging_source", source)
+            self._set_meta("staging_filter", filter_key)
+            self._conn.execute("DROP TABLE IF EXISTS staging")
+            self._conn.execute(f"CREATE TABLE staging ({self._table_columns()})")
+
+    def stage_rows(self, rows: Iterable[Tuple]) -> int:
+        """
+        写入暂存节点，行格式同 _COLUMNS。
+
+        :return: 写入的行数
+        """
+        with self._conn:
+            cursor = self._conn.executemany(
+                f"INSERT OR REPLACE INTO staging ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        return cursor.rowcount
+
+    def finish_stage(self) -> None:
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_staging_path ON staging (path)")
+
+    def parent_dirs(self, name: str, limit: int = 20) -> List[str]:
+        """
+        已提交快照中名为 name 的节点所在目录的相对路径，根目录为空串。
+
+        同名节点不多于 limit 个时全部返回，对账多余的目录没有副作用；
+        超过时无法定位，返回空列表，由下次定时同步的增量修正。
+        """
+        rows = self._conn.execute("SELECT path FROM nodes WHERE name = ? LIMIT ?", (name, limit + 1)).fetchall()
+        if len(rows) > limit:
+            return []
+        return sorted({path.rsplit("/", 1)[0] if "/" in path else "" for path, in rows})
+
+    def record_events(self, removed: Iterable[str], added: Iterable[Tuple[str, Optional[bool]]]) -> None:
+        """
+        将事件同步的结果写入已提交快照：删除的路径连同子树移除，已创建的路径补入。
+
+        事件同步未能定位的变化会留在本地，快照记录事件新增的路径后，
+        这些路径之后从云端消失时，下次定时同步的增量才会删除它们。快照不可用时不做任何事。
+        """
+        if not self.exists():
+            return
+        with self._conn:
+            for path in removed:
+                self._conn.execute("DELETE FROM nodes WHERE path = ? OR substr(path, 1, ?) = ?",
+                                   (path, len(path) + 1, path + "/"))
+            for path, is_dir in added:
+                # 事件同步没有导出行号，id 由 SQLite 分配
+                self._conn.execute(
+                    "INSERT INTO nodes (parent_id, name, path, is_dir) SELECT 0, ?, ?, ? "
+                    "WHERE NOT EXISTS (SELECT 1 FROM nodes WHERE path = ?)",
+                    (path.rsplit("/", 1)[-1], path, is_dir, path)
+                )
+
+    def stage_tree(self, tree: CloudTree, source: str = SOURCE_EXPORT, filter_key: str = "") -> int:
+        """
+        将完整的目录树写入暂存表。
+
+        :param tree: 带类型的云端目录树。
+        :param source: 目录树来源。
+        :param filter_key: 解析目录树时所用包含/排除规则的签名。
+        :return: 暂存的节点数
+        """
+        self.begin_stage(source, filter_key)
+        count = self.stage_rows(
+            (e.id, e.parent_id, e.name, e.path, e.is_dir, e.size, e.sha1, e.mtime) for e in tree
+        )
+        self.finish_stage()
+        return count
+
+    def staged_entries(self) -> Iterator[Tuple[str, Optional[bool]]]:
+        """
+        暂存目录树中所有节点的 (相对路径, 是否目录)，按 diff.path_key 顺序输出，排序在 SQLite 中完成。
+        """
+        for path, is_dir in self._conn.execute(
+            "SELECT path, is_dir FROM staging ORDER BY replace(path, '/', char(1))"
+        ):
+            yield path, entry_type(is_dir)
+
+    def delta(self) -> Tuple[Iterator[Tuple[str, Optional[bool]]], Iterator[Tuple[str, Optional[bool]]]]:
+        """
+        比对暂存目录树与已提交快照，路径相同但类型改变的节点同时出现在删除与新增中。
+        EXCEPT 中 NULL 与 NULL 视为相同，类型未知的叶子节点保持未知时不产生差异。
+        上次未能删除的路径若仍不在暂存目录树中，再次出现在删除中。
+
+        :return: (新增的 (相对路径, 是否目录), 删除的 (相对路径, 是否目录))，均按 diff.path_key 升序
+        """
+        added = self._conn.execute(
+            "SELECT path, is_dir FROM (SELECT path, is_dir FROM staging EXCEPT SELECT path, is_dir FROM nodes) "
+            "ORDER BY replace(path, '/', char(1))"
+        )
+        removed = self._conn.execute(
+            "SELECT path, is_dir FROM (SELECT path, is_dir FROM nodes UNION SELECT path, is_dir FROM retry_removals "
+            "EXCEPT SELECT path, is_dir FROM staging) "
+            "ORDER BY replace(path, '/', char(1))"
+        )
+        return ((p, entry_type(d)) for p, d in added), ((p, entry_type(d)) for p, d in removed)
+
+    def _clear_journal(self) -> None:
+        self._conn.execute("DELETE FROM journal")
+        self._conn.execute("DELETE FROM meta WHERE key LIKE 'journal_%'")
+
+    def plan(self, operations: Iterable[Tuple[str, str, Optional[bool]]], full_sync: bool,
+             batch_size: int = 1000) -> Tuple[int, int]:
+        """
+        将差异操作流完整写入操作日志，全部写入后才标记为已规划。
+
+        :param operations: (操作类型, 相对路径, 是否目录) 迭代器，按 diff.path_key 升序。
+        :param full_sync: 本次是否为全量同步。
+        :param batch_size: 批量写入的行数。
+        :return: (删除数, 新增数)
+        """
+        with self._conn:
+            self._clear_journal()
+        counts = {OP_REMOVE: 0, OP_ADD: 0}
+        batch = []
+        for op, rel_path, is_dir in operations:
+            counts[op] += 1
+            batch.append((op, rel_path, is_dir))
+            if len(batch) >= batch_size:
+                with self._conn:
+                    self._conn.executemany("INSERT INTO journal (op, path, is_dir) VALUES (?, ?, ?)", batch)
+                batch = []
+        with self._conn:
+            self._conn.executemany("INSERT INTO journal (op, path, is_dir) VALUES (?, ?, ?)", batch)
+            self._set_meta("journal_full_sync", int(full_sync))
+            self._set_meta(f"journal_{OP_REMOVE}", 0)
+            self._set_meta(f"journal_{OP_ADD}", 0)
+            self._set_meta("journal_planned_at", time.time())
+        return counts[OP_REMOVE], counts[OP_ADD]
+
+    @property
+    def journal_planned_at(self) -> Optional[float]:
+        """
+        未完成的操作日志的规划时间，没有时返回 None。
+        """
+        value = self._get_meta("journal_planned_at")
+        if not value:
+            return None
+        row = self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'staging'").fetchone()
+        return float(value) if row else None
+
+    @property
+    def journal_full_sync(self) -> bool:
+        return self._get_meta("journal_full_sync") == "1"
+
+    def journal_done(self, op: str) -> int:
+        """
+        某类操作已完成的条数。
+        """
+        return int(self._get_meta(f"journal_{op}") or 0)
+
+    def journal_remaining(self, op: str) -> int:
+        total = self._conn.execute("SELECT count(*) FROM journal WHERE op = ?", (op,)).fetchone()[0]
+        return max(0, total - self.journal_done(op))
+
+    def journal_operations(self, op: str) -> Iterator[Tuple[str, Optional[bool]]]:
+        """
+        某类操作中尚未完成的 (相对路径, 是否目录)，按规划顺序输出。
+        """
+        for path, is_dir in self._conn.execute(
+            "SELECT path, is_dir FROM journal WHERE op = ? ORDER BY seq LIMIT -1 OFFSET ?",
+            (op, self.journal_done(op))
+        ):
+            yield path, entry_type(is_dir)
+
+    def checkpoint(self, op: str, done: int, failed: Iterable[str] = (), interval: float = 0.0) -> None:
+        """
+        记录执行进度。
+
+        :param op: 操作类型。
+        :param done: 该类操作已完成的条数（含本次运行之前完成的部分）。
+        :param failed: 未能应用的路径：新增的提交时从暂存表剔除，删除的记入 retry_removals，均在下次同步重试。
+        :param interval: 距上次记录不足该秒数且没有失败路径时跳过，用于限制写入频率。
+        """
+        failed = list(failed)
+        now = time.monotonic()
+        if not failed and now - self._checkpoint_at < interval:
+            return
+        self._checkpoint_at = now
+        with self._conn:
+            self._set_meta(f"journal_{op}", done)
+            self._conn.executemany(
+                "UPDATE journal SET failed = 1 WHERE op = ? AND path = ?", ((op, p) for p in failed)
+            )
+
+    def commit(self) -> None:
+        """
+        剔除操作日志中失败的新增后，以暂存目录树覆盖快照并清空日志；失败的删除留待下次重试。
+        """
+        full_sync = self.journal_full_sync
+        with self._conn:
+            self._conn.execute(
+                f"DELETE FROM staging WHERE path IN (SELECT path FROM journal WHERE op = '{OP_ADD}' AND failed)"
+            )
+            self._conn.execute("DELETE FROM retry_removals")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO retry_removals (path, is_dir) "
+                f"SELECT path, is_dir FROM journal WHERE op = '{OP_REMOVE}' AND failed"
+            )
+            self._conn.execute("DELETE FROM nodes")
+            self._conn.execute(f"INSERT INTO nodes ({_COLUMNS}) SELECT {_COLUMNS} FROM staging")
+            self._conn.execute("DROP TABLE IF EXISTS staging")
+            self._clear_journal()
+            self._set_meta("cid", self.cid)
+            self._set_meta("schema_version", SCHEMA_VERSION)
+            self._set_meta("source", self.staging_source)
+            self._set_meta("filter", self._get_meta("staging_filter") or "")
+            now = time.time()
+            self._set_meta("committed_at", now)
+            if full_sync:
+                self._set_meta("full_synced_at", now)
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,108 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def normalize_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    将 fs_files 返回的条目整理为统一字段。
+
+    目录条目没有 fid，自身 id 为 cid、父目录为 pid；文件条目的 cid 为父目录 id。
+    """
+    is_dir = "fid" not in item
+    mtime = item.get("te") or item.get("tu") or item.get("tp") or 0
+    try:
+        mtime = int(float(mtime))
+    except (TypeError, ValueError):
+        mtime = 0
+    return {
+        "id": int(item["cid"] if is_dir else item["fid"]),
+        "parent_id": int(item["pid"] if is_dir else item["cid"]),
+        "name": item["n"],
+        "is_dir": is_dir,
+        "size": int(item.get("s") or 0),
+        "sha1": item.get("sha") or "",
+        "mtime": mtime,
+    }
+
+
+class DirectoryLister:
+    """
+    通过目录列表接口列出单个目录，供生活事件对账使用。
+
+    完整目录树只通过 export_dir 导出：逐个目录列出整棵树需要对每个目录调用接口，
+    而115没有随任意后代变化而变化的目录级汇总值，目录自身的修改时间与 fs_category_get 的项目数
+    在子树深处替换或改名文件时都不变，无法据此跳过未变化的子树。
+
+    实例只在处理一批事件期间使用，同一目录只列出一次。
+    """
+
+    def __init__(self, fs_files: Callable[[Dict[str, Any]], Dict[str, Any]], page_size: int = 1150):
+        """
+        :param fs_files: 目录列表函数，参数与返回值同 P115Client.fs_files，调用方负责检查响应。
+        :param page_size: 每页条目数。
+        """
+        self.fs_files = fs_files
+        self.page_size = page_size
+        self.api_calls = 0
+        self._listed: Dict[int, Tuple[List[Tuple[int, str]], List[Dict[str, Any]]]] = {}
+
+    def _list_page(self, cid: int, offset: int) -> Dict[str, Any]:
+        self.api_calls += 1
+        return self.fs_files({
+            "cid": cid,
+            "offset": offset,
+            "limit": self.page_size,
+            "show_dir": 1,
+            "asc": 1,
+            "o": "file_name",
+        })
+
+    def _list_all(self, cid: int) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        :return: (首页响应, 全部条目)
+        """
+        resp = self._list_page(cid, 0)
+        total = int(resp.get("count") or 0)
+        items = list(resp.get("data") or [])
+        while len(items) < total:
+            page = self._list_page(cid, len(items)).get("data") or []
+            if not page:
+                break
+            items.extend(page)
+        return resp, items
+
+    def list_dir(self, cid: int) -> Tuple[List[Tuple[int, str]], List[Dict[str, Any]]]:
+        """
+        列出单个目录的直接子项。
+
+        :param cid: 目录的115 id。
+        :return: (从网盘根到该目录的 (id, 名称) 链, 整理后的子项)；目录不存在时均为空
+        """
+        cid = int(cid)
+        if cid not in self._listed:
+            resp, items = self._list_all(cid)
+            ancestors = [(int(a["cid"]), a.get("name") or "") for a in resp.get("path") or []]
+            # 目录不存在时接口会返回网盘根目录的内容
+            if not ancestors or ancestors[-1][0] != cid:
+                self._listed[cid] = ([], [])
+            else:
+                self._listed[cid] = (ancestors, [normalize_item(item) for item in items])
+        return self._listed[cid]
+
+    def resolve(self, cid: int, rel_dir: str) -> Optional[int]:
+        """
+        按名称逐级查找目录下相对路径对应的目录 id。
+
+        :param cid: 起始目录的115 id。
+        :param rel_dir: 相对起始目录的路径，为空时即起始目录。
+        :return: 路径上仍然存在的最深一级目录的 id；起始目录不存在时返回 None
+        """
+        ancestors, items = self.list_dir(cid)
+        if not ancestors:
+            return None
+        for name in filter(None, rel_dir.split("/")):
+            child = next((item["id"] for item in items if item["is_dir"] and item["name"] == name), None)
+            if child is None:
+                break
+            cid = child
+            _, items = self.list_dir(cid)
+        return int(cid)
@@ -0,0 +1,92 @@
+import os
+import tempfile
+from typing import Iterable, Optional
+from urllib.parse import quote
+
+# 输出方式
+OUTPUT_SYMLINK = "symlink"
+OUTPUT_STRM = "strm"
+
+STRM_SUFFIX = ".strm"
+
+# 默认生成 .strm 的文件扩展名，其余文件（字幕、图片、nfo 等）仍创建软连接
+DEFAULT_STRM_EXTS = ("mkv", "mp4", "ts", "m2ts", "iso", "avi", "mov", "wmv", "flv", "rmvb", "webm", "mpg", "mpeg")
+
+
+class StrmWriter:
+    """
+    以 .strm 文件代替指向挂载的软连接。
+
+    媒体服务器扫描媒体库时只读取本地的小文件，不再经挂载 stat 或打开视频文件。
+    .strm 文件名为原文件名加 .strm 后缀（如 a.mkv.strm），保留原扩展名，
+    本地文件名因此可以无歧义地还原为云端文件名，用于与云端目录树比对。
+
+    URL 模板中可用的占位符：
+    {path} 相对于同步根（或映射根）的路径，{mount_path} 挂载中的完整路径，{name} 文件名，均经 URL 编码；
+    {size} 文件大小（字节），未知时为空。
+    """
+
+    def __init__(self, url_template: str, exts: Optional[Iterable[str]] = None):
+        """
+        :param url_template: 写入 .strm 的 URL 模板，如 http://alist:5244/d/115/media/{path}。
+        :param exts: 生成 .strm 的扩展名（不含点、不区分大小写），为空时使用 DEFAULT_STRM_EXTS。
+        """
+        self.url_template = url_template.strip()
+        self.exts = frozenset(ext.strip().lower().lstrip(".") for ext in (exts or DEFAULT_STRM_EXTS) if ext.strip())
+
+    def applies(self, name: str) -> bool:
+        """
+        文件是否以 .strm 输出。
+        """
+        return os.path.splitext(name)[1][1:].lower() in self.exts
+
+    def local_path(self, rel_path: str) -> str:
+        """
+        云端文件在本地的相对路径。
+        """
+        return rel_path + STRM_SUFFIX if self.applies(rel_path) else rel_path
+
+    def cloud_name(self, local_name: str) -> str:
+        """
+        本地文件名对应的云端文件名，local_path 的逆运算。
+        """
+        if local_name.endswith(STRM_SUFFIX) and self.applies(local_name[:-len(STRM_SUFFIX)]):
+            return local_name[:-len(STRM_SUFFIX)]
+        return local_name
+
+    def render(self, rel_path: str, mount_path: str, size: Optional[int] = None) -> str:
+        return self.url_template.format(
+            path=quote(rel_path.replace(os.sep, "/")),
+            mount_path=quote(mount_path.replace(os.sep, "/")),
+            name=quote(os.path.basename(rel_path)),
+            size="" if size is None else int(size),
+        )
+
+    def write(self, strm_path: str, rel_path: str, mount_path: str, size: Optional[int] = None) -> bool:
+        """
+        写入 .strm 文件；内容未变化时不重写，避免媒体服务器因修改时间变化重复扫描。
+
+        :return: 是否写入
+        """
+        content = self.render(rel_path, mount_path, size) + "\n"
+        if os.path.islink(strm_path):
+            os.remove(strm_path)
+        else:
+            try:
+                with open(strm_path, "r", encoding="utf-8") as f:
+                    if f.read() == content:
+                        return False
+            except FileNotFoundError:
+                pass
+        # 先写临时文件再替换，扫描过程中不会读到半个文件
+        fd, tmp_path = tempfile.mkstemp(prefix=".strm_", dir=os.path.dirname(strm_path))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, strm_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return True
@@ -0,0 +1,159 @@
+from array import array
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from .filters import EntryFilter
+
+
+class CloudEntry(NamedTuple):
+    """
+    带类型的云端目录树节点。
+    """
+    id: int
+    parent_id: int
+    name: str
+    path: str
+    # None 表示类型未知的叶子节点：文件或空目录
+    is_dir: Optional[bool]
+    # None 表示大小未知
+    size: Optional[int]
+    sha1: str
+    mtime: int
+
+
+class CloudTree:
+    """
+    以数组存储的紧凑目录树。
+
+    每个节点只保存自身名称，父子关系用父节点下标表示，数值字段存放在 array 中，
+    sha1 以 20 字节二进制保存；完整路径在遍历时按需拼接。
+    类型可以未知（文件或空目录），大小可以未知，分别以标志 2 与大小 -1 表示。
+    节点须按父节点先于子节点的顺序追加。
+    """
+
+    __slots__ = ("ids", "parents", "sizes", "mtimes", "flags", "names", "sha1s")
+
+    def __init__(self):
+        self.ids = array("q")
+        # 父节点下标，-1 表示根目录下的顶层节点
+        self.parents = array("l")
+        # -1 表示大小未知
+        self.sizes = array("q")
+        self.mtimes = array("q")
+        # 0 文件，1 目录，2 类型未知
+        self.flags = bytearray()
+        self.names = []
+        self.sha1s = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def append(self, id: int, parent_index: int, name: str, is_dir: Optional[bool] = False,
+               size: Optional[int] = None, sha1: str = "", mtime: int = 0) -> int:
+        """
+        追加节点。
+
+        :param is_dir: 是否目录，None 表示类型未知。
+        :param size: 文件大小，None 表示未知。
+        :return: 节点下标
+        """
+        self.ids.append(id)
+        self.parents.append(parent_index)
+        self.sizes.append(-1 if size is None else size)
+        self.mtimes.append(mtime)
+        self.flags.append(2 if is_dir is None else 1 if is_dir else 0)
+        self.names.append(name)
+        self.sha1s.append(bytes.fromhex(sha1) if sha1 else b"")
+        return len(self.ids) - 1
+
+    def pop(self) -> None:
+        """
+        移除最后追加的节点。
+        """
+        for column in (self.ids, self.parents, self.sizes, self.mtimes, self.flags, self.names, self.sha1s):
+            column.pop()
+
+    def mark_dir(self, index: int) -> None:
+        self.flags[index] = 1
+
+    def __iter__(self) -> Iterator[CloudEntry]:
+        # 只缓存目录的路径，文件路径即用即弃
+        dir_paths: Dict[int, str] = {}
+        for index in range(len(self.ids)):
+            parent = self.parents[index]
+            name = self.names[index]
+            path = f"{dir_paths[parent]}/{name}" if parent >= 0 else name
+            flag = self.flags[index]
+            is_dir = None if flag == 2 else flag == 1
+            if is_dir:
+                dir_paths[index] = path
+            yield CloudEntry(
+                id=self.ids[index],
+                parent_id=self.ids[parent] if parent >= 0 else 0,
+                name=name,
+                path=path,
+                is_dir=is_dir,
+                size=None if self.sizes[index] < 0 else self.sizes[index],
+                sha1=self.sha1s[index].hex().upper(),
+                mtime=self.mtimes[index],
+            )
+
+
+def parse_export_tree(path_iter: Iterable[str],
+                      entry_filter: Optional[EntryFilter] = None) -> Tuple[Optional[str], CloudTree]:
+    """
+    将导出的目录树路径流解析为带类型的 CloudTree。
+
+    导出结果按深度优先顺序给出，首项为 CID 对应的根目录，父节点总在子节点之前出现；
+    出现过子节点的项即为目录（子节点被排除也算），不再依据名称中是否含 "." 判断。
+    导出结果只有路径：没有子节点的项可能是文件也可能是空目录，类型记为未知；
+    节点没有115 id、大小与 sha1。
+
+    过滤规则在解析流中生效：命中排除通配符的路径连同其下的所有行直接跳过；
+    叶子节点在读到下一行、确定没有子节点时再按文件规则判断，被排除时它必定是最后追加的节点，直接弹出。
+
+    :param path_iter: 云端完整路径迭代器，例如 /media_center/电影/xxx.mkv。
+    :param entry_filter: 包含/排除规则。
+    :return: (云端根路径, 目录树)
+    """
+    tree = CloudTree()
+    cloud_root = None
+    # 祖先栈：(相对路径, 下标)
+    stack = []
+    # 被排除的子树根路径
+    excluded = None
+    # 最后追加、尚未确定类型的节点：(相对路径, 下标)
+    leaf = None
+
+    def settle_leaf():
+        # 上一个节点没有子节点，按文件规则判断
+        if leaf and entry_filter.exclude_file(leaf[0]):
+            tree.pop()
+            stack.pop()
+
+    for full_path in path_iter:
+        if cloud_root is None:
+            cloud_root = full_path.rstrip("/")
+            continue
+        rel_path = full_path[len(cloud_root) + 1:]
+        if excluded is not None:
+            if rel_path.startswith(excluded + "/"):
+                continue
+            excluded = None
+        if entry_filter and leaf and not rel_path.startswith(leaf[0] + "/"):
+            settle_leaf()
+        leaf = None
+        while stack and not rel_path.startswith(stack[-1][0] + "/"):
+            stack.pop()
+        parent_index = stack[-1][1] if stack else -1
+        if parent_index >= 0:
+            tree.mark_dir(parent_index)
+        if entry_filter and entry_filter.exclude_path(rel_path):
+            excluded = rel_path
+            continue
+        # 导出结果没有115 id，以行号代替，只在本次目录树内唯一；类型先记为未知，出现子节点时再标记为目录
+        index = tree.append(len(tree) + 1, parent_index, rel_path.rsplit("/", 1)[-1], is_dir=None)
+        stack.append((rel_path, index))
+        leaf = (rel_path, index)
+    if entry_filter:
+        settle_leaf()
+    return cloud_root, tree
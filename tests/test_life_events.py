@@ -0,0 +1,162 @@
+"""
+SyncSoftLink 事件同步测试：在 FakeLifeCloud 上验证游标推进、事件到目录的映射与目录对账，
+移动、改名、删除后软连接目录与云端目录树一致。
+
+用法：
+    python -m unittest discover -s tests
+"""
+import os
+import random
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "benchmarks"))
+
+from replay_life_events import FakeLifeCloud, ReplayHarness, load_plugin_modules  # noqa: E402
+
+mods = load_plugin_modules()
+
+
+class EventPollerTest(unittest.TestCase):
+
+    def test_cursor_starts_now_and_advances_after_processing(self):
+        cloud = FakeLifeCloud(shows=2, seasons=1, episodes=1)
+        season = cloud.find("Show 00000/Season 1")
+        cloud.upload(season, "before.mkv")
+        cloud.clock += 1
+        poller = mods.events.EventPoller(cloud.life_events, now=lambda: cloud.clock)
+        # 没有游标时从当前时间开始，不回放历史事件
+        self.assertEqual(poller.poll(), [])
+
+        cloud.upload(season, "a.mkv")
+        cloud.upload(season, "b.mkv")
+        events = poller.poll()
+        self.assertEqual([e.name for e in events], ["a.mkv", "b.mkv"])
+        # 未推进游标时再次轮询取回同样的事件
+        self.assertEqual(poller.poll(), events)
+
+        poller.advance(events)
+        self.assertEqual(poller.cursor["id"], events[-1].id)
+        self.assertEqual(poller.poll(), [])
+
+
+class DirtyDirsTest(unittest.TestCase):
+
+    def test_location_index_tracks_files_seen_in_events(self):
+        cloud = FakeLifeCloud(shows=2, seasons=2, episodes=1)
+        first = cloud.find("Show 00000/Season 1")
+        second = cloud.find("Show 00001/Season 2")
+        poller = mods.events.EventPoller(cloud.life_events, now=lambda: cloud.clock)
+        locations = mods.events.LocationIndex()
+
+        file_id = cloud.upload(first, "new.mkv")
+        self.assertEqual(mods.events.dirty_dirs(poller.poll(), locations=locations), {first})
+        self.assertEqual(locations.get(file_id), first)
+
+        # 移动事件只带新位置，原位置来自之前的上传事件
+        poller.advance(poller.poll())
+        cloud.move(file_id, second)
+        events = poller.poll()[-1:]
+        self.assertEqual(mods.events.dirty_dirs(events, locations=locations), {first, second})
+        self.assertEqual(locations.get(file_id), second)
+
+        cloud.delete(file_id)
+        events = poller.poll()[-1:]
+        self.assertEqual(mods.events.dirty_dirs(events, locations=locations), {second})
+        self.assertIsNone(locations.get(file_id))
+
+    def test_previous_parent_used_only_when_location_unknown(self):
+        cloud = FakeLifeCloud(shows=1, seasons=2, episodes=1)
+        file_id = cloud.find("Show 00000/Season 1/S01E01.mkv")
+        first, second = cloud.find("Show 00000/Season 1"), cloud.find("Show 00000/Season 2")
+        poller = mods.events.EventPoller(cloud.life_events, now=lambda: cloud.clock)
+        cloud.move(file_id, second)
+        asked = []
+
+        def previous_parent(event):
+            asked.append(event.file_id)
+            return [first]
+
+        self.assertEqual(mods.events.dirty_dirs(poller.poll(), previous_parent), {first, second})
+        self.assertEqual(asked, [file_id])
+
+
+class EventSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._executor = ThreadPoolExecutor(4)
+        self.cloud = FakeLifeCloud(shows=5, seasons=2, episodes=3)
+        self.harness = ReplayHarness(mods, self.cloud, self._tmp.name, self._executor)
+        self.harness.full_sync()
+
+    def tearDown(self):
+        self.harness.close()
+        self._executor.shutdown()
+        self._tmp.cleanup()
+
+    def assertInSync(self):
+        self.assertEqual(self.harness.mismatch(), ([], []))
+
+    def assertNoDelta(self):
+        # 事件同步的结果已写入快照，随后的定时同步没有增量
+        self.harness._stage_export()
+        added, removed = self.harness.snapshot.delta()
+        self.assertEqual((list(added), list(removed)), ([], []))
+
+    def test_full_sync_matches_cloud(self):
+        self.assertInSync()
+        self.assertNoDelta()
+
+    def test_move_and_rename(self):
+        cloud = self.cloud
+        episode = cloud.find("Show 00001/Season 1/S01E02.mkv")
+        cloud.move(episode, cloud.find("Show 00003/Season 2"))
+        cloud.rename(cloud.find("Show 00002/Season 2"), "Season 2 (2020)")
+        cloud.rename(cloud.find("Show 00004"), "Show 00004 (2019)")
+        self.assertEqual(self.harness.sync_events(), 3)
+        self.assertTrue(os.path.islink(os.path.join(self.harness.softlink_root, "Show 00003/Season 2/S01E02.mkv")))
+        self.assertFalse(os.path.lexists(os.path.join(self.harness.softlink_root, "Show 00002/Season 2")))
+        self.assertInSync()
+        self.assertNoDelta()
+
+    def test_upload_new_folder_and_delete(self):
+        cloud = self.cloud
+        season = cloud.find("Show 00000/Season 1")
+        cloud.upload(season, "S01E04.mkv")
+        folder = cloud.new_folder(cloud.find("Show 00002"), "Specials")
+        cloud.delete(cloud.find("Show 00001/Season 2/S02E01.mkv"))
+        self.harness.sync_events()
+        self.assertInSync()
+
+        # 文件全部移走后的空目录与导出目录树一致，作为叶子节点以软链接表示
+        cloud.move(cloud.find("Show 00002/Specials/S01E01.mkv"), season)
+        self.harness.sync_events()
+        self.assertInSync()
+        self.assertTrue(os.path.islink(os.path.join(self.harness.softlink_root, "Show 00002/Specials")))
+        self.assertEqual(cloud.items[folder]["children"], [])
+        self.assertNoDelta()
+
+        # 叶子节点有了子项后替换为目录，不经由软链接写入挂载
+        cloud.upload(folder, "S00E01.mkv")
+        self.harness.sync_events()
+        self.assertInSync()
+        self.assertFalse(os.path.islink(os.path.join(self.harness.softlink_root, "Show 00002/Specials")))
+        self.assertNoDelta()
+
+    def test_random_operations_converge_after_scheduled_sync(self):
+        rng = random.Random(0)
+        for _ in range(15):
+            for _ in range(8):
+                self.cloud.mutate(rng)
+            self.harness.sync_events()
+        # 事件无法定位的变化（如移动时自动改名）由定时同步的增量修正
+        self.harness.scheduled_sync()
+        self.assertInSync()
+        self.assertNoDelta()
+
+
+if __name__ == "__main__":
+    unittest.main()
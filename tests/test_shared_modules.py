@@ -0,0 +1,33 @@
+"""
+各插件中带有的同名辅助模块副本必须保持一致：插件可单独安装，不能跨插件导入，
+共享的状态（客户端缓存、挂载访问层）通过副本在 sys.modules 中登记的共享模块取得。
+
+用法：
+    python -m unittest discover -s tests
+"""
+import filecmp
+import os
+import unittest
+
+PLUGINS = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "plugins.v2")
+
+# 模块文件名与带有副本的插件
+COPIES = {
+    "clients.py": ("syncsoftlink", "offlinedownload"),
+    "fuse.py": ("syncsoftlink", "autosoftlink"),
+    "strm.py": ("syncsoftlink", "autosoftlink"),
+}
+
+
+class SharedModulesTest(unittest.TestCase):
+
+    def test_copies_are_identical(self):
+        for name, plugins in COPIES.items():
+            first, *others = (os.path.join(PLUGINS, plugin, name) for plugin in plugins)
+            for other in others:
+                with self.subTest(module=name, copy=other):
+                    self.assertTrue(filecmp.cmp(first, other, shallow=False))
+
+
+if __name__ == "__main__":
+    unittest.main()